@@ -1,10 +1,9 @@
 """FastAPI routes for document processing with Server-Sent Events (SSE)"""
 import os
-import shutil
 import json
 import asyncio
 from datetime import datetime
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Request
 from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, AsyncGenerator
@@ -13,9 +12,29 @@ import tempfile
 
 from config.settings import settings
 from core.document_parser import DocumentParser
+from core.page_classifier import PageClassifier
+from core.parse_cache import ParseCache
+from core.parser_pool import ParserWorkerPool
 from core.content_processor import ContentProcessor
+from core.image_dedup import ImageDeduplicator
+from core.image_filter import ImageFilter
+from core.summary_cache import SummaryCache
+from core.embedding_cache import EmbeddingCache
+from core.key_scheduler import KeyScheduler
+from core.retry_policy import RetryPolicy
+from core.extractive_summarizer import ExtractiveSummarizer
+from core.llm_pool import LLMClientPool
 from core.vector_store import VectorStoreManager
+from core.vector_store_registry import VectorStoreRegistry
+from core.lexical_index import LexicalIndex
+from core.embedding_ingestor import EmbeddingIngestor
+from core.pipeline import IngestionPipeline
+from core.job_journal import JobIndex, JobJournal
+from core.table_normalizer import TableNormalizer
 from utils.file_helpers import FileHandler
+from utils.blob_store import BlobStore
+from utils.image_payload import ImagePayloadOptimizer
+from utils.workspace import DocumentWorkspace
 from core.chat_agent import ChatAgent
 from typing import Dict
 
@@ -26,6 +45,78 @@ router = APIRouter()
 # Store processing status for each document
 processing_status = {}
 
+# Jobs resumed at startup (kept referenced until they finish)
+resumed_jobs = set()
+
+# Jobs by PDF content and processing arguments (finds a re-submitted PDF's job)
+job_index = JobIndex(settings.JOB_INDEX_PATH)
+
+# Shared cache of partitioned elements
+parse_cache = ParseCache(settings.PARSE_CACHE_DIR, settings.PARSE_CACHE_MAX_BYTES)
+
+# Shared perceptual-hash index of stored images
+image_dedup = ImageDeduplicator(
+    settings.IMAGE_INDEX_PATH,
+    BlobStore(settings.IMAGE_DIR),
+    max_distance=settings.IMAGE_DEDUP_MAX_DISTANCE
+)
+
+# Shared cache of AI chunk summaries
+summary_cache = SummaryCache(
+    settings.SUMMARY_CACHE_PATH,
+    max_entries=settings.SUMMARY_CACHE_MAX_ENTRIES,
+    max_age_days=settings.SUMMARY_CACHE_MAX_AGE_DAYS
+)
+
+# Shared cache of document and query embeddings
+embedding_cache = EmbeddingCache(
+    settings.EMBEDDING_CACHE_PATH,
+    memory_entries=settings.EMBEDDING_CACHE_MEMORY_ENTRIES,
+    max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES
+)
+
+# Open Chroma collections shared by ingestion, search and chat
+vector_registry = VectorStoreRegistry(
+    max_bytes=settings.VECTOR_STORE_CACHE_MAX_BYTES,
+    max_entries=settings.VECTOR_STORE_CACHE_MAX_ENTRIES
+)
+
+# Vector store manager shared by all requests (created on first use, after the environment is loaded)
+_vector_manager: Optional[VectorStoreManager] = None
+
+# Per-key Gemini rate limits shared by all documents
+key_scheduler = KeyScheduler(
+    requests_per_minute=settings.GEMINI_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.GEMINI_TOKENS_PER_MINUTE,
+    max_concurrency=settings.GEMINI_MAX_CONCURRENCY_PER_KEY
+)
+
+# Shared per-key embedding quotas
+embedding_scheduler = KeyScheduler(
+    requests_per_minute=settings.EMBEDDING_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.EMBEDDING_TOKENS_PER_MINUTE,
+    max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY_PER_KEY
+)
+
+# Gemini clients and HTTP connections shared by ingestion and chat
+llm_pool = LLMClientPool(
+    max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY_SECONDS,
+    backend=settings.LLM_BACKEND,
+    fake_latency_seconds=settings.FAKE_LLM_LATENCY_SECONDS,
+    fake_error_rate=settings.FAKE_LLM_ERROR_RATE,
+    fake_error_code=settings.FAKE_LLM_ERROR_CODE,
+    fake_keys=settings.FAKE_LLM_KEYS
+)
+
+# Warm parser workers (started and stopped by the app lifespan in main.py)
+parser_pool = ParserWorkerPool(
+    workers=settings.PARSE_WORKERS,
+    max_jobs_per_worker=settings.PARSER_POOL_MAX_JOBS_PER_WORKER,
+    languages=settings.LANGUAGES
+)
+
 
 class ProcessRequest(BaseModel):
     """Request model for document processing"""
@@ -54,6 +145,148 @@ class SearchRequest(BaseModel):
     query: str
     k: Optional[int] = 5
     document_id: Optional[str] = None
+    mode: Optional[str] = None  # vector, hybrid, lexical or auto (defaults to settings.SEARCH_MODE)
+
+
+def create_content_processor(journal: Optional[JobJournal] = None, document_id: Optional[str] = None) -> ContentProcessor:
+    """Create a content processor wired to the shared caches and key scheduler"""
+    return ContentProcessor(
+        image_dir=str(settings.IMAGE_DIR),
+        table_dir=str(settings.TABLE_DIR),
+        model_name=settings.GEMINI_MODEL,
+        temperature=settings.TEMPERATURE,
+        image_dedup=image_dedup if settings.IMAGE_DEDUP_ENABLED else None,
+        summary_cache=summary_cache if settings.SUMMARY_CACHE_ENABLED else None,
+        key_scheduler=key_scheduler,
+        retry_policy=RetryPolicy(
+            max_attempts=settings.LLM_MAX_ATTEMPTS,
+            base_delay=settings.LLM_BACKOFF_BASE_SECONDS,
+            max_delay=settings.LLM_BACKOFF_MAX_SECONDS,
+            chunk_deadline=settings.LLM_CHUNK_DEADLINE_SECONDS,
+            request_timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS
+        ),
+        requeue_failed=settings.LLM_REQUEUE_FAILED,
+        batch_max_chunks=settings.LLM_BATCH_MAX_CHUNKS,
+        batch_token_budget=settings.LLM_BATCH_TOKEN_BUDGET,
+        batch_chunk_max_tokens=settings.LLM_BATCH_CHUNK_MAX_TOKENS,
+        batch_linger_seconds=settings.LLM_BATCH_LINGER_SECONDS,
+        extractive_summarizer=ExtractiveSummarizer(
+            max_chars=settings.LOCAL_TIER_MAX_CHARS,
+            max_number_ratio=settings.LOCAL_TIER_MAX_NUMBER_RATIO
+        ) if settings.LOCAL_TIER_ENABLED else None,
+        image_optimizer=ImagePayloadOptimizer(
+            max_edge=settings.LLM_IMAGE_MAX_EDGE,
+            image_format=settings.LLM_IMAGE_FORMAT,
+            quality=settings.LLM_IMAGE_QUALITY,
+            min_bytes=settings.LLM_IMAGE_MIN_BYTES
+        ) if settings.LLM_IMAGE_OPTIMIZE_ENABLED else None,
+        table_normalizer=TableNormalizer(
+            style=settings.TABLE_COMPACT_STYLE,
+            max_cell_chars=settings.TABLE_MAX_CELL_CHARS
+        ) if settings.TABLE_COMPACT_ENABLED else None,
+        image_filter=ImageFilter(
+            min_edge=settings.IMAGE_FILTER_MIN_EDGE,
+            min_area=settings.IMAGE_FILTER_MIN_AREA,
+            max_aspect_ratio=settings.IMAGE_FILTER_MAX_ASPECT_RATIO,
+            min_entropy=settings.IMAGE_FILTER_MIN_ENTROPY,
+            max_dominant_ratio=settings.IMAGE_FILTER_MAX_DOMINANT_RATIO
+        ) if settings.IMAGE_FILTER_ENABLED else None,
+        llm_pool=llm_pool,
+        journal=journal,
+        dedup_scope=document_id
+    )
+
+
+def get_vector_manager() -> VectorStoreManager:
+    """Get the vector store manager wired to the shared embedding cache and collection registry"""
+    global _vector_manager
+    if _vector_manager is None:
+        _vector_manager = VectorStoreManager(
+            embedding_model=settings.EMBEDDING_MODEL,
+            embedding_cache=embedding_cache if settings.EMBEDDING_CACHE_ENABLED else None,
+            registry=vector_registry if settings.VECTOR_STORE_CACHE_ENABLED else None
+        )
+    return _vector_manager
+
+
+def create_embedding_ingestor(processor: ContentProcessor, vector_manager: VectorStoreManager) -> EmbeddingIngestor:
+    """Create the embedding stage of a job on the processor's API keys"""
+    return EmbeddingIngestor(
+        vector_manager,
+        processor.api_keys,
+        embedding_scheduler,
+        retry_policy=RetryPolicy(
+            max_attempts=settings.LLM_MAX_ATTEMPTS,
+            base_delay=settings.LLM_BACKOFF_BASE_SECONDS,
+            max_delay=settings.LLM_BACKOFF_MAX_SECONDS
+        ),
+        batch_size=settings.EMBEDDING_BATCH_SIZE,
+        max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY
+    )
+
+
+def save_lexical_index(workspace: DocumentWorkspace, documents: List) -> None:
+    """Save a document's BM25 index and drop the copy searches have loaded"""
+    LexicalIndex.from_documents(documents).save(str(workspace.lexical_index_path))
+    vector_registry.evict_lexical_index(str(workspace.lexical_index_path))
+
+
+def is_job_active(document_id: str) -> bool:
+    return processing_status.get(document_id, {}).get("status") in ("queued", "processing")
+
+
+def load_unfinished_job(document_id: str) -> Optional[dict]:
+    """Return the recorded arguments of a document's unfinished job, if any"""
+    workspace = DocumentWorkspace(document_id)
+    if not workspace.journal_path.exists():
+        return None
+    
+    journal = JobJournal(str(workspace.journal_path))
+    try:
+        if journal.get_status() == "completed":
+            return None
+        return journal.get_params()
+    finally:
+        journal.close()
+
+
+def find_unfinished_job(job_args: dict) -> Optional[str]:
+    """
+    Find an interrupted job for the same PDF content and processing arguments
+    
+    Failed jobs are not picked up (they are resumed explicitly), so
+    re-submitting a PDF whose job failed starts over.
+    """
+    document_id = job_index.find(job_args)
+    if document_id is None or load_unfinished_job(document_id) is None:
+        return None
+    return document_id
+
+
+def set_job_status(journal: JobJournal, document_id: str, status: str) -> None:
+    """Record a job's status in its journal and the job index"""
+    journal.set_status(status)
+    job_index.set_status(document_id, status)
+
+
+def start_job(document_id: str, params: dict, background_tasks: BackgroundTasks, message: str) -> None:
+    """Queue a processing job with recorded arguments"""
+    processing_status[document_id] = {
+        "status": "queued",
+        "progress": 0,
+        "message": message
+    }
+    background_tasks.add_task(
+        process_pdf_background,
+        document_id,
+        params["upload_path"],
+        params["max_characters"],
+        params["new_after_n_chars"],
+        params["combine_text_under_n_chars"],
+        params["extract_images"],
+        params["extract_tables"],
+        params["languages"]
+    )
 
 
 async def send_sse_message(message_type: str, data: dict) -> str:
@@ -102,25 +335,38 @@ async def initiate_pdf_processing(
             os.remove(upload_path)
             raise HTTPException(status_code=400, detail=error_msg)
         
-        # Initialize status
-        processing_status[document_id] = {
-            "status": "queued",
-            "progress": 0,
-            "message": "Processing queued"
+        job_args = {
+            "file_hash": BlobStore.hash_bytes(content),
+            "max_characters": max_characters,
+            "new_after_n_chars": new_after_n_chars,
+            "combine_text_under_n_chars": combine_text_under_n_chars,
+            "extract_images": extract_images,
+            "extract_tables": extract_tables,
+            "languages": languages
         }
         
+        # A re-submitted PDF continues its interrupted job instead of starting over
+        unfinished_id = find_unfinished_job(job_args)
+        if unfinished_id is not None:
+            params = load_unfinished_job(unfinished_id)
+            if os.path.exists(params["upload_path"]):
+                os.remove(upload_path)
+            else:
+                os.replace(upload_path, params["upload_path"])
+            
+            document_id = unfinished_id
+            if not is_job_active(document_id):
+                start_job(document_id, params, background_tasks, "Resume queued")
+            
+            return {
+                "success": True,
+                "message": "Resuming unfinished processing of this PDF",
+                "document_id": document_id,
+                "stream_url": f"/api/process-pdf-stream/{document_id}"
+            }
+        
         # Start background processing
-        background_tasks.add_task(
-            process_pdf_background,
-            document_id,
-            upload_path,
-            max_characters,
-            new_after_n_chars,
-            combine_text_under_n_chars,
-            extract_images,
-            extract_tables,
-            languages
-        )
+        start_job(document_id, {**job_args, "upload_path": upload_path}, background_tasks, "Processing queued")
         
         return {
             "success": True,
@@ -223,9 +469,32 @@ async def process_pdf_background(
     extract_tables: bool,
     languages: str
 ):
-    """Background task for PDF processing with status updates"""
+    """Background task for PDF processing with status updates (resumes from the job journal)"""
+    
+    workspace = DocumentWorkspace(document_id).create()
+    journal = JobJournal(str(workspace.journal_path))
+    
+    # Readers share the collection being written, so it must stay open until the job ends
+    vector_registry.pin(str(workspace.chroma_dir))
     
     try:
+        # Record the arguments first so the job can be resumed after a restart
+        if journal.get_params() is None:
+            with open(upload_path, "rb") as f:
+                file_hash = BlobStore.hash_bytes(f.read())
+            job_args = {
+                "file_hash": file_hash,
+                "max_characters": max_characters,
+                "new_after_n_chars": new_after_n_chars,
+                "combine_text_under_n_chars": combine_text_under_n_chars,
+                "extract_images": extract_images,
+                "extract_tables": extract_tables,
+                "languages": languages
+            }
+            journal.set_params({"upload_path": upload_path, **job_args})
+            job_index.register(document_id, job_args)
+        set_job_status(journal, document_id, "running")
+        
         # Update status: Starting
         processing_status[document_id] = {
             "status": "processing",
@@ -252,24 +521,57 @@ async def process_pdf_background(
         # Debug logging
         print(f"Input languages from frontend: {language_list}")
         
-        parser = DocumentParser(image_output_dir=str(settings.IMAGE_DIR))
+        parser = DocumentParser(
+            image_output_dir=str(settings.IMAGE_DIR),
+            shard_pages=settings.PARSE_SHARD_PAGES,
+            max_workers=settings.PARSE_WORKERS,
+            page_classifier=PageClassifier(
+                min_text_chars=settings.PAGE_TEXT_MIN_CHARS,
+                min_graphics_objects=settings.PAGE_GRAPHICS_MIN_OBJECTS,
+                min_table_rules=settings.PAGE_TABLE_MIN_RULES
+            ) if settings.PAGE_ROUTING_ENABLED else None,
+            parse_cache=parse_cache if settings.PARSE_CACHE_ENABLED else None,
+            worker_pool=parser_pool if settings.PARSER_POOL_ENABLED else None
+        )
+        
+        if settings.STREAMING_PIPELINE:
+            await process_pdf_streaming(
+                document_id,
+                workspace,
+                journal,
+                upload_path,
+                parser,
+                max_characters,
+                new_after_n_chars,
+                combine_text_under_n_chars,
+                extract_images,
+                extract_tables,
+                language_list
+            )
+            set_job_status(journal, document_id, "completed")
+            return
         
-        # Simulate async behavior for parsing (runs in thread pool)
         loop = asyncio.get_event_loop()
-        elements = await loop.run_in_executor(
-            None,
-            parser.partition_pdf_document,
-            upload_path,
-            max_characters,
-            new_after_n_chars,
-            combine_text_under_n_chars,
-            extract_images,
-            extract_tables,
-            language_list  # Pass language names directly - parser will convert them
-        )
         
-        checkpoint1_path = os.path.join(settings.PICKLE_DIR, f"{document_id}_checkpoint1.pkl")
-        FileHandler.save_pickle(elements, checkpoint1_path)
+        if journal.is_stage_complete("parsed") and workspace.checkpoint_path.exists():
+            # Resume: parsed chunks were checkpointed by an earlier run
+            elements = await loop.run_in_executor(None, FileHandler.load_pickle, str(workspace.checkpoint_path))
+        else:
+            # Simulate async behavior for parsing (runs in thread pool)
+            elements = await loop.run_in_executor(
+                None,
+                parser.partition_pdf_document,
+                upload_path,
+                max_characters,
+                new_after_n_chars,
+                combine_text_under_n_chars,
+                extract_images,
+                extract_tables,
+                language_list  # Pass language names directly - parser will convert them
+            )
+            
+            FileHandler.save_pickle(elements, str(workspace.checkpoint_path))
+            journal.complete_stage("parsed")
         
         processing_status[document_id] = {
             "status": "processing",
@@ -291,26 +593,19 @@ async def process_pdf_background(
             "total_chunks": len(elements)
         }
         
-        processor = ContentProcessor(
-            image_dir=str(settings.IMAGE_DIR),
-            model_name=settings.GEMINI_MODEL,
-            temperature=settings.TEMPERATURE
-        )
+        processor = create_content_processor(journal, document_id)
         
-        # Process chunks (runs in thread pool)
-        documents = await loop.run_in_executor(
-            None,
-            processor.summarise_chunks,
-            elements
-        )
+        # Process chunks on the server event loop (shared scheduler and client pool)
+        documents = await processor.summarise_chunks_async(elements)
         
-        image_count = len(list(settings.IMAGE_DIR.glob("*.png")))
+        image_count = len({path for doc in documents for path in doc.metadata["image_paths"]})
         
-        output_pickle_path = os.path.join(settings.PICKLE_DIR, f"{document_id}_processed.pkl")
-        output_json_path = os.path.join(settings.JSON_DIR, f"{document_id}_processed.json")
+        output_pickle_path = str(workspace.pickle_path)
+        output_json_path = str(workspace.json_path)
         
         FileHandler.save_pickle(documents, output_pickle_path)
         FileHandler.save_json(documents, output_json_path)
+        save_lexical_index(workspace, documents)
         
         processing_status[document_id] = {
             "status": "processing",
@@ -319,7 +614,8 @@ async def process_pdf_background(
             "progress": 70,
             "message": f"Processed {len(documents)} chunks",
             "chunks_processed": len(documents),
-            "images_extracted": image_count
+            "images_extracted": image_count,
+            "llm_stats": processor.stats
         }
         await asyncio.sleep(0.5)
         
@@ -332,24 +628,41 @@ async def process_pdf_background(
             "message": "Step 4: Creating vector embeddings..."
         }
         
-        vector_store_path = os.path.join(settings.CHROMA_DIR, document_id)
-        vector_manager = VectorStoreManager(embedding_model=settings.EMBEDDING_MODEL)
+        vector_store_path = str(workspace.chroma_dir)
+        vector_manager = get_vector_manager()
         
-        # Create vector store (runs in thread pool)
+        # Create vector store and upsert documents not embedded by an earlier run (runs in thread pool)
         vectorstore = await loop.run_in_executor(
             None,
-            vector_manager.create_vector_store,
-            documents,
+            vector_manager.create_empty_store,
             vector_store_path,
             document_id
         )
+        pending = [doc for doc in documents if not journal.is_embedded(doc)]
+        embedder = create_embedding_ingestor(processor, vector_manager)
+        
+        def on_batch(batch: List):
+            journal.record_embedded(batch)
+            processing_status[document_id] = {
+                "status": "processing",
+                "step": 4,
+                "step_name": "vectorization",
+                "progress": 75 + 20 * embedder.stats["documents"] // len(pending),
+                "message": f"Embedded {embedder.stats['documents']} of {len(pending)} chunks...",
+                "embedding_stats": embedder.get_stats()
+            }
+        
+        if pending:
+            await embedder.add_documents(vectorstore, pending, on_batch=on_batch)
+        journal.complete_stage("indexed")
         
         processing_status[document_id] = {
             "status": "processing",
             "step": 4,
             "step_name": "vectorization",
             "progress": 95,
-            "message": "Vector store created"
+            "message": "Vector store created",
+            "embedding_stats": embedder.get_stats()
         }
         await asyncio.sleep(0.5)
         
@@ -364,17 +677,112 @@ async def process_pdf_background(
                 "images_extracted": image_count,
                 "pickle_path": output_pickle_path,
                 "json_path": output_json_path,
-                "vector_store_path": vector_store_path
+                "vector_store_path": vector_store_path,
+                "llm_stats": processor.stats,
+                "embedding_stats": embedder.get_stats(),
+                "journal": journal.get_stats()
             }
         }
+        set_job_status(journal, document_id, "completed")
     
     except Exception as e:
+        set_job_status(journal, document_id, "failed")
         processing_status[document_id] = {
             "status": "failed",
             "progress": 0,
             "message": f"Error: {str(e)}"
         }
         print(f"Error processing PDF: {e}")
+    finally:
+        journal.close()
+        vector_registry.unpin(str(workspace.chroma_dir))
+
+
+async def process_pdf_streaming(
+    document_id: str,
+    workspace: DocumentWorkspace,
+    journal: JobJournal,
+    upload_path: str,
+    parser: DocumentParser,
+    max_characters: int,
+    new_after_n_chars: int,
+    combine_text_under_n_chars: int,
+    extract_images: bool,
+    extract_tables: bool,
+    language_list: List[str]
+):
+    """Run parsing, AI processing and vectorization as one streaming pipeline"""
+    
+    processor = create_content_processor(journal, document_id)
+    vector_manager = get_vector_manager()
+    embedder = create_embedding_ingestor(processor, vector_manager)
+    vector_store_path = str(workspace.chroma_dir)
+    
+    def on_progress(stats: dict):
+        # Parsed chunks count is only known at the end, so report indexed chunks
+        processing_status[document_id] = {
+            "status": "processing",
+            "step": 3,
+            "step_name": "ai_processing",
+            "progress": min(90, 10 + stats["chunks_indexed"] * 80 // max(stats["chunks_parsed"], 1)),
+            "message": f"Indexed {stats['chunks_indexed']} of {stats['chunks_parsed']} parsed chunks...",
+            "chunks_processed": stats["chunks_indexed"],
+            "pipeline": stats,
+            "llm_stats": dict(processor.stats),
+            "embedding_stats": embedder.get_stats()
+        }
+    
+    pipeline = IngestionPipeline(
+        parser=parser,
+        processor=processor,
+        vector_manager=vector_manager,
+        queue_size=settings.PIPELINE_QUEUE_SIZE,
+        summary_workers=settings.PIPELINE_SUMMARY_WORKERS,
+        embed_batch_size=settings.PIPELINE_EMBED_BATCH_SIZE,
+        on_progress=on_progress,
+        journal=journal,
+        embedder=embedder
+    )
+    
+    documents = await pipeline.run(
+        upload_path,
+        max_characters,
+        new_after_n_chars,
+        combine_text_under_n_chars,
+        extract_images,
+        extract_tables,
+        language_list,
+        vector_store_path,
+        document_id,
+        checkpoint_path=str(workspace.checkpoint_path)
+    )
+    
+    image_count = len({path for doc in documents for path in doc.metadata["image_paths"]})
+    
+    output_pickle_path = str(workspace.pickle_path)
+    output_json_path = str(workspace.json_path)
+    
+    FileHandler.save_pickle(documents, output_pickle_path)
+    FileHandler.save_json(documents, output_json_path)
+    save_lexical_index(workspace, documents)
+    
+    processing_status[document_id] = {
+        "status": "completed",
+        "progress": 100,
+        "message": "Processing complete!",
+        "result": {
+            "document_id": document_id,
+            "chunks_processed": len(documents),
+            "images_extracted": image_count,
+            "pickle_path": output_pickle_path,
+            "json_path": output_json_path,
+            "vector_store_path": vector_store_path,
+            "pipeline": pipeline.stats,
+            "llm_stats": processor.stats,
+            "embedding_stats": embedder.get_stats(),
+            "journal": journal.get_stats()
+        }
+    }
 
 @router.post("/chat/init/{document_id}")
 async def initialize_chat(document_id: str):
@@ -386,15 +794,18 @@ async def initialize_chat(document_id: str):
     """
     try:
         # Check if document exists
-        vector_store_path = os.path.join(settings.CHROMA_DIR, document_id)
-        if not os.path.exists(vector_store_path):
+        if not DocumentWorkspace(document_id).exists():
             raise HTTPException(
                 status_code=404, 
                 detail=f"Document '{document_id}' not found. Please process the PDF first."
             )
         
         # Create chat agent
-        chat_agent = ChatAgent(document_id=document_id)
+        chat_agent = ChatAgent(
+            document_id=document_id,
+            llm_pool=llm_pool,
+            vector_manager=get_vector_manager()
+        )
         session_id = f"{document_id}_{len(chat_agents)}"
         chat_agents[session_id] = chat_agent
         
@@ -561,27 +972,42 @@ async def get_supported_languages():
 
 @router.post("/search")
 async def search_documents(request: SearchRequest):
-    """Search documents in vector store"""
+    """Search documents in vector store (hybrid with the document's BM25 index if it has one)"""
+    if request.mode and request.mode not in VectorStoreManager.SEARCH_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid search mode '{request.mode}' (use one of {', '.join(VectorStoreManager.SEARCH_MODES)})"
+        )
+    
     try:
+        lexical_index = None
         if request.document_id:
-            vector_store_path = os.path.join(settings.CHROMA_DIR, request.document_id)
+            workspace = DocumentWorkspace(request.document_id)
+            vector_store_path = str(workspace.chroma_dir)
             if not os.path.exists(vector_store_path):
                 raise HTTPException(
                     status_code=404, 
                     detail=f"Document ID '{request.document_id}' not found"
                 )
             collection_name = request.document_id
+            lexical_index = get_vector_manager().load_lexical_index(str(workspace.lexical_index_path))
         else:
             vector_store_path = str(settings.CHROMA_DIR)
             collection_name = "multimodal_rag"
         
-        vector_manager = VectorStoreManager(embedding_model=settings.EMBEDDING_MODEL)
+        vector_manager = get_vector_manager()
         vectorstore = vector_manager.load_vector_store(
             persist_directory=vector_store_path,
             collection_name=collection_name
         )
         
-        results = vector_manager.search(vectorstore, request.query, k=request.k)
+        results = vector_manager.search(
+            vectorstore,
+            request.query,
+            k=request.k,
+            lexical_index=lexical_index,
+            mode=request.mode
+        )
         
         formatted_results = []
         for i, doc in enumerate(results, 1):
@@ -606,12 +1032,7 @@ async def search_documents(request: SearchRequest):
 async def list_processed_documents():
     """List all processed document IDs"""
     try:
-        document_ids = []
-        
-        if settings.CHROMA_DIR.exists():
-            for item in settings.CHROMA_DIR.iterdir():
-                if item.is_dir():
-                    document_ids.append(item.name)
+        document_ids = DocumentWorkspace.list_ids()
         
         return {
             "success": True,
@@ -627,13 +1048,14 @@ async def list_processed_documents():
 async def get_document_info(document_id: str):
     """Get information about a specific document"""
     try:
-        vector_store_path = os.path.join(settings.CHROMA_DIR, document_id)
+        workspace = DocumentWorkspace(document_id)
+        vector_store_path = str(workspace.chroma_dir)
         
         if not os.path.exists(vector_store_path):
             raise HTTPException(status_code=404, detail=f"Document '{document_id}' not found")
         
         # Load vector store to get document count
-        vector_manager = VectorStoreManager(embedding_model=settings.EMBEDDING_MODEL)
+        vector_manager = get_vector_manager()
         vectorstore = vector_manager.load_vector_store(
             persist_directory=vector_store_path,
             collection_name=document_id
@@ -644,8 +1066,8 @@ async def get_document_info(document_id: str):
         doc_count = collection.count()
         
         # Check for associated files
-        pickle_path = os.path.join(settings.PICKLE_DIR, f"{document_id}_processed.pkl")
-        json_path = os.path.join(settings.JSON_DIR, f"{document_id}_processed.json")
+        pickle_path = str(workspace.pickle_path)
+        json_path = str(workspace.json_path)
         
         return {
             "success": True,
@@ -684,11 +1106,21 @@ async def download_all_project_data():
                     if img_file.is_file():
                         zipf.write(img_file, f"images/{img_file.name}")
             
+            if settings.TABLE_DIR.exists():
+                for table_file in settings.TABLE_DIR.glob("*.html"):
+                    zipf.write(table_file, f"tables/{table_file.name}")
+            
             if settings.CHROMA_DIR.exists():
                 for chroma_item in settings.CHROMA_DIR.rglob("*"):
                     if chroma_item.is_file():
                         rel_path = chroma_item.relative_to(settings.CHROMA_DIR)
                         zipf.write(chroma_item, f"chroma_db/{rel_path}")
+            
+            if settings.DOCUMENTS_DIR.exists():
+                for document_item in settings.DOCUMENTS_DIR.rglob("*"):
+                    if document_item.is_file():
+                        rel_path = document_item.relative_to(settings.DOCUMENTS_DIR)
+                        zipf.write(document_item, f"documents/{rel_path}")
         
         return FileResponse(
             path=temp_zip.name,
@@ -701,27 +1133,96 @@ async def download_all_project_data():
         raise HTTPException(status_code=500, detail=f"Failed to create archive: {str(e)}")
 
 
+@router.post("/documents/{document_id}/resume")
+async def resume_document_processing(document_id: str, background_tasks: BackgroundTasks):
+    """
+    Resume an unfinished or failed processing job from its journal
+    
+    Parsing, chunk summaries and embeddings completed by the earlier run are
+    reused. Progress is streamed from /api/process-pdf-stream/{document_id}
+    """
+    try:
+        if is_job_active(document_id):
+            raise HTTPException(status_code=409, detail=f"Document '{document_id}' is already being processed")
+        
+        params = load_unfinished_job(document_id)
+        if params is None:
+            raise HTTPException(status_code=404, detail=f"No unfinished job found for document '{document_id}'")
+        if not os.path.exists(params["upload_path"]):
+            raise HTTPException(status_code=404, detail="Uploaded PDF of this job no longer exists")
+        
+        start_job(document_id, params, background_tasks, "Resume queued")
+        
+        return {
+            "success": True,
+            "message": "Processing resumed",
+            "document_id": document_id,
+            "stream_url": f"/api/process-pdf-stream/{document_id}"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def resume_interrupted_jobs() -> List[str]:
+    """
+    Restart jobs that were still running when the server stopped
+    (called from the app lifespan; must run inside the event loop)
+    
+    Returns:
+        IDs of the resumed documents
+    """
+    resumed = []
+    
+    for document_id in DocumentWorkspace.list_job_ids():
+        workspace = DocumentWorkspace(document_id)
+        journal = JobJournal(str(workspace.journal_path))
+        try:
+            status, params = journal.get_status(), journal.get_params()
+        finally:
+            journal.close()
+        
+        if status != "running" or params is None or not os.path.exists(params["upload_path"]):
+            continue
+        
+        processing_status[document_id] = {
+            "status": "queued",
+            "progress": 0,
+            "message": "Resuming after server restart"
+        }
+        task = asyncio.get_running_loop().create_task(process_pdf_background(
+            document_id,
+            params["upload_path"],
+            params["max_characters"],
+            params["new_after_n_chars"],
+            params["combine_text_under_n_chars"],
+            params["extract_images"],
+            params["extract_tables"],
+            params["languages"]
+        ))
+        resumed_jobs.add(task)
+        task.add_done_callback(resumed_jobs.discard)
+        resumed.append(document_id)
+    
+    if resumed:
+        print(f"Resumed {len(resumed)} interrupted job(s): {resumed}")
+    return resumed
+
+
 @router.delete("/documents/{document_id}")
 async def delete_document(document_id: str):
     """Delete a specific document and all associated files"""
     try:
-        deleted_items = []
-        
-        # Delete vector store
-        vector_store_path = os.path.join(settings.CHROMA_DIR, document_id)
-        if os.path.exists(vector_store_path):
-            shutil.rmtree(vector_store_path)
-            deleted_items.append("vector_store")
+        # Close the collection first so its files can be removed
+        workspace = DocumentWorkspace(document_id)
+        vector_registry.evict(str(workspace.chroma_dir))
+        vector_registry.evict_lexical_index(str(workspace.lexical_index_path))
+        job_index.remove(document_id)
         
-        # Delete pickle files
-        for pkl_file in settings.PICKLE_DIR.glob(f"{document_id}*.pkl"):
-            pkl_file.unlink()
-            deleted_items.append(f"pickle/{pkl_file.name}")
-        
-        # Delete JSON files
-        for json_file in settings.JSON_DIR.glob(f"{document_id}*.json"):
-            json_file.unlink()
-            deleted_items.append(f"json/{json_file.name}")
+        # Delete vector store, checkpoints and JSON (shared images are kept)
+        deleted_items = workspace.delete()
         
         # Delete uploaded PDF
         upload_file = os.path.join(settings.UPLOAD_DIR, f"{document_id}.pdf")
@@ -751,17 +1252,53 @@ async def health_check():
         "status": "healthy",
         "upload_dir": str(settings.UPLOAD_DIR),
         "image_dir": str(settings.IMAGE_DIR),
+        "table_dir": str(settings.TABLE_DIR),
         "chroma_dir": str(settings.CHROMA_DIR),
+        "documents_dir": str(settings.DOCUMENTS_DIR),
         "api_version": settings.API_VERSION,
-        "active_processing": len(processing_status)
+        "llm_backend": settings.LLM_BACKEND,
+        "embedding_backend": settings.EMBEDDING_BACKEND,
+        "active_processing": len(processing_status),
+        "parse_cache": parse_cache.get_stats(),
+        "parser_pool": parser_pool.get_stats(),
+        "image_dedup": image_dedup.get_stats(),
+        "summary_cache": summary_cache.get_stats(),
+        "embedding_cache": embedding_cache.get_stats(),
+        "vector_registry": vector_registry.get_stats(),
+        "key_scheduler": key_scheduler.get_stats(),
+        "embedding_scheduler": embedding_scheduler.get_stats(),
+        "llm_pool": llm_pool.get_stats()
     }
     
-import base64
 from pathlib import Path
 
+
+def build_image_entries(request: Request, image_paths: List[str]) -> List[dict]:
+    """Build image entries with URLs of the stored images (no base64 re-encoding)"""
+    entries = []
+    
+    for image_path in image_paths:
+        image_filename = Path(image_path).name
+        
+        if os.path.exists(os.path.join(settings.IMAGE_DIR, image_filename)):
+            entries.append({
+                'filename': image_filename,
+                'url': str(request.url_for("get_image", image_filename=image_filename)),
+                'path': image_path
+            })
+        else:
+            entries.append({
+                'filename': image_filename,
+                'error': 'Image file not found',
+                'path': image_path
+            })
+    
+    return entries
+
 @router.get("/documents/{document_id}/chunks")
 async def view_processed_chunks(
     document_id: str,
+    request: Request,
     include_images: bool = True
 ):
     """
@@ -770,11 +1307,11 @@ async def view_processed_chunks(
     
     Parameters:
     - document_id: The document identifier
-    - include_images: Whether to include base64-encoded images (default: True)
+    - include_images: Whether to include image URLs (default: True)
     """
     try:
         # Construct the JSON file path
-        json_file_path = os.path.join(settings.JSON_DIR, f"{document_id}_processed.json")
+        json_file_path = str(DocumentWorkspace(document_id).json_path)
         
         # Check if file exists
         if not os.path.exists(json_file_path):
@@ -787,43 +1324,11 @@ async def view_processed_chunks(
         with open(json_file_path, 'r', encoding='utf-8') as f:
             chunks_data = json.load(f)
         
-        # Process images if requested
+        # Add image URLs if requested (images are served by /images/{image_filename})
         if include_images and isinstance(chunks_data, list):
             for chunk in chunks_data:
                 if 'image_paths' in chunk and chunk['image_paths']:
-                    chunk['images_base64'] = []
-                    
-                    for image_path in chunk['image_paths']:
-                        # Construct full image path
-                        full_image_path = os.path.join(settings.IMAGE_DIR, Path(image_path).name)
-                        
-                        try:
-                            if os.path.exists(full_image_path):
-                                with open(full_image_path, 'rb') as img_file:
-                                    image_data = img_file.read()
-                                    base64_image = base64.b64encode(image_data).decode('utf-8')
-                                    
-                                    # Get image extension for proper MIME type
-                                    ext = Path(full_image_path).suffix.lower()
-                                    mime_type = 'image/png' if ext == '.png' else 'image/jpeg'
-                                    
-                                    chunk['images_base64'].append({
-                                        'filename': Path(image_path).name,
-                                        'data': f"data:{mime_type};base64,{base64_image}",
-                                        'path': image_path
-                                    })
-                            else:
-                                chunk['images_base64'].append({
-                                    'filename': Path(image_path).name,
-                                    'error': 'Image file not found',
-                                    'path': image_path
-                                })
-                        except Exception as img_error:
-                            chunk['images_base64'].append({
-                                'filename': Path(image_path).name,
-                                'error': str(img_error),
-                                'path': image_path
-                            })
+                    chunk['image_urls'] = build_image_entries(request, chunk['image_paths'])
         
         # Get file stats
         file_stats = os.stat(json_file_path)
@@ -857,6 +1362,7 @@ async def view_processed_chunks(
 async def view_single_chunk(
     document_id: str, 
     chunk_index: int,
+    request: Request,
     include_images: bool = True
 ):
     """
@@ -865,11 +1371,11 @@ async def view_single_chunk(
     Parameters:
     - document_id: The document identifier
     - chunk_index: The index of the chunk (0-based)
-    - include_images: Whether to include base64-encoded images (default: True)
+    - include_images: Whether to include image URLs (default: True)
     """
     try:
         # Construct the JSON file path
-        json_file_path = os.path.join(settings.JSON_DIR, f"{document_id}_processed.json")
+        json_file_path = str(DocumentWorkspace(document_id).json_path)
         
         # Check if file exists
         if not os.path.exists(json_file_path):
@@ -897,41 +1403,9 @@ async def view_single_chunk(
         
         chunk = chunks_data[chunk_index]
         
-        # Process images if requested
+        # Add image URLs if requested (images are served by /images/{image_filename})
         if include_images and 'image_paths' in chunk and chunk['image_paths']:
-            chunk['images_base64'] = []
-            
-            for image_path in chunk['image_paths']:
-                # Construct full image path
-                full_image_path = os.path.join(settings.IMAGE_DIR, Path(image_path).name)
-                
-                try:
-                    if os.path.exists(full_image_path):
-                        with open(full_image_path, 'rb') as img_file:
-                            image_data = img_file.read()
-                            base64_image = base64.b64encode(image_data).decode('utf-8')
-                            
-                            # Get image extension for proper MIME type
-                            ext = Path(full_image_path).suffix.lower()
-                            mime_type = 'image/png' if ext == '.png' else 'image/jpeg'
-                            
-                            chunk['images_base64'].append({
-                                'filename': Path(image_path).name,
-                                'data': f"data:{mime_type};base64,{base64_image}",
-                                'path': image_path
-                            })
-                    else:
-                        chunk['images_base64'].append({
-                            'filename': Path(image_path).name,
-                            'error': 'Image file not found',
-                            'path': image_path
-                        })
-                except Exception as img_error:
-                    chunk['images_base64'].append({
-                        'filename': Path(image_path).name,
-                        'error': str(img_error),
-                        'path': image_path
-                    })
+            chunk['image_urls'] = build_image_entries(request, chunk['image_paths'])
         
         return {
             "success": True,
@@ -951,13 +1425,36 @@ async def view_single_chunk(
         )
 
 
+@router.get("/tables/{table_ref}")
+async def get_table(table_ref: str):
+    """
+    Get the original HTML of a table (for rendering)
+    
+    Parameters:
+    - table_ref: Table reference from a chunk's table_html_refs (e.g., '<sha256>.html')
+    """
+    if Path(table_ref).suffix.lower() != ".html":
+        raise HTTPException(status_code=400, detail="Invalid table reference")
+    
+    table_path = settings.TABLE_DIR / Path(table_ref).name
+    if not table_path.exists():
+        raise HTTPException(status_code=404, detail=f"Table '{table_ref}' not found")
+    
+    return FileResponse(
+        path=str(table_path),
+        media_type="text/html",
+        # Table files are named by content hash and never change
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+
 @router.get("/images/{image_filename}")
 async def get_image(image_filename: str):
     """
     Get a specific image file directly
     
     Parameters:
-    - image_filename: Name of the image file (e.g., 'image_0001.png')
+    - image_filename: Name of the image file (e.g., '<sha256>.jpg')
     """
     try:
         image_path = os.path.join(settings.IMAGE_DIR, image_filename)
@@ -979,7 +1476,9 @@ async def get_image(image_filename: str):
         return FileResponse(
             path=image_path,
             media_type="image/png" if image_path.endswith('.png') else "image/jpeg",
-            filename=image_filename
+            filename=image_filename,
+            # Image files are named by content hash and never change
+            headers={"Cache-Control": "public, max-age=31536000, immutable"}
         )
     
     except HTTPException:
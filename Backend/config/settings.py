@@ -1,4 +1,5 @@
 """Configuration settings for the application"""
+import os
 from pathlib import Path
 from pydantic_settings import BaseSettings
 
@@ -10,9 +11,16 @@ class Settings(BaseSettings):
     # Data subdirectories
     UPLOAD_DIR: Path = DATA_DIR / "uploads"
     IMAGE_DIR: Path = DATA_DIR / "images"
+    TABLE_DIR: Path = DATA_DIR / "tables"  # Original table HTML, content-addressed (rendering only)
     PICKLE_DIR: Path = DATA_DIR / "pickle"
     JSON_DIR: Path = DATA_DIR / "json"
     CHROMA_DIR: Path = DATA_DIR / "chroma_db"
+    DOCUMENTS_DIR: Path = DATA_DIR / "documents"  # Per-document namespaces (checkpoints, JSON, vector store)
+    PARSE_CACHE_DIR: Path = DATA_DIR / "parse_cache"
+    IMAGE_INDEX_PATH: Path = DATA_DIR / "image_index.json"
+    SUMMARY_CACHE_PATH: Path = DATA_DIR / "summary_cache.sqlite3"
+    EMBEDDING_CACHE_PATH: Path = DATA_DIR / "embedding_cache.sqlite3"
+    JOB_INDEX_PATH: Path = DATA_DIR / "job_index.sqlite3"  # Ingestion jobs by PDF hash and arguments
     
     # PDF Processing settings
     MAX_CHARACTERS: int = 3000
@@ -22,6 +30,131 @@ class Settings(BaseSettings):
     EXTRACT_TABLES: bool = True
     LANGUAGES: list = ["eng"]
     
+    # Parallel parsing settings (sharded mode is used when PARSE_WORKERS > 1)
+    # Every worker loads its own layout/table models (~1 GB), so the default is
+    # half the CPUs, capped at 4; with 1 worker, concurrent uploads parse one at a time
+    PARSE_SHARD_PAGES: int = 20
+    PARSE_WORKERS: int = max(1, min(4, (os.cpu_count() or 2) // 2))
+    
+    # Persistent warm parser pool (PARSE_WORKERS processes, started with the app);
+    # uploads share its job queue, and each worker restarts after MAX_JOBS_PER_WORKER jobs
+    PARSER_POOL_ENABLED: bool = True
+    PARSER_POOL_MAX_JOBS_PER_WORKER: int = 20
+    
+    # Page routing: text-layer pages without figures/tables use the fast strategy
+    PAGE_ROUTING_ENABLED: bool = True
+    PAGE_TEXT_MIN_CHARS: int = 50
+    PAGE_GRAPHICS_MIN_OBJECTS: int = 20
+    PAGE_TABLE_MIN_RULES: int = 2  # wide horizontal rules marking a (booktabs-style) table
+    
+    # Parse cache (partitioned elements keyed by PDF hash and parameters)
+    PARSE_CACHE_ENABLED: bool = True
+    PARSE_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024  # 1 GB
+    
+    # Perceptual-hash image dedup (near-identical images in a document, or identical ones
+    # across documents, share one asset and interpretation)
+    IMAGE_DEDUP_ENABLED: bool = True
+    IMAGE_DEDUP_MAX_DISTANCE: int = 4
+    
+    # Per-key Gemini quotas used by the key scheduler (set to your API tier)
+    GEMINI_REQUESTS_PER_MINUTE: int = 5
+    GEMINI_TOKENS_PER_MINUTE: int = 250000
+    GEMINI_MAX_CONCURRENCY_PER_KEY: int = 2
+    
+    # Backends: "google" (Gemini API) or "fake" (offline and deterministic, for benchmarks and load tests)
+    # With the fake LLM, the summary cache and image index use separate files so fake output never reaches real runs
+    LLM_BACKEND: str = "google"
+    EMBEDDING_BACKEND: str = "google"
+    FAKE_LLM_LATENCY_SECONDS: float = 0.0
+    FAKE_LLM_ERROR_RATE: float = 0.0
+    FAKE_LLM_ERROR_CODE: int = 503
+    FAKE_LLM_KEYS: int = 4
+    FAKE_EMBEDDING_DIMENSIONS: int = 768
+    FAKE_EMBEDDING_LATENCY_SECONDS: float = 0.0
+    
+    # Pooled Gemini clients: HTTP keep-alive and connection limits (per event loop)
+    LLM_POOL_MAX_CONNECTIONS: int = 20
+    LLM_POOL_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_POOL_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    
+    # LLM retries: backoff with jitter, key failover, per-chunk deadline and a re-queue pass
+    LLM_MAX_ATTEMPTS: int = 5
+    LLM_BACKOFF_BASE_SECONDS: float = 2.0
+    LLM_BACKOFF_MAX_SECONDS: float = 60.0
+    LLM_CHUNK_DEADLINE_SECONDS: float = 300.0
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 120.0
+    LLM_REQUEUE_FAILED: bool = True
+    
+    # Small text-only chunks are packed into one multi-chunk summary request (0 or 1 = off)
+    LLM_BATCH_MAX_CHUNKS: int = 8
+    LLM_BATCH_TOKEN_BUDGET: int = 8000
+    LLM_BATCH_CHUNK_MAX_TOKENS: int = 600
+    LLM_BATCH_LINGER_SECONDS: float = 0.5
+    
+    # Local extractive tier: short text-only chunks that aren't number dense skip the LLM
+    LOCAL_TIER_ENABLED: bool = True
+    LOCAL_TIER_MAX_CHARS: int = 400
+    LOCAL_TIER_MAX_NUMBER_RATIO: float = 0.2
+    
+    # Compact tables in prompts and embeddings ("markdown" or "csv"; disabled = raw HTML)
+    TABLE_COMPACT_ENABLED: bool = True
+    TABLE_COMPACT_STYLE: str = "markdown"
+    TABLE_MAX_CELL_CHARS: int = 200
+    
+    # Image filter: drop tiny, thin (separator), blank and single-colour images before storing them (0 disables a check)
+    IMAGE_FILTER_ENABLED: bool = True
+    IMAGE_FILTER_MIN_EDGE: int = 32
+    IMAGE_FILTER_MIN_AREA: int = 4096
+    IMAGE_FILTER_MAX_ASPECT_RATIO: float = 12.0
+    IMAGE_FILTER_MIN_ENTROPY: float = 0.3
+    IMAGE_FILTER_MAX_DOMINANT_RATIO: float = 0.99
+    
+    # Image payloads sent to the LLM (downscaled and re-encoded; stored originals are untouched)
+    LLM_IMAGE_OPTIMIZE_ENABLED: bool = True
+    LLM_IMAGE_MAX_EDGE: int = 1536
+    LLM_IMAGE_FORMAT: str = "JPEG"
+    LLM_IMAGE_QUALITY: int = 85
+    LLM_IMAGE_MIN_BYTES: int = 50000
+    
+    # Summary cache (AI summaries keyed by chunk content, model and prompt version; 0 = no limit)
+    SUMMARY_CACHE_ENABLED: bool = True
+    SUMMARY_CACHE_MAX_ENTRIES: int = 50000
+    SUMMARY_CACHE_MAX_AGE_DAYS: float = 0
+    
+    # Embedding cache (document and query vectors keyed by model and text hash; in-process LRU + SQLite; 0 = no limit)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 2000
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200000
+    
+    # Open Chroma collections kept across requests (LRU bounded by estimated index memory; 0 = no limit)
+    VECTOR_STORE_CACHE_ENABLED: bool = True
+    VECTOR_STORE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # 512 MB
+    VECTOR_STORE_CACHE_MAX_ENTRIES: int = 64
+    
+    # Retrieval: "vector", "hybrid" (BM25 + vector by reciprocal rank fusion), "lexical" or
+    # "auto" (short keyword queries the BM25 index covers skip the embedding call, others are hybrid)
+    SEARCH_MODE: str = "auto"
+    SEARCH_HYBRID_CANDIDATES: int = 20
+    SEARCH_RRF_K: int = 60
+    SEARCH_KEYWORD_MAX_TERMS: int = 4
+    
+    # Jobs still running when the server stopped are resumed from their journal at startup
+    RESUME_JOBS_ON_STARTUP: bool = True
+    
+    # Streaming ingestion (parse -> summarise -> embed connected by bounded queues)
+    STREAMING_PIPELINE: bool = True
+    PIPELINE_QUEUE_SIZE: int = 8
+    PIPELINE_SUMMARY_WORKERS: int = 4
+    PIPELINE_EMBED_BATCH_SIZE: int = 16
+    
+    # Embedding ingestion: batches embedded concurrently across all API keys, each upserted when done
+    # (batch size is capped at 100, the Gemini batch limit; quotas are per key)
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_REQUESTS_PER_MINUTE: int = 100
+    EMBEDDING_TOKENS_PER_MINUTE: int = 1000000
+    EMBEDDING_MAX_CONCURRENCY_PER_KEY: int = 2
+    
     # AI Model settings
     GEMINI_MODEL: str = "gemini-2.5-pro"
     EMBEDDING_MODEL: str = "models/gemini-embedding-001"
@@ -29,7 +162,7 @@ class Settings(BaseSettings):
     
     # API settings
     API_TITLE: str = "MultiModal RAG API"
-    API_VERSION: str = "1.0.0"
+    API_VERSION: str = "2.0.0"  # 2.0: chunk images are returned as URLs under image_urls (images_base64 removed)
     ALLOWED_EXTENSIONS: set = {".pdf"}
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50 MB
     
@@ -39,9 +172,12 @@ class Settings(BaseSettings):
         extra = "allow"
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        if self.LLM_BACKEND == "fake":
+            self.SUMMARY_CACHE_PATH = self.SUMMARY_CACHE_PATH.with_name(f"offline_{self.SUMMARY_CACHE_PATH.name}")
+            self.IMAGE_INDEX_PATH = self.IMAGE_INDEX_PATH.with_name(f"offline_{self.IMAGE_INDEX_PATH.name}")
         # Create directories on initialization
-        for dir_path in [self.UPLOAD_DIR, self.IMAGE_DIR, self.PICKLE_DIR, 
-                         self.JSON_DIR, self.CHROMA_DIR]:
+        for dir_path in [self.UPLOAD_DIR, self.IMAGE_DIR, self.TABLE_DIR, self.PICKLE_DIR, 
+                         self.JSON_DIR, self.CHROMA_DIR, self.PARSE_CACHE_DIR, self.DOCUMENTS_DIR]:
             dir_path.mkdir(parents=True, exist_ok=True)
 
 settings = Settings()
\ No newline at end of file
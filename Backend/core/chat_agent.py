@@ -3,7 +3,7 @@ AI Chat Agent with RAG capabilities (Optimized + Route Compatible)
 File: D:\MultiModulRag\Backend\core\chat_agent.py
 
 OPTIMIZATIONS:
-- Uses pre-stored base64 images (no disk re-encoding)
+- Loads only the images the AI references, from the content-addressed image store
 - Sends only image/table summaries to AI (not full data)
 - Uses Pydantic structured output (no regex parsing)
 - Deduplicates images by index
@@ -11,12 +11,15 @@ OPTIMIZATIONS:
 """
 import os
 import json
+import base64
 from pathlib import Path
 from typing import List, Dict, AsyncGenerator, Optional
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
+from core.llm_pool import LLMClientPool
 from core.vector_store import VectorStoreManager
 from config.settings import settings
+from utils.blob_store import BlobStore
+from utils.workspace import DocumentWorkspace
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 import asyncio
@@ -42,33 +45,44 @@ class ChatResponse(BaseModel):
 class ChatAgent:
     """Chat agent with RAG capabilities"""
     
-    def __init__(self, document_id: str):
+    def __init__(
+        self,
+        document_id: str,
+        llm_pool: Optional[LLMClientPool] = None,
+        vector_manager: Optional[VectorStoreManager] = None
+    ):
         """
         Initialize chat agent for a specific document
         
         Args:
             document_id: ID of the document to chat about
+            llm_pool: Shared LLM client pool (a private one is created if None)
+            vector_manager: Shared vector store manager (a private one is created if None)
         """
         self.document_id = document_id
         self.conversation_history = []
         
-        # Initialize base LLM for structured output
-        self.structured_llm = ChatGoogleGenerativeAI(
-            model=settings.GEMINI_MODEL,
-            temperature=0.2,
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        ).with_structured_output(ChatResponse)
+        # Pooled LLM for structured output (reused across chat sessions)
+        self.llm_pool = llm_pool or LLMClientPool()
+        self.structured_llm = self.llm_pool.get(
+            os.getenv("GOOGLE_API_KEY"),
+            settings.GEMINI_MODEL,
+            0.2,
+            ChatResponse
+        )
         
-        # Load vector store
-        vector_store_path = os.path.join(settings.CHROMA_DIR, document_id)
-        if not os.path.exists(vector_store_path):
+        # Vector store (with a shared registry, each lookup is a cache hit) and BM25 index
+        workspace = DocumentWorkspace(document_id)
+        self.vector_store_path = str(workspace.chroma_dir)
+        self.lexical_index_path = str(workspace.lexical_index_path)
+        if not os.path.exists(self.vector_store_path):
             raise FileNotFoundError(f"Vector store not found for document: {document_id}")
         
-        self.vector_manager = VectorStoreManager(embedding_model=settings.EMBEDDING_MODEL)
-        self.vectorstore = self.vector_manager.load_vector_store(
-            persist_directory=vector_store_path,
-            collection_name=document_id
-        )
+        self.vector_manager = vector_manager or VectorStoreManager(embedding_model=settings.EMBEDDING_MODEL)
+        # Open it now so a broken store fails the session setup
+        self._open_vectorstore()
+        
+        self.image_store = BlobStore(settings.IMAGE_DIR)
         
         # Optimized system prompt with structured output instructions
         self.system_prompt = """You are a helpful AI assistant that answers questions based on document content.
@@ -98,6 +112,18 @@ CONVERSATION HISTORY:
 
 Answer the user's question based on the context and conversation history."""
     
+    def _open_vectorstore(self):
+        """Look up the document's collection handle (per use, so the registry may evict it)"""
+        return self.vector_manager.load_vector_store(
+            persist_directory=self.vector_store_path,
+            collection_name=self.document_id
+        )
+    
+    @property
+    def vectorstore(self):
+        """Collection handle of the document"""
+        return self._open_vectorstore()
+    
     def search_relevant_context(self, query: str, k: int = 3) -> List[Dict]:
         """
         Search for relevant context in vector store
@@ -107,12 +133,13 @@ Answer the user's question based on the context and conversation history."""
             k: Number of results to retrieve
             
         Returns:
-            List of relevant document chunks with metadata (including base64 images)
+            List of relevant document chunks with metadata (including image paths)
         """
         results = self.vector_manager.search(
             vectorstore=self.vectorstore,
             query=query,
-            k=k
+            k=k,
+            lexical_index=self.vector_manager.load_lexical_index(self.lexical_index_path)
         )
                         
         # clean_json = [
@@ -155,9 +182,18 @@ Answer the user's question based on the context and conversation history."""
         for doc in results:
             # Parse JSON fields
             image_paths = json.loads(doc.metadata.get("image_paths", "[]")) if isinstance(doc.metadata.get("image_paths"), str) else doc.metadata.get("image_paths", [])
-            image_base64 = json.loads(doc.metadata.get("image_base64", "[]")) if isinstance(doc.metadata.get("image_base64"), str) else doc.metadata.get("image_base64", [])
             page_numbers = json.loads(doc.metadata.get("page_numbers", "[]")) if isinstance(doc.metadata.get("page_numbers"), str) else doc.metadata.get("page_numbers", [])
-            tables = json.loads(doc.metadata.get("raw_tables_html", "[]")) if isinstance(doc.metadata.get("raw_tables_html"), str) else doc.metadata.get("raw_tables_html", [])
+            # Tables are referenced by hash (older stores keep them inline as tables or raw_tables_html)
+            tables_key = next(
+                (key for key in ("table_html_refs", "tables", "raw_tables_html") if key in doc.metadata),
+                "table_html_refs"
+            )
+            tables = json.loads(doc.metadata.get(tables_key, "[]")) if isinstance(doc.metadata.get(tables_key), str) else doc.metadata.get(tables_key, [])
+            
+            # Original text is the last section of page_content (older stores also keep it in metadata)
+            original_text = doc.metadata.get("original_text")
+            if original_text is None:
+                original_text = doc.page_content.split("ORIGINAL TEXT: ", 1)[-1]
             
             # Parse interpretation fields
             image_interpretation = json.loads(doc.metadata.get("image_interpretation", "[]")) if isinstance(doc.metadata.get("image_interpretation"), str) else doc.metadata.get("image_interpretation", [])
@@ -165,10 +201,9 @@ Answer the user's question based on the context and conversation history."""
             
             chunk_data = {
                 "content": doc.page_content,
-                "original_text": doc.metadata.get("original_text", ""),
+                "original_text": original_text,
                 "ai_summary": doc.metadata.get("ai_summary", ""),
                 "image_paths": image_paths,
-                "image_base64": image_base64,
                 "image_interpretation": image_interpretation,
                 "table_interpretation": table_interpretation,
                 "page_numbers": page_numbers,
@@ -187,20 +222,19 @@ Answer the user's question based on the context and conversation history."""
             context_chunks: List of context chunks
             
         Returns:
-            Dict mapping index -> {path, base64, description, chunk_idx}
+            Dict mapping index -> {path, description, chunk_idx, filename}
         """
         image_index = {}
         global_idx = 0
         
         for chunk_idx, chunk in enumerate(context_chunks):
-            for local_idx, (img_path, img_base64, img_desc) in enumerate(
-                zip(chunk['image_paths'], chunk['image_base64'], chunk['image_interpretation'])
+            for local_idx, (img_path, img_desc) in enumerate(
+                zip(chunk['image_paths'], chunk['image_interpretation'])
             ):
                 # Skip irrelevant images
                 if "DO NOT USE" not in img_desc.upper():
                     image_index[global_idx] = {
                         "path": img_path,
-                        "base64": img_base64,
                         "description": img_desc,
                         "chunk_idx": chunk_idx,
                         "filename": Path(img_path).name
@@ -234,7 +268,7 @@ Answer the user's question based on the context and conversation history."""
             # Send table descriptions (not full HTML tables)
             if chunk['tables'] and chunk['table_interpretation']:
                 chunk_text += f"\nTABLES IN THIS SECTION:\n"
-                for idx, (table_html, table_desc) in enumerate(zip(chunk['tables'], chunk['table_interpretation'])):
+                for idx, (table, table_desc) in enumerate(zip(chunk['tables'], chunk['table_interpretation'])):
                     if "DO NOT USE" not in table_desc.upper():
                         chunk_text += f"  Table {idx + 1}: {table_desc}\n"
             
@@ -277,7 +311,7 @@ Answer the user's question based on the context and conversation history."""
                 "data": {"message": "Searching document for relevant information..."}
             }
             
-            # Retrieve context with base64 images
+            # Retrieve context with image paths
             context_chunks = self.search_relevant_context(user_message, k=3)
             
             # Build global image index (deduplicates and filters)
@@ -351,8 +385,15 @@ Answer the user's question based on the context and conversation history."""
                         ext = Path(img_data['path']).suffix.lower()
                         mime_type = 'image/png' if ext == '.png' else 'image/jpeg'
                         
-                        # Format as data URI (from pre-stored base64)
-                        data_uri = f"data:{mime_type};base64,{img_data['base64']}"
+                        # Load the referenced image only
+                        try:
+                            image_bytes = self.image_store.get(img_data['filename'])
+                        except FileNotFoundError:
+                            print(f"Warning: image file missing: {img_data['filename']}")
+                            continue
+                        
+                        # Format as data URI
+                        data_uri = f"data:{mime_type};base64,{base64.b64encode(image_bytes).decode('utf-8')}"
                         
                         yield {
                             "type": "image",
@@ -365,7 +406,7 @@ Answer the user's question based on the context and conversation history."""
                             }
                         }
                         images_sent += 1
-                        print(f"Sent image {img_idx}: {img_data['filename']} (from memory)")
+                        print(f"Sent image {img_idx}: {img_data['filename']}")
                     else:
                         print(f"Warning: AI referenced invalid image index: {img_idx}")
             
@@ -1,17 +1,40 @@
 """Content processing module with multi-API key async processing"""
 import os
+import time
 import base64
 import asyncio
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict
+from typing import Awaitable, Callable, List, Dict, Optional
 from langchain_core.documents import Document
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
+from utils.blob_store import BlobStore
+from utils.image_payload import ImagePayloadOptimizer
+from core.image_dedup import ImageDeduplicator
+from core.image_filter import ImageFilter
+from core.summary_cache import SummaryCache
+from core.key_scheduler import KeyScheduler
+from core.retry_policy import RetryPolicy
+from core.extractive_summarizer import ExtractiveSummarizer
+from core.llm_pool import LLMClientPool
+from core.job_journal import JobJournal
+from core.table_normalizer import TableNormalizer
 
 load_dotenv()
 
+# Bump when the summary prompt or AIParser fields change (invalidates cached summaries)
+PROMPT_VERSION = "1"
+
+# Token estimates used for tokens-per-minute scheduling
+PROMPT_TOKENS = 400
+IMAGE_TOKENS = 258
+CHARS_PER_TOKEN = 4
+
+# Assumed LLM call duration for time-saved estimates before any call was timed
+DEFAULT_LLM_CALL_SECONDS = 10.0
+
 
 class AIParser(BaseModel):
     """AI Parser Model for text, image and table information"""
@@ -20,16 +43,110 @@ class AIParser(BaseModel):
     image_interpretation: List[str] = Field(description="List matching the order of input images; image_interpretation[i] describes image i, use ***DO NOT USE THIS IMAGE*** for irrelevant images, and return an empty list if no images are provided.")
     table_interpretation: List[str] = Field(description="List matching the order of input tables; table_interpretation[i] describes table i, use ***DO NOT USE THIS TABLE*** for irrelevant tables, and return an empty list if no tables are provided.")
 
+class AIBatchItem(AIParser):
+    """AI Parser result for one chunk of a batched request"""
+    chunk_id: int = Field(description="The id of the chunk this result describes, copied from its CHUNK header")
+
+class AIBatchParser(BaseModel):
+    """AI Parser Model for several text-only chunks summarised in one request"""
+    results: List[AIBatchItem] = Field(description="One result per input chunk, in the same order as the chunks")
+
 class ContentProcessor:
     """Processes document chunks with AI-enhanced summaries using multiple API keys"""
     
-    def __init__(self, image_dir: str, model_name: str = "gemini-2.5-pro", temperature: float = 0):
+    def __init__(
+        self,
+        image_dir: str,
+        model_name: str = "gemini-2.5-pro",
+        temperature: float = 0,
+        image_dedup: Optional[ImageDeduplicator] = None,
+        summary_cache: Optional[SummaryCache] = None,
+        key_scheduler: Optional[KeyScheduler] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        requeue_failed: bool = True,
+        batch_max_chunks: int = 0,
+        batch_token_budget: int = 8000,
+        batch_chunk_max_tokens: int = 600,
+        batch_linger_seconds: float = 0.5,
+        extractive_summarizer: Optional[ExtractiveSummarizer] = None,
+        llm_pool: Optional[LLMClientPool] = None,
+        journal: Optional[JobJournal] = None,
+        image_optimizer: Optional[ImagePayloadOptimizer] = None,
+        table_normalizer: Optional[TableNormalizer] = None,
+        table_dir: Optional[str] = None,
+        image_filter: Optional[ImageFilter] = None,
+        dedup_scope: Optional[str] = None
+    ):
         self.image_dir = image_dir
         self.model_name = model_name
         self.temperature = temperature
+        self.image_dedup = image_dedup
+        # Near-duplicate images are only collapsed within this scope (the document)
+        self.dedup_scope = dedup_scope
+        self.summary_cache = summary_cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.requeue_failed = requeue_failed
+        
+        # Small text-only chunks are packed into one request (batch_max_chunks < 2 disables)
+        self.batch_max_chunks = batch_max_chunks
+        self.batch_token_budget = batch_token_budget
+        self.batch_chunk_max_tokens = batch_chunk_max_tokens
+        self.batch_linger_seconds = batch_linger_seconds
+        self._batch = []
+        self._batch_tokens = 0
+        self._batch_timer = None
+        self._batch_tasks = set()
+        # Callers that may still add chunks to a batch, and those waiting on one
+        self._batch_producers = 0
+        self._batch_waiters = 0
+        
+        # Local tier: chunks the summarizer accepts skip the LLM
+        self.extractive_summarizer = extractive_summarizer
+        self._llm_call_seconds = 0.0
+        self._llm_successes = 0
+        
+        # LLM call statistics for the processing status
+        self.stats = {
+            "llm_calls": 0,
+            "retries": 0,
+            "failovers": 0,
+            "deadline_exceeded": 0,
+            "fallbacks": 0,
+            "batch_calls": 0,
+            "batched_chunks": 0,
+            "requeued": 0,
+            "recovered": 0,
+            "retry_latency_seconds": 0.0,
+            "tier_journal": 0,
+            "tier_cache": 0,
+            "tier_local": 0,
+            "tier_batched": 0,
+            "tier_llm": 0,
+            "local_seconds": 0.0,
+            "local_time_saved_seconds": 0.0,
+            "images_optimized": 0,
+            "image_bytes_original": 0,
+            "image_bytes_sent": 0,
+            "image_bytes_saved": 0,
+            "table_html_chars": 0,
+            "table_compact_chars": 0,
+            "images_filtered": 0,
+            "images_filtered_by_reason": {}
+        }
+        
+        # Assets whose interpretation is requested by a chunk of this run,
+        # and futures other chunks await to reuse that interpretation
+        self._claimed_images = set()
+        self._interpretation_futures = {}
 
+        # LLM clients reused across chunks (shared with chat when passed in)
+        self.llm_pool = llm_pool or LLMClientPool()
+        
         # Load all available API keys from environment
         self.api_keys = self._load_api_keys()
+        if not self.api_keys and self.llm_pool.backend == "fake":
+            # The offline backend needs no keys; placeholders keep per-key scheduling realistic
+            self.api_keys = [f"offline-key-{i}" for i in range(1, self.llm_pool.fake_keys + 1)]
         
         if not self.api_keys:
             raise ValueError("No GOOGLE_API_KEY found in environment")
@@ -37,7 +154,30 @@ class ContentProcessor:
         print(f"Initialized ContentProcessor with {len(self.api_keys)} API keys")
         print(f"Model: {model_name}")
         
-        Path(image_dir).mkdir(parents=True, exist_ok=True)
+        # Per-key rate limits (shared across documents when passed in)
+        self.key_scheduler = key_scheduler or KeyScheduler(
+            requests_per_minute=5,
+            tokens_per_minute=250000,
+            max_concurrency=2
+        )
+        self.key_scheduler.register_keys(self.api_keys)
+        
+        # Job journal of the document being processed (summaries survive restarts)
+        self.journal = journal
+        
+        # Shrinks images sent to the LLM (stored originals are untouched)
+        self.image_optimizer = image_optimizer
+        
+        # Drops decorative, blank and tiny images before they are stored or sent
+        self.image_filter = image_filter
+        
+        # Content-addressed image store (each image is written once)
+        self.image_store = BlobStore(image_dir)
+        
+        # Tables go into prompts and embeddings in compact form (HTML when no normalizer);
+        # the original HTML is kept in the table store for rendering only
+        self.table_normalizer = table_normalizer
+        self.table_store = BlobStore(table_dir) if table_dir else None
     
     def _load_api_keys(self) -> List[str]:
         """
@@ -64,76 +204,26 @@ class ContentProcessor:
         
         return api_keys
     
-    def _get_llm_for_key(self, api_key: str):
+    def _get_llm_for_key(self, api_key: str, schema: type = AIParser):
         """
-        Create LLM instance for specific API key
+        Get pooled LLM instance for specific API key
         
         Args:
             api_key: Google API key
+            schema: Pydantic model for structured output
             
         Returns:
             LLM instance with structured output
         """
-        llm = ChatGoogleGenerativeAI(
-            model=self.model_name,
-            temperature=self.temperature,
-            google_api_key=api_key
+        return self.llm_pool.get(
+            api_key,
+            self.model_name,
+            self.temperature,
+            schema,
+            # Retries, backoff and key failover are handled by RetryPolicy
+            max_retries=1,
+            timeout=self.retry_policy.request_timeout
         )
-        return llm.with_structured_output(AIParser)
-    
-    @staticmethod
-    def clean_directory(base_dir: Path) -> None:
-        """
-        Clean all project data directories before processing new PDF.
-        Deletes: pickle files, JSON files, images, and ChromaDB data.
-        
-        Args:
-            base_dir: Base data directory containing all subdirectories
-        """
-        from config.settings import settings
-        
-        directories_to_clean = [
-            (settings.PICKLE_DIR, "*.pkl", "Pickle files"),
-            (settings.JSON_DIR, "*.json", "JSON files"),
-            (settings.IMAGE_DIR, "*", "Image files"),
-            (settings.CHROMA_DIR, "*", "ChromaDB data")
-        ]
-        
-        print("\nCleaning workspace before processing new PDF...")
-        print("="*60)
-        
-        for directory, pattern, description in directories_to_clean:
-            if not directory.exists():
-                continue
-            
-            deleted_count = 0
-            
-            # For ChromaDB, delete entire subdirectories
-            if directory == settings.CHROMA_DIR:
-                for item in directory.iterdir():
-                    if item.is_dir():
-                        try:
-                            import shutil
-                            shutil.rmtree(item)
-                            deleted_count += 1
-                            print(f"[VB Deleted] Deleted ChromaDB collection: {item.name}")
-                        except Exception as e:
-                            print(f"[]Could not delete {item.name}: {e}")
-            else:
-                # For other directories, delete matching files
-                for file in directory.glob(pattern):
-                    if file.is_file():
-                        try:
-                            file.unlink()
-                            deleted_count += 1
-                        except Exception as e:
-                            print(f"Could not delete {file.name}: {e}")
-            
-            if deleted_count > 0:
-                print(f"Deleted {deleted_count} {description}")
-        
-        print("="*60)
-        print("Workspace cleaned successfully!\n")
     
     def separate_content_types(self, chunk, image_counter: dict) -> Dict:
         """
@@ -149,7 +239,10 @@ class ContentProcessor:
         content_data = {
             'text': chunk.text,
             'tables': [],
+            'table_html_refs': [],
             'image_base64': [],
+            'image_mime_types': [],
+            'image_refs_sent': [],
             'images_dirpath': [],
             'page_no': [],
             'types': ['text']
@@ -168,36 +261,60 @@ class ContentProcessor:
             if element_type == 'Table':
                 if 'table' not in content_data['types']:
                     content_data['types'].append('table')
-                table_html = getattr(element.metadata, 'text_as_html', element.text)
-                content_data['tables'].append(table_html)
+                table_html = getattr(element.metadata, 'text_as_html', None)
+                content_data['tables'].append(self._compact_table(table_html, element.text))
+                
+                # Keep the HTML for rendering (same content is stored once)
+                table_ref = ""
+                if table_html and self.table_store is not None:
+                    try:
+                        table_ref = self.table_store.put(table_html.encode("utf-8"), "html")
+                    except Exception as e:
+                        print(f"Failed to save table HTML: {e}")
+                content_data['table_html_refs'].append(table_ref)
 
-            # Handle images by saving image in dir and storing relative path
-            # Also keep base64 for AI processing
+            # Handle images by saving image in the content-addressed store and storing relative path
+            # The payload base64 is kept in memory for AI processing only
             elif element_type == 'Image':
-                if hasattr(element.metadata, 'image_base64'):
-                    if 'image' not in content_data['types']:
-                        content_data['types'].append('image')
-
+                if getattr(element.metadata, 'image_base64', None):
                     image_base64 = element.metadata.image_base64
+                    mime_type = getattr(element.metadata, 'image_mime_type', None) or "image/jpeg"
+                    extension = "png" if mime_type == "image/png" else "jpg"
 
                     try:
-                        # Generate filename and path
-                        image_filename = f"image_{image_counter['count']:04d}.png"
-                        image_path = os.path.join(self.image_dir, image_filename)
+                        # Decode once, drop decorative images, then save under the content hash
+                        # (no-op if already stored); with dedup, near-identical images map to the
+                        # existing asset
+                        image_bytes = base64.b64decode(image_base64)
+                        if self._is_filtered_image(image_bytes):
+                            continue
+                        if 'image' not in content_data['types']:
+                            content_data['types'].append('image')
 
-                        # Decode and save image
-                        with open(image_path, "wb") as img_file:
-                            img_file.write(base64.b64decode(image_base64))
+                        if self.image_dedup is not None:
+                            image_filename, duplicate = self.image_dedup.store(image_bytes, extension, self.dedup_scope)
+                        else:
+                            image_filename, duplicate = self.image_store.put(image_bytes, extension), False
 
                         # Store relative path
                         folder_name = os.path.basename(self.image_dir.rstrip(os.sep))
                         relative_path = os.path.join(folder_name, image_filename).replace("\\", "/")
+                        if relative_path in content_data['images_dirpath']:
+                            print(f"Skipped duplicate: {relative_path}")
+                            continue
                         content_data['images_dirpath'].append(relative_path)
 
-                        # Keep base64 for AI processing
-                        content_data['image_base64'].append(image_base64)
+                        # Keep base64 for AI processing unless the interpretation
+                        # is known or requested by an earlier chunk
+                        if self._claim_image(image_filename):
+                            payload_base64, payload_mime_type = self._prepare_image_payload(
+                                image_bytes, image_base64, mime_type
+                            )
+                            content_data['image_base64'].append(payload_base64)
+                            content_data['image_mime_types'].append(payload_mime_type)
+                            content_data['image_refs_sent'].append(image_filename)
 
-                        print(f"Saved: {relative_path}")
+                        print(f"{'Reused' if duplicate else 'Saved'}: {relative_path}")
                         image_counter['count'] += 1
 
                     except Exception as e:
@@ -205,31 +322,71 @@ class ContentProcessor:
 
         return content_data
     
-    async def create_ai_enhanced_summary_async(
-        self, 
-        text: str, 
-        tables: List[str], 
-        images: List[str],
-        api_key: str,
-        chunk_index: int
-    ) -> AIParser:
-        """
-        Create AI-enhanced summary asynchronously with specific API key
+    def _is_filtered_image(self, image_bytes: bytes) -> bool:
+        """Return True if the image filter rejects the image (counted per reason)"""
+        if self.image_filter is None:
+            return False
         
-        Args:
-            text: Text content to summarize
-            tables: List of HTML tables
-            images: List of base64 encoded images
-            api_key: Google API key to use
-            chunk_index: Index of chunk for logging
+        try:
+            reason = self.image_filter.check(image_bytes)
+        except Exception as e:
+            print(f"Could not check image, keeping it: {e}")
+            return False
+        
+        if reason is None:
+            return False
+        
+        self.stats['images_filtered'] += 1
+        by_reason = self.stats['images_filtered_by_reason']
+        by_reason[reason] = by_reason.get(reason, 0) + 1
+        print(f"Filtered image ({reason})")
+        return True
+    
+    def _compact_table(self, table_html: Optional[str], table_text: str) -> str:
+        """Return the form of a table used in prompts and embeddings"""
+        if self.table_normalizer is None:
+            return table_html or table_text
+        
+        compact = self.table_normalizer.normalize(table_html, table_text)
+        self.stats['table_html_chars'] += len(table_html or table_text)
+        self.stats['table_compact_chars'] += len(compact)
+        return compact
+    
+    def _prepare_image_payload(self, image_bytes: bytes, image_base64: str, mime_type: str) -> tuple:
+        """
+        Shrink an image for the LLM request if an optimizer is configured
         
         Returns:
-            AIParser object with structured summary
+            (base64 payload, payload MIME type)
         """
+        if self.image_optimizer is None:
+            return image_base64, mime_type
         
         try:
-            # Build prompt
-            prompt_text = f"""You are creating a searchable description for document content retrieval.
+            payload, payload_mime_type = self.image_optimizer.optimize(image_bytes, mime_type)
+        except Exception as e:
+            print(f"Could not optimize image payload, sending original: {e}")
+            payload, payload_mime_type = image_bytes, mime_type
+        
+        self.stats['image_bytes_original'] += len(image_bytes)
+        self.stats['image_bytes_sent'] += len(payload)
+        self.stats['image_bytes_saved'] += len(image_bytes) - len(payload)
+        if payload is image_bytes:
+            return image_base64, mime_type
+        
+        self.stats['images_optimized'] += 1
+        return base64.b64encode(payload).decode("ascii"), payload_mime_type
+    
+    def _build_summary_message(
+        self,
+        text: str,
+        tables: List[str],
+        images: List[str],
+        image_mime_types: Optional[List[str]] = None
+    ) -> HumanMessage:
+        """Build the multimodal summary prompt for a chunk"""
+        # Build prompt
+        prompt_text = f"""You are creating a searchable description for document content retrieval.
 YOUR TASK:
 Generate a comprehensive, searchable description that covers:
 
@@ -254,52 +411,546 @@ TEXT CONTENT:
 {text}
 
 """
-            if tables:
-                prompt_text += "TABLES:\n"
-                for i, table in enumerate(tables, 1):
-                    prompt_text += f"Table {i}:\n{table}\n\n"
-            
-            message_content = [{"type": "text", "text": prompt_text}]
+        if tables:
+            prompt_text += "TABLES:\n"
+            for i, table in enumerate(tables, 1):
+                prompt_text += f"Table {i}:\n{table}\n\n"
+        
+        message_content = [{"type": "text", "text": prompt_text}]
+        
+        for idx , img_b64 in enumerate(images,start=0):
+            mime_type = image_mime_types[idx] if image_mime_types else "image/jpeg"
+            message_content.append({
+                "type": "text", 
+                "text": f"Image {idx + 1}:"
+            })
+            message_content.append({
+                "type": "image_url",
+                "image_url": {"url": f"data:{mime_type};base64,{img_b64}"}
+            })
+        
+        return HumanMessage(content=message_content)
+    
+    async def create_ai_enhanced_summary_async(
+        self, 
+        text: str, 
+        tables: List[str], 
+        images: List[str],
+        api_key: str,
+        chunk_index: int,
+        image_mime_types: Optional[List[str]] = None
+    ) -> AIParser:
+        """
+        Create AI-enhanced summary asynchronously with specific API key
+        
+        Args:
+            text: Text content to summarize
+            tables: List of tables (compact markdown/CSV, or HTML)
+            images: List of base64 encoded images
+            api_key: Google API key to use
+            chunk_index: Index of chunk for logging
+            image_mime_types: MIME type of each image (JPEG if not given)
+        
+        Returns:
+            AIParser object with structured summary
             
-            for idx , img_b64 in enumerate(images,start=0):
-                message_content.append({
-                    "type": "text", 
-                    "text": f"Image {idx + 1}:"
-                })
-                message_content.append({
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/png;base64,{img_b64}"}
-                })
+        Raises:
+            Exception: Any API or parsing error (classified by RetryPolicy)
+        """
+        message = self._build_summary_message(text, tables, images, image_mime_types)
+        
+        # Get LLM for this specific API key
+        llm_structured = self._get_llm_for_key(api_key)
+        
+        # Make async API call
+        print(f"Chunk {chunk_index}: Sending to API (key #{self.api_keys.index(api_key) + 1})")
+        response = await llm_structured.ainvoke([message])
+        if response is None:
+            raise ValueError("Model returned no structured output")
+        print(f"Chunk {chunk_index}: Response received")
+        
+        return response
+    
+    @staticmethod
+    def fallback_summary(tables: List[str], images: List[str]) -> AIParser:
+        """Placeholder summary used when every attempt for a chunk failed"""
+        fallback_summary = f"[FALLBACK_SUMMARY]..."
+        if tables:
+            fallback_summary += f"\n[Contains {len(tables)} table(s)]"
+        if images:
+            fallback_summary += f"\n[Contains {len(images)} image(s)]"
+        
+        return AIParser(
+            question="Unable to generate questions due to processing error",
+            summary=fallback_summary,
+            image_interpretation=["***IMAGE SUMMARY FAILED***" for _ in images] if images else [],
+            table_interpretation=["***TABLE SUMMARY FAILED***" for _ in tables] if tables else []
+        )
+    
+    def _add_retry_latency(self, seconds: float) -> None:
+        self.stats['retry_latency_seconds'] = round(self.stats['retry_latency_seconds'] + seconds, 2)
+    
+    @staticmethod
+    def is_fallback(ai_response: AIParser) -> bool:
+        return ai_response.summary.startswith("[FALLBACK_SUMMARY]")
+    
+    async def _call_with_retries_async(
+        self,
+        label: str,
+        estimated_tokens: int,
+        request: Callable[[str], Awaitable]
+    ):
+        """
+        Run an LLM request, retrying classified errors with backoff and
+        failing over to other keys, within the per-chunk deadline
+        
+        The deadline starts with the first request: time spent queued for a
+        key before it (all chunks of a document are started at once) doesn't count.
+        
+        Args:
+            label: Log prefix (e.g. "Chunk 3")
+            estimated_tokens: Estimated input tokens for the key scheduler
+            request: Coroutine function taking the API key to use
             
-            message = HumanMessage(content=message_content)
+        Returns:
+            Request result, or None if every attempt failed
+        """
+        policy = self.retry_policy
+        first_call_start = None
+        attempt = 0
+        
+        try:
+            async with asyncio.timeout(None) as deadline:
+                while True:
+                    attempt += 1
+                    
+                    # Wait for the key with the most quota headroom
+                    async with self.key_scheduler.acquire(estimated_tokens) as api_key:
+                        call_start = time.monotonic()
+                        if first_call_start is None:
+                            first_call_start = call_start
+                            deadline.reschedule(asyncio.get_running_loop().time() + policy.chunk_deadline)
+                        self.stats['llm_calls'] += 1
+                        
+                        try:
+                            result = await request(api_key)
+                            error = None
+                        except Exception as e:
+                            error = e
+                    
+                    if error is None:
+                        self._add_retry_latency(call_start - first_call_start)
+                        self._llm_call_seconds += time.monotonic() - call_start
+                        self._llm_successes += 1
+                        return result
+                    
+                    category = RetryPolicy.classify(error)
+                    print(f"{label}: Attempt {attempt} failed ({category}) - {str(error)[:100]}")
+                    
+                    # Quota and credential errors: rest the key so the retry goes to another one
+                    cooldown = RetryPolicy.key_cooldown(error, category)
+                    if cooldown:
+                        self.key_scheduler.cooldown(api_key, cooldown)
+                        if len(self.api_keys) > 1:
+                            self.stats['failovers'] += 1
+                    
+                    retryable = RetryPolicy.is_retryable(category, self.key_scheduler.available_keys())
+                    if not retryable or attempt >= policy.max_attempts:
+                        break
+                    
+                    self.stats['retries'] += 1
+                    await policy.sleep(attempt)
+                    
+        except TimeoutError:
+            print(f"{label}: Deadline of {policy.chunk_deadline}s exceeded")
+            self.stats['deadline_exceeded'] += 1
+        
+        if first_call_start is not None:
+            self._add_retry_latency(time.monotonic() - first_call_start)
+        
+        return None
+    
+    async def _summarise_with_retries_async(self, chunk_index: int, content_data: Dict) -> AIParser:
+        """
+        Summarise one chunk with retries
+        
+        Args:
+            chunk_index: 1-based chunk index
+            content_data: Output of separate_content_types()
             
-            # Get LLM for this specific API key
-            llm_structured = self._get_llm_for_key(api_key)
+        Returns:
+            AIParser response, or a fallback summary if every attempt failed
+        """
+        ai_response = await self._call_with_retries_async(
+            f"Chunk {chunk_index}",
+            self.estimate_tokens(content_data),
+            lambda api_key: self.create_ai_enhanced_summary_async(
+                text=content_data['text'],
+                tables=content_data['tables'],
+                images=content_data['image_base64'],
+                api_key=api_key,
+                chunk_index=chunk_index,
+                image_mime_types=content_data.get('image_mime_types')
+            )
+        )
+        
+        if ai_response is None:
+            print(f"Chunk {chunk_index}: Using fallback summary")
+            self.stats['fallbacks'] += 1
+            return self.fallback_summary(content_data['tables'], content_data['image_base64'])
+        
+        return ai_response
+    
+    @staticmethod
+    def estimate_tokens(content_data: Dict) -> int:
+        """Estimate input tokens of the summary request for a chunk"""
+        characters = len(content_data['text']) + sum(len(table) for table in content_data['tables'])
+        return PROMPT_TOKENS + characters // CHARS_PER_TOKEN + IMAGE_TOKENS * len(content_data['image_base64'])
+    
+    def _build_batch_message(self, items: List[tuple]) -> HumanMessage:
+        """Build one summary prompt covering several text-only chunks"""
+        prompt_text = """You are creating searchable descriptions for document content retrieval.
+Each CHUNK below is a separate piece of content. For EACH chunk, generate a comprehensive,
+searchable description that covers:
+
+1. Key facts, numbers, and data points
+2. Main topics and concepts discussed
+3. Questions this content could answer
+4. Alternative search terms users might use
+
+Make it detailed and searchable - prioritize findability over brevity.
+Keep words similar to the original content for better search accuracy.
+Describe each chunk on its own; do not mix information between chunks.
+
+IMPORTANT: Return structured output with one result per chunk, each with these fields:
+- chunk_id: The id from the chunk header
+- question: All potential questions this chunk answers
+- summary: Comprehensive summary of all information in the chunk
+- image_interpretation: Empty list
+- table_interpretation: Empty list
+
+CHUNKS TO ANALYZE:
+"""
+        for chunk_index, content_data, _ in items:
+            prompt_text += f"\n=== CHUNK {chunk_index} ===\n{content_data['text']}\n"
+        
+        return HumanMessage(content=[{"type": "text", "text": prompt_text}])
+    
+    def _is_batchable(self, content_data: Dict) -> bool:
+        """Small text-only chunks can share a request"""
+        return (
+            self.batch_max_chunks > 1
+            and not content_data['tables']
+            and not content_data['image_base64']
+            and self.estimate_tokens(content_data) - PROMPT_TOKENS <= self.batch_chunk_max_tokens
+        )
+    
+    async def _summarise_batched_async(self, chunk_index: int, content_data: Dict) -> AIParser:
+        """
+        Add a chunk to the open batch and wait for its result
+        
+        The batch is sent when it reaches batch_max_chunks or the token budget,
+        when every registered batch producer waits on a batch (no other chunk
+        can join it), or when no chunk has joined it for batch_linger_seconds.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        self._batch.append((chunk_index, content_data, future))
+        self._batch_tokens += self.estimate_tokens(content_data) - PROMPT_TOKENS
+        
+        if len(self._batch) >= self.batch_max_chunks or self._batch_tokens >= self.batch_token_budget:
+            self._flush_batch()
+        else:
+            if self._batch_timer is not None:
+                self._batch_timer.cancel()
+            self._batch_timer = loop.call_later(self.batch_linger_seconds, self._flush_batch)
+            # Checked once producers started in the same step (e.g. by gather) had their turn
+            loop.call_soon(self._flush_if_all_joined)
+        
+        self._batch_waiters += 1
+        try:
+            return await future
+        finally:
+            self._batch_waiters -= 1
+    
+    def _flush_if_all_joined(self) -> None:
+        """Send the open batch if no producer is left to join it"""
+        if self._batch and self._batch_waiters >= self._batch_producers:
+            self._flush_batch()
+    
+    @contextmanager
+    def batch_producer(self):
+        """
+        Register the caller as a batch producer while it summarises chunks
+        
+        Concurrent callers of summarise_chunk_async (pipeline workers, gathered
+        chunks) register so open batches are sent as soon as all of them wait
+        on one, instead of lingering for chunks that cannot arrive.
+        """
+        self._batch_producers += 1
+        try:
+            yield
+        finally:
+            self._batch_producers -= 1
+            if self._batch:
+                asyncio.get_running_loop().call_soon(self._flush_if_all_joined)
+    
+    async def _produce_summary(self, chunk_index: int, content_data: Dict) -> AIParser:
+        """Summarise one chunk as its own batch producer"""
+        with self.batch_producer():
+            return await self.summarise_chunk_async(chunk_index, content_data)
+    
+    def _flush_batch(self) -> None:
+        """Send the open batch"""
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        
+        items, self._batch, self._batch_tokens = self._batch, [], 0
+        if not items:
+            return
+        
+        task = asyncio.get_running_loop().create_task(self._run_batch(items))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _run_batch(self, items: List[tuple]) -> None:
+        """
+        Summarise a batch and resolve each chunk's future
+        
+        Errors go to the waiting chunks only: nobody awaits this task itself.
+        """
+        try:
+            results = await self._summarise_batch_items(items)
+        except asyncio.CancelledError:
+            for _, _, future in items:
+                future.cancel()
+            return
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for chunk_index, _, future in items:
+            if not future.done():
+                future.set_result(results[chunk_index])
+    
+    async def _summarise_batch_items(self, items: List[tuple]) -> Dict[int, AIParser]:
+        """
+        Summarise batch items in one request
+        
+        Returns:
+            Mapping of chunk index to AIParser response
+        """
+        results = {}
+        
+        if len(items) > 1:
+            chunk_ids = [chunk_index for chunk_index, _, _ in items]
+            print(f"Chunks {chunk_ids}: Sending as one batched request")
             
-            # Make async API call
-            print(f"Chunk {chunk_index}: Sending to API (key #{self.api_keys.index(api_key) + 1})")
-            response = await llm_structured.ainvoke([message])
-            print(f"Chunk {chunk_index}: Response received")
+            message = self._build_batch_message(items)
+            estimated_tokens = PROMPT_TOKENS + sum(
+                self.estimate_tokens(content_data) - PROMPT_TOKENS for _, content_data, _ in items
+            )
             
-            return response
-                
-        except Exception as e:
-            # Return fallback on any error
-            print(f"Chunk {chunk_index}: Error - {str(e)[:100]}")
-            print(f"Chunk {chunk_index}: Using fallback summary")
+            async def request(api_key: str):
+                response = await self._get_llm_for_key(api_key, AIBatchParser).ainvoke([message])
+                if response is None:
+                    raise ValueError("Model returned no structured output")
+                return response
             
-            fallback_summary = f"[FALLBACK_SUMMARY]..."
-            if tables:
-                fallback_summary += f"\n[Contains {len(tables)} table(s)]"
-            if images:
-                fallback_summary += f"\n[Contains {len(images)} image(s)]"
+            batch_response = await self._call_with_retries_async(
+                f"Chunks {chunk_ids}", estimated_tokens, request
+            )
+            if batch_response is not None:
+                self.stats['batch_calls'] += 1
+                for item in batch_response.results:
+                    if item.chunk_id in chunk_ids and item.chunk_id not in results:
+                        results[item.chunk_id] = AIParser(**item.model_dump(exclude={'chunk_id'}))
+                self.stats['batched_chunks'] += len(results)
+        
+        # Chunks missing from the batch response are summarised on their own
+        missing = [(chunk_index, content_data) for chunk_index, content_data, _ in items if chunk_index not in results]
+        responses = await asyncio.gather(*[
+            self._summarise_with_retries_async(chunk_index, content_data)
+            for chunk_index, content_data in missing
+        ])
+        results.update(zip([chunk_index for chunk_index, _ in missing], responses))
+        
+        return results
+    
+    async def summarise_chunk_async(self, chunk_index: int, content_data: Dict) -> AIParser:
+        """
+        Create AI summary for one extracted chunk (journaled, cached, rate limited and retried)
+        
+        Args:
+            chunk_index: 1-based chunk index
+            content_data: Output of separate_content_types()
             
-            return AIParser(
-                question="Unable to generate questions due to processing error",
-                summary=fallback_summary,
-                image_interpretation=["***IMAGE SUMMARY FAILED***" for _ in images] if images else [],
-                table_interpretation=["***TABLE SUMMARY FAILED***" for _ in tables] if tables else []
+        Returns:
+            AIParser response
+        """
+        content_hash = None
+        if self.journal is not None:
+            content_hash = JobJournal.content_hash(content_data)
+            recorded = await asyncio.to_thread(self.journal.get_summary, chunk_index, content_hash)
+            if recorded is not None:
+                print(f"Chunk {chunk_index}: Summary restored from job journal")
+                self.stats['tier_journal'] += 1
+                ai_response = AIParser(**recorded)
+                self._publish_interpretations(content_data, ai_response)
+                return ai_response
+        
+        ai_response = await self._summarise_chunk(chunk_index, content_data)
+        
+        if content_hash is not None and not self.is_fallback(ai_response):
+            await asyncio.to_thread(
+                self.journal.record_summary, chunk_index, content_hash, ai_response.model_dump()
             )
+        
+        return ai_response
+    
+    async def _summarise_chunk(self, chunk_index: int, content_data: Dict) -> AIParser:
+        """Summarise a chunk from the summary cache, the local tier or the LLM"""
+        cache_key = None
+        if self.summary_cache is not None:
+            cache_key = SummaryCache.make_key(
+                content_data['text'],
+                content_data['tables'],
+                [BlobStore.ref_hash(image_ref) for image_ref in content_data['image_refs_sent']],
+                self.model_name,
+                self.temperature,
+                PROMPT_VERSION
+            )
+            cached = await asyncio.to_thread(self.summary_cache.get, cache_key)
+            if cached is not None:
+                print(f"Chunk {chunk_index}: Summary cache hit")
+                self.stats['tier_cache'] += 1
+                return await self._merge_image_interpretations(content_data, AIParser(**cached))
+        
+        # Local summaries are cheap to rebuild, so they are not cached
+        if self.extractive_summarizer is not None and self.extractive_summarizer.accepts(content_data):
+            return self._summarise_locally(chunk_index, content_data)
+        
+        if self._is_batchable(content_data):
+            self.stats['tier_batched'] += 1
+            ai_response = await self._summarise_batched_async(chunk_index, content_data)
+        else:
+            self.stats['tier_llm'] += 1
+            ai_response = await self._summarise_with_retries_async(chunk_index, content_data)
+        
+        # Don't cache fallback summaries so the chunk is retried next time
+        if cache_key is not None and not self.is_fallback(ai_response):
+            await asyncio.to_thread(self.summary_cache.put, cache_key, ai_response.model_dump(), self.model_name)
+        
+        return await self._merge_image_interpretations(content_data, ai_response)
+    
+    def _summarise_locally(self, chunk_index: int, content_data: Dict) -> AIParser:
+        """Summarise a low-value chunk with the extractive summarizer instead of the LLM"""
+        start = time.monotonic()
+        result = self.extractive_summarizer.summarise(content_data['text'])
+        elapsed = time.monotonic() - start
+        
+        # Time saved is estimated from the mean duration of successful LLM calls
+        llm_seconds = (
+            self._llm_call_seconds / self._llm_successes if self._llm_successes else DEFAULT_LLM_CALL_SECONDS
+        )
+        self.stats['tier_local'] += 1
+        self.stats['local_seconds'] = round(self.stats['local_seconds'] + elapsed, 3)
+        self.stats['local_time_saved_seconds'] = round(
+            self.stats['local_time_saved_seconds'] + max(0.0, llm_seconds - elapsed), 2
+        )
+        print(f"Chunk {chunk_index}: Summarised locally (keywords: {', '.join(result['keywords'][:5])})")
+        
+        return AIParser(
+            question=result['question'],
+            summary=result['summary'],
+            image_interpretation=[],
+            table_interpretation=[]
+        )
+    
+    def _claim_image(self, image_ref: str) -> bool:
+        """Return True if this chunk should send the image to the LLM"""
+        if self.image_dedup is None:
+            return True
+        if image_ref in self._claimed_images or self.image_dedup.get_interpretation(image_ref):
+            return False
+        self._claimed_images.add(image_ref)
+        return True
+    
+    def _interpretation_future(self, image_ref: str) -> asyncio.Future:
+        if image_ref not in self._interpretation_futures:
+            self._interpretation_futures[image_ref] = asyncio.get_running_loop().create_future()
+        return self._interpretation_futures[image_ref]
+    
+    def _publish_interpretations(self, content_data: Dict, ai_response: AIParser) -> None:
+        """
+        Share the interpretations of images this chunk claimed, taken from a
+        final (merged) response, with chunks waiting to reuse them
+        """
+        if self.image_dedup is None:
+            return
+        
+        image_refs = [Path(image_path).name for image_path in content_data['images_dirpath']]
+        for image_ref in content_data['image_refs_sent']:
+            position = image_refs.index(image_ref)
+            if position < len(ai_response.image_interpretation):
+                interpretation = ai_response.image_interpretation[position]
+            else:
+                interpretation = "***IMAGE SUMMARY FAILED***"
+            
+            if "SUMMARY FAILED" not in interpretation:
+                self.image_dedup.set_interpretation(image_ref, interpretation)
+            future = self._interpretation_future(image_ref)
+            if not future.done():
+                future.set_result(interpretation)
+    
+    async def _merge_image_interpretations(self, content_data: Dict, ai_response: AIParser) -> AIParser:
+        """
+        Build the image interpretation list for all images in the chunk,
+        taking reused interpretations from the dedup index or from the chunk
+        that sent the image to the LLM
+        
+        Args:
+            content_data: Output of separate_content_types()
+            ai_response: AI summary covering the images that were sent
+            
+        Returns:
+            AIParser with image_interpretation matching images_dirpath
+        """
+        interpretations = {}
+        for i, image_ref in enumerate(content_data['image_refs_sent']):
+            if i < len(ai_response.image_interpretation):
+                interpretation = ai_response.image_interpretation[i]
+            else:
+                interpretation = "***IMAGE SUMMARY FAILED***"
+            interpretations[image_ref] = interpretation
+            
+            if self.image_dedup is not None:
+                if "SUMMARY FAILED" not in interpretation:
+                    self.image_dedup.set_interpretation(image_ref, interpretation)
+                future = self._interpretation_future(image_ref)
+                if not future.done():
+                    future.set_result(interpretation)
+        
+        merged = []
+        for image_path in content_data['images_dirpath']:
+            image_ref = Path(image_path).name
+            if image_ref in interpretations:
+                merged.append(interpretations[image_ref])
+                continue
+            
+            # Duplicate of an image interpreted elsewhere
+            interpretation = self.image_dedup.get_interpretation(image_ref)
+            if interpretation is None:
+                interpretation = await self._interpretation_future(image_ref)
+            merged.append(interpretation)
+            self.image_dedup.record_reuse()
+        
+        ai_response.image_interpretation = merged
+        return ai_response
     
     async def process_chunks_async(self, chunks_data: List[Dict]) -> List[AIParser]:
         """
@@ -311,50 +962,139 @@ TEXT CONTENT:
         Returns:
             List of AIParser responses
         """
-        tasks = []
-        
-        # Create async tasks for each chunk with corresponding API key
-        for i, chunk_data in enumerate(chunks_data):
-            # Use modulo to cycle through API keys if we have more chunks than keys
-            api_key_index = i % len(self.api_keys)
-            api_key = self.api_keys[api_key_index]
-            
-            task = self.create_ai_enhanced_summary_async(
-                text=chunk_data['text'],
-                tables=chunk_data['tables'],
-                images=chunk_data['image_base64'],
-                api_key=api_key,
-                chunk_index=i + 1
-            )
-            tasks.append(task)
+        # Create async tasks for each chunk (the key scheduler paces the API calls)
+        tasks = [
+            self._produce_summary(i, chunk_data)
+            for i, chunk_data in enumerate(chunks_data, 1)
+        ]
         
         # Run all tasks concurrently
-        print(f"\nProcessing {len(tasks)} chunks asynchronously with {min(len(tasks), len(self.api_keys))} API keys...")
+        print(f"\nProcessing {len(tasks)} chunks asynchronously with {len(self.api_keys)} API keys...")
         responses = await asyncio.gather(*tasks)
+        
+        # Give chunks that still failed one more pass now that quotas have recovered
+        failed = {
+            i: chunk_data
+            for i, (chunk_data, response) in enumerate(zip(chunks_data, responses), 1)
+            if self.is_fallback(response)
+        }
+        if failed and self.requeue_failed:
+            for i, response in (await self.requeue_failed_async(failed)).items():
+                responses[i - 1] = response
+        
         print(f"All {len(responses)} chunks processed!\n")
         
         return responses
     
-    def summarise_chunks(self, chunks) -> List[Document]:
+    async def requeue_failed_async(self, failed_chunks: Dict[int, Dict]) -> Dict[int, AIParser]:
         """
-        Process all chunks with AI Summaries using multiple API keys asynchronously.
+        Retry chunks that ended with a fallback summary
         
         Args:
-            chunks: List of document chunks to process
+            failed_chunks: Mapping of chunk index to content data
             
         Returns:
-            List of LangChain Documents with enhanced summaries
+            Mapping of chunk index to recovered AIParser response
         """
-        print("Processing chunks with AI Summaries (Multi-API Async Mode)...")
+        print(f"\nRe-queueing {len(failed_chunks)} failed chunk(s)...")
+        self.stats['requeued'] += len(failed_chunks)
+        # Failures of the re-queue pass are counted again below
+        self.stats['fallbacks'] -= len(failed_chunks)
+        
+        responses = await asyncio.gather(*[
+            self._produce_summary(chunk_index, content_data)
+            for chunk_index, content_data in failed_chunks.items()
+        ])
         
-        # Clean entire workspace before processing
-        from config.settings import settings
-        self.clean_directory(settings.DATA_DIR)
+        recovered = {
+            chunk_index: response
+            for chunk_index, response in zip(failed_chunks, responses)
+            if not self.is_fallback(response)
+        }
+        self.stats['recovered'] += len(recovered)
+        print(f"Recovered {len(recovered)} of {len(failed_chunks)} failed chunk(s)")
         
+        return recovered
+    
+    def build_document(self, idx: int, content_data: Dict, ai_response: AIParser) -> Document:
+        """
+        Create LangChain document from extracted content and AI summary
+        
+        Args:
+            idx: 1-based chunk index
+            content_data: Output of separate_content_types()
+            ai_response: AI summary for the chunk
+            
+        Returns:
+            LangChain Document with combined searchable content and metadata
+        """
+        # Create combined searchable content
+        # Prepare image analysis text as string with image path and interpretation
+        # For images
+        img_analysis_text = "\n".join(
+            [f"Image Path {content_data['images_dirpath'][i]} : {ai_response.image_interpretation[i]}" 
+            for i in range(len(ai_response.image_interpretation))]
+        ) if ai_response.image_interpretation else "No images present"
+
+        # For tables
+        table_analysis_text = "\n".join(
+            [f"Table index {i} : {ai_response.table_interpretation[i]}"
+            for i in range(len(ai_response.table_interpretation))]
+        ) if ai_response.table_interpretation else "No tables present"
+
+        # Table contents in compact form
+        table_data_text = "\n\n".join(
+            [f"Table index {i} :\n{table}" for i, table in enumerate(content_data['tables'])]
+        ) if content_data['tables'] else "No tables present"
+
+
+        combined_content = f"""QUESTIONS: {ai_response.question}
+SUMMARY: {ai_response.summary}
+IMAGE ANALYSIS: {img_analysis_text}
+TABLE ANALYSIS: {table_analysis_text}
+TABLE DATA: {table_data_text}
+ORIGINAL TEXT: {content_data['text']}"""
+        
+        print(f"Document {idx}: {ai_response.summary[:100]}...")
+        
+        # Create LangChain Document with metadata
+        return Document(
+            page_content=combined_content,
+            metadata={
+                "chunk_index": idx,
+                "original_text": content_data['text'],
+                "tables": content_data['tables'],
+                "table_html_refs": content_data.get('table_html_refs', []),
+                "ai_questions": ai_response.question,
+                "ai_summary": ai_response.summary,
+                "image_interpretation": ai_response.image_interpretation,
+                "table_interpretation": ai_response.table_interpretation,
+                "image_paths": content_data['images_dirpath'],
+                "page_numbers": content_data['page_no'],
+                "content_types": content_data['types'],
+            }
+        )
+    
+    def summarise_chunks(self, chunks) -> List[Document]:
+        """
+        Synchronous wrapper of summarise_chunks_async for scripts (not for use
+        inside a running event loop)
+        """
+        return asyncio.run(self.summarise_chunks_async(chunks))
+    
+    def extract_chunks(self, chunks) -> List[Dict]:
+        """
+        Extract content from all chunks (blocking: image decoding and file writes)
+        
+        Args:
+            chunks: List of document chunks
+            
+        Returns:
+            List of separate_content_types() results
+        """
         total_chunks = len(chunks)
         image_counter = {'count': 1}
         
-        # Step 1: Extract content from all chunks (synchronous)
         print(f"\nExtracting content from {total_chunks} chunks...")
         chunks_data = []
         
@@ -376,61 +1116,43 @@ TEXT CONTENT:
         print(f"\nContent extraction complete!")
         print(f"Total images saved: {image_counter['count'] - 1}")
         
+        return chunks_data
+    
+    async def summarise_chunks_async(self, chunks) -> List[Document]:
+        """
+        Process all chunks with AI Summaries using multiple API keys asynchronously.
+        
+        Runs on the caller's event loop, so concurrent documents share the key
+        scheduler, client pool and caches; blocking work is done in threads.
+        
+        Args:
+            chunks: List of document chunks to process
+            
+        Returns:
+            List of LangChain Documents with enhanced summaries
+        """
+        print("Processing chunks with AI Summaries (Multi-API Async Mode)...")
+        
+        # Step 1: Extract content from all chunks
+        chunks_data = await asyncio.to_thread(self.extract_chunks, chunks)
+        total_chunks = len(chunks_data)
+        
         # Step 2: Process all chunks asynchronously with different API keys
         print(f"\nStarting async AI processing...")
         print(f"Using {len(self.api_keys)} API key(s)")
         print(f"Processing {total_chunks} chunk(s)")
         
-        # Run async processing
-        ai_responses = asyncio.run(self.process_chunks_async(chunks_data))
+        ai_responses = await self.process_chunks_async(chunks_data)
         
         # Step 3: Create LangChain documents
         print(f"\nCreating LangChain documents...")
-        langchain_documents = []
+        langchain_documents = [
+            self.build_document(idx, content_data, ai_response)
+            for idx, (content_data, ai_response) in enumerate(zip(chunks_data, ai_responses), 1)
+        ]
         
-        for idx, (content_data, ai_response) in enumerate(zip(chunks_data, ai_responses), 1):
-            # Create combined searchable content
-            # Prepare image analysis text as string with image path and interpretation
-            # For images
-            img_analysis_text = "\n".join(
-                [f"Image Path {content_data['images_dirpath'][i]} : {ai_response.image_interpretation[i]}" 
-                for i in range(len(ai_response.image_interpretation))]
-            ) if ai_response.image_interpretation else "No images present"
-
-            # For tables
-            table_analysis_text = "\n".join(
-                [f"Table index {i} : {ai_response.table_interpretation[i]}"
-                for i in range(len(ai_response.table_interpretation))]
-            ) if ai_response.table_interpretation else "No tables present"
-
-
-            combined_content = f"""QUESTIONS: {ai_response.question}
-SUMMARY: {ai_response.summary}
-IMAGE ANALYSIS: {img_analysis_text}
-TABLE ANALYSIS: {table_analysis_text}
-ORIGINAL TEXT: {content_data['text']}"""
-            
-            print(f"Document {i}: {ai_response.summary[:100]}...")
-            
-            # Create LangChain Document with metadata
-            doc = Document(
-                page_content=combined_content,
-                metadata={
-                    "chunk_index": idx,
-                    "original_text": content_data['text'],
-                    "raw_tables_html": content_data['tables'],
-                    "ai_questions": ai_response.question,
-                    "ai_summary": ai_response.summary,
-                    "image_interpretation": ai_response.image_interpretation,
-                    "table_interpretation": ai_response.table_interpretation,
-                    "image_paths": content_data['images_dirpath'],
-                    "image_base64": content_data['image_base64'],
-                    "page_numbers": content_data['page_no'],
-                    "content_types": content_data['types'],
-                }
-            )
-            
-            langchain_documents.append(doc)
+        if self.image_dedup is not None:
+            await asyncio.to_thread(self.image_dedup.save)
         
         print(f"\nSuccessfully processed {len(langchain_documents)} chunks")
         print(f"Used async processing with {len(self.api_keys)} API key(s)")
@@ -1,8 +1,16 @@
 """Document parsing module using unstructured library"""
+import multiprocessing
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+from pypdf import PdfReader, PdfWriter
+from unstructured.chunking.title import chunk_by_title
 from unstructured.partition.pdf import partition_pdf
+from core.page_classifier import PageClassifier
+from core.parse_cache import ParseCache
+from core.parser_pool import ParserWorkerPool
 
 
 # Supported OCR languages mapping
@@ -34,11 +42,80 @@ SUPPORTED_LANGUAGES = {
 }
 
 
+def partition_page_range(file_path: str, first_page: int, last_page: int, partition_kwargs: dict) -> list:
+    """
+    Partition a page range of a PDF (runs inside a worker process).
+    
+    The pages are copied into a temporary PDF and partitioned with
+    starting_page_number set, so page numbers and element IDs match a
+    whole-file parse. unstructured links parent_id within a page only, so
+    those match as well.
+    
+    Args:
+        file_path: Path to the source PDF file
+        first_page: First page of the range (1-based, inclusive)
+        last_page: Last page of the range (1-based, inclusive)
+        partition_kwargs: Keyword arguments for partition_pdf (without chunking)
+        
+    Returns:
+        List of un-chunked elements for the page range
+    """
+    reader = PdfReader(file_path)
+    writer = PdfWriter()
+    for page_index in range(first_page - 1, last_page):
+        writer.add_page(reader.pages[page_index])
+    
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as shard_file:
+        writer.write(shard_file)
+        shard_path = shard_file.name
+    
+    try:
+        # Element IDs hash the filename, so the shard is partitioned under the source name
+        elements = partition_pdf(
+            filename=shard_path,
+            starting_page_number=first_page,
+            metadata_filename=os.path.basename(file_path),
+            **partition_kwargs
+        )
+    finally:
+        os.remove(shard_path)
+    
+    # Point metadata back at the source file instead of the temporary shard
+    for element in elements:
+        element.metadata.filename = os.path.basename(file_path)
+        element.metadata.file_directory = os.path.dirname(file_path)
+    
+    print(f"Partitioned pages {first_page}-{last_page}: {len(elements)} elements")
+    return elements
+
+
 class DocumentParser:
     """Handles PDF document parsing and chunking"""
     
-    def __init__(self, image_output_dir: str):
+    def __init__(
+        self,
+        image_output_dir: str,
+        shard_pages: int = 0,
+        max_workers: int = 1,
+        page_classifier: Optional[PageClassifier] = None,
+        parse_cache: Optional[ParseCache] = None,
+        worker_pool: Optional[ParserWorkerPool] = None
+    ):
+        """
+        Args:
+            image_output_dir: Directory for extracted images
+            shard_pages: Pages per shard in sharded mode (0 disables sharding)
+            max_workers: Worker processes used in sharded mode
+            page_classifier: Routes text-layer pages to the fast strategy when given
+            parse_cache: Reuses partition results for identical PDFs and parameters when given
+            worker_pool: Runs partition jobs on persistent warm workers when given
+        """
         self.image_output_dir = image_output_dir
+        self.shard_pages = shard_pages
+        self.max_workers = max_workers
+        self.page_classifier = page_classifier
+        self.parse_cache = parse_cache
+        self.worker_pool = worker_pool
         Path(image_output_dir).mkdir(parents=True, exist_ok=True)
     
     @staticmethod
@@ -76,6 +153,222 @@ class DocumentParser:
         
         return codes
     
+    @staticmethod
+    def get_page_count(file_path: str) -> int:
+        """Return number of pages in a PDF file"""
+        return len(PdfReader(file_path).pages)
+    
+    @staticmethod
+    def get_page_ranges(page_count: int, shard_pages: int) -> List[Tuple[int, int]]:
+        """
+        Split pages into consecutive shards
+        
+        Args:
+            page_count: Total number of pages
+            shard_pages: Number of pages per shard
+            
+        Returns:
+            List of (first_page, last_page) tuples, 1-based and inclusive
+        """
+        return [
+            (first_page, min(first_page + shard_pages - 1, page_count))
+            for first_page in range(1, page_count + 1, shard_pages)
+        ]
+    
+    def iter_partition_ranges(self, file_path: str, range_jobs: List[Tuple[int, int, dict]]) -> Iterator[list]:
+        """
+        Partition page ranges, in parallel worker processes when configured.
+        
+        Args:
+            file_path: Path to the PDF file
+            range_jobs: List of (first_page, last_page, partition_kwargs) tuples
+            
+        Yields:
+            Un-chunked elements of each range, in page order
+        """
+        if self.worker_pool is not None and self.worker_pool.is_running:
+            futures = [
+                self.worker_pool.submit(partition_page_range, file_path, first, last, kwargs)
+                for first, last, kwargs in range_jobs
+            ]
+            print(f"Queued {len(futures)} page range(s) on parser pool "
+                  f"(queue depth {self.worker_pool.get_queue_depth()})")
+            for future in futures:
+                yield future.result()
+            return
+        
+        workers = min(self.max_workers, len(range_jobs))
+        
+        if workers <= 1:
+            for first, last, kwargs in range_jobs:
+                yield partition_page_range(file_path, first, last, kwargs)
+            return
+        
+        print(f"Sharded mode: {len(range_jobs)} page ranges on {workers} workers")
+        # Spawned workers don't inherit the server's threads, locks or model state (as in ParserWorkerPool)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            # map() yields results in submission order, i.e. page order
+            yield from executor.map(
+                partition_page_range,
+                [file_path] * len(range_jobs),
+                [first for first, _, _ in range_jobs],
+                [last for _, last, _ in range_jobs],
+                [kwargs for _, _, kwargs in range_jobs]
+            )
+    
+    def partition_ranges(self, file_path: str, range_jobs: List[Tuple[int, int, dict]]) -> list:
+        """
+        Partition page ranges and merge the elements in page order
+        
+        Args:
+            file_path: Path to the PDF file
+            range_jobs: List of (first_page, last_page, partition_kwargs) tuples
+            
+        Returns:
+            Un-chunked elements of all ranges
+        """
+        return [
+            element
+            for range_elements in self.iter_partition_ranges(file_path, range_jobs)
+            for element in range_elements
+        ]
+    
+    def _prepare_partition(
+        self,
+        file_path: str,
+        max_characters: int,
+        new_after_n_chars: int,
+        combine_text_under_n_chars: int,
+        extract_images: bool,
+        extract_tables: bool,
+        languages: List[str]
+    ) -> dict:
+        """
+        Validate inputs and build partition, chunking and cache parameters
+        
+        Returns:
+            Dict with language_codes, cache_key, partition_kwargs, fast_kwargs and chunk_kwargs
+        """
+        # Validate file
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"PDF file not found: {file_path}")
+        
+        # Validate chunk parameters
+        if max_characters >= new_after_n_chars:
+            raise ValueError("max_characters must be less than new_after_n_chars")
+        
+        # Convert language names to codes
+        language_codes = self.get_language_codes(languages)
+        
+        print(f"Partitioning document: {file_path}")
+        print(f"Settings: Images={extract_images}, Tables={extract_tables}, Languages={language_codes}")
+        print(f"Chunk settings: max={max_characters}, new_after={new_after_n_chars}, combine={combine_text_under_n_chars}")
+        
+        cache_key = None
+        if self.parse_cache is not None:
+            cache_key = ParseCache.make_key(
+                ParseCache.hash_file(file_path),
+                {
+                    "max_characters": max_characters,
+                    "new_after_n_chars": new_after_n_chars,
+                    "combine_text_under_n_chars": combine_text_under_n_chars,
+                    "extract_images": extract_images,
+                    "extract_tables": extract_tables,
+                    "languages": language_codes,
+                    "page_routing": [
+                        self.page_classifier.min_text_chars,
+                        self.page_classifier.min_graphics_objects,
+                        self.page_classifier.min_table_rules
+                    ] if self.page_classifier is not None else None
+                }
+            )
+        
+        return {
+            "language_codes": language_codes,
+            "cache_key": cache_key,
+            "partition_kwargs": dict(
+                strategy="hi_res",
+                hi_res_model_name="yolox",
+                languages=language_codes,
+                extract_images_in_pdf=extract_images,
+                # Images stay in the element payload; ContentProcessor writes each one once
+                extract_image_block_to_payload=extract_images,
+                extract_image_block_types=["Image"] if extract_images else [],
+                infer_table_structure=extract_tables,
+            ),
+            # Text-layer pages skip layout detection and OCR
+            "fast_kwargs": dict(
+                strategy="fast",
+                languages=language_codes,
+            ),
+            "chunk_kwargs": dict(
+                include_orig_elements=True,
+                max_characters=max_characters,
+                new_after_n_chars=new_after_n_chars,
+                combine_text_under_n_chars=combine_text_under_n_chars,
+            ),
+        }
+    
+    def _get_range_jobs(
+        self,
+        file_path: str,
+        plan: dict,
+        extract_images: bool,
+        extract_tables: bool,
+        max_pages: int
+    ) -> Optional[List[Tuple[int, int, dict]]]:
+        """
+        Decide how to split the document into page-range partition jobs
+        
+        Args:
+            file_path: Path to the PDF file
+            plan: Output of _prepare_partition()
+            extract_images: Whether to extract images
+            extract_tables: Whether to infer table structure
+            max_pages: Maximum pages per range (0 for no limit)
+            
+        Returns:
+            List of (first_page, last_page, partition_kwargs) tuples,
+            or None to partition the whole file with a single partition_pdf call
+        """
+        partition_kwargs = plan["partition_kwargs"]
+        range_jobs = None
+        
+        if self.page_classifier is not None:
+            pages = self.page_classifier.classify(file_path, extract_images, extract_tables)
+            fast_pages = sum(1 for page in pages if page['strategy'] == "fast")
+            print(f"Page routing: {fast_pages} fast, {len(pages) - fast_pages} hi_res of {len(pages)} pages")
+            
+            range_jobs = [
+                (first, last, plan["fast_kwargs"] if strategy == "fast" else partition_kwargs)
+                for first, last, strategy in PageClassifier.group_pages(pages, max_pages)
+            ]
+            if len(range_jobs) == 1 and range_jobs[0][2] is partition_kwargs:
+                # Every page needs hi_res: parse the file directly
+                range_jobs = None
+        elif max_pages > 0:
+            page_count = self.get_page_count(file_path)
+            if page_count > max_pages:
+                range_jobs = [
+                    (first, last, partition_kwargs)
+                    for first, last in self.get_page_ranges(page_count, max_pages)
+                ]
+        
+        if not range_jobs and self.worker_pool is not None and self.worker_pool.is_running:
+            # Run the whole file as one job on a warm worker
+            range_jobs = [(1, self.get_page_count(file_path), partition_kwargs)]
+        
+        return range_jobs
+    
+    @staticmethod
+    def _print_breakdown(elements: list) -> None:
+        """Print element count by type"""
+        element_types = {}
+        for elem in elements:
+            elem_type = type(elem).__name__
+            element_types[elem_type] = element_types.get(elem_type, 0) + 1
+        print(f"Element breakdown: {dict(element_types)}")
+    
     def partition_pdf_document(
         self,
         file_path: str,
@@ -101,45 +394,140 @@ class DocumentParser:
         Returns:
             List of extracted elements
         """
-        # Validate file
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"PDF file not found: {file_path}")
+        plan = self._prepare_partition(
+            file_path, max_characters, new_after_n_chars, combine_text_under_n_chars,
+            extract_images, extract_tables, languages
+        )
         
-        # Validate chunk parameters
-        if max_characters >= new_after_n_chars:
-            raise ValueError("max_characters must be less than new_after_n_chars")
+        cache_key = plan["cache_key"]
+        if cache_key is not None:
+            elements = self.parse_cache.get(cache_key)
+            if elements is not None:
+                print(f"Loaded {len(elements)} elements from parse cache")
+                return elements
         
-        # Convert language names to codes
-        language_codes = self.get_language_codes(languages)
+        max_pages = self.shard_pages if self.max_workers > 1 else 0
+        range_jobs = self._get_range_jobs(file_path, plan, extract_images, extract_tables, max_pages)
         
-        print(f"Partitioning document: {file_path}")
-        print(f"Settings: Images={extract_images}, Tables={extract_tables}, Languages={language_codes}")
-        print(f"Chunk settings: max={max_characters}, new_after={new_after_n_chars}, combine={combine_text_under_n_chars}")
-
-        elements = partition_pdf(
-            filename=file_path,
-            strategy="hi_res",
-            hi_res_model_name="yolox",
-            chunking_strategy="by_title",
-            include_orig_elements=True,
-            languages=language_codes,
-            extract_images_in_pdf=extract_images,
-            extract_image_block_to_payload=extract_images,
-            extract_image_block_output_dir=self.image_output_dir if extract_images else None,
-            extract_image_block_types=["Image"] if extract_images else [],
-            infer_table_structure=extract_tables,
-            max_characters=max_characters,
-            new_after_n_chars=new_after_n_chars,
-            combine_text_under_n_chars=combine_text_under_n_chars,
+        if range_jobs:
+            # Partition page ranges, then chunk the merged elements
+            # exactly as partition_pdf(chunking_strategy="by_title") would
+            raw_elements = self.partition_ranges(file_path, range_jobs)
+            elements = chunk_by_title(raw_elements, **plan["chunk_kwargs"])
+        else:
+            elements = partition_pdf(
+                filename=file_path,
+                chunking_strategy="by_title",
+                **plan["partition_kwargs"],
+                **plan["chunk_kwargs"]
+            )
+        
+        print(f"Extracted {len(elements)} elements")
+        
+        if cache_key is not None:
+            self.parse_cache.put(cache_key, elements)
+        
+        self._print_breakdown(elements)
+        
+        return elements
+    
+    @staticmethod
+    def _split_final_chunks(chunks: list) -> Tuple[list, list]:
+        """
+        Split chunks into those that cannot change and the trailing elements to re-chunk.
+        
+        by_title decides chunk boundaries left to right, so once more elements
+        are appended only the last chunk can still grow or be combined. Chunks
+        split from the same oversized element (e.g. a long table) stay together.
+        
+        Returns:
+            (final_chunks, carry_elements)
+        """
+        if not chunks:
+            return [], []
+        
+        start = len(chunks) - 1
+        while start > 0:
+            current_ids = {id(e) for e in chunks[start].metadata.orig_elements or []}
+            previous_ids = {id(e) for e in chunks[start - 1].metadata.orig_elements or []}
+            if not current_ids & previous_ids:
+                break
+            start -= 1
+        
+        carry_elements = []
+        seen = set()
+        for chunk in chunks[start:]:
+            for element in chunk.metadata.orig_elements or []:
+                if id(element) not in seen:
+                    seen.add(id(element))
+                    carry_elements.append(element)
+        
+        return chunks[:start], carry_elements
+    
+    def iter_chunks(
+        self,
+        file_path: str,
+        max_characters: int,
+        new_after_n_chars: int,
+        combine_text_under_n_chars: int,
+        extract_images: bool = True,
+        extract_tables: bool = True,
+        languages: List[str] = ['english']
+    ) -> Iterator:
+        """
+        Stream chunks as page ranges finish partitioning.
+        
+        Produces the same chunks as partition_pdf_document(), but yields
+        every chunk as soon as later pages can no longer change it instead
+        of waiting for the last page. Arguments match partition_pdf_document().
+        
+        Yields:
+            Chunked elements in document order
+        """
+        plan = self._prepare_partition(
+            file_path, max_characters, new_after_n_chars, combine_text_under_n_chars,
+            extract_images, extract_tables, languages
+        )
+        
+        cache_key = plan["cache_key"]
+        if cache_key is not None:
+            cached = self.parse_cache.get(cache_key)
+            if cached is not None:
+                print(f"Streaming {len(cached)} elements from parse cache")
+                yield from cached
+                return
+        
+        # Always split into ranges so chunks can flow before the last page is parsed
+        range_jobs = self._get_range_jobs(
+            file_path, plan, extract_images, extract_tables, self.shard_pages
         )
         
+        elements = []
+        if range_jobs:
+            pending = []
+            for range_elements in self.iter_partition_ranges(file_path, range_jobs):
+                pending.extend(range_elements)
+                final_chunks, pending = self._split_final_chunks(
+                    chunk_by_title(pending, **plan["chunk_kwargs"])
+                )
+                elements.extend(final_chunks)
+                yield from final_chunks
+            
+            last_chunks = chunk_by_title(pending, **plan["chunk_kwargs"]) if pending else []
+            elements.extend(last_chunks)
+            yield from last_chunks
+        else:
+            elements = partition_pdf(
+                filename=file_path,
+                chunking_strategy="by_title",
+                **plan["partition_kwargs"],
+                **plan["chunk_kwargs"]
+            )
+            yield from elements
+        
         print(f"Extracted {len(elements)} elements")
         
-        # Print element breakdown
-        element_types = {}
-        for elem in elements:
-            elem_type = type(elem).__name__
-            element_types[elem_type] = element_types.get(elem_type, 0) + 1
-        print(f"Element breakdown: {dict(element_types)}")
+        if cache_key is not None:
+            self.parse_cache.put(cache_key, elements)
         
-        return elements
\ No newline at end of file
+        self._print_breakdown(elements)
\ No newline at end of file
@@ -0,0 +1,266 @@
+"""Persistent two-level cache of embedding vectors"""
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingCache:
+    """
+    Embedding vectors keyed by task, model, output dimensionality and text hash.
+
+    An in-process LRU of memory_entries vectors sits in front of a SQLite
+    table. Vectors are stored as float32 blobs (half the size of Python
+    floats in JSON or pickle). Disk entries beyond max_entries are evicted
+    least recently used first. Hits are counted separately for document
+    and query embeddings.
+    """
+
+    KINDS = ("document", "query")
+
+    def __init__(self, db_path: str, memory_entries: int = 2000, max_entries: int = 0):
+        """
+        Args:
+            db_path: SQLite database file
+            memory_entries: Vectors kept in the in-process LRU (0 disables it)
+            max_entries: Maximum vectors on disk (0 for no limit)
+        """
+        self.db_path = Path(db_path)
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.evictions = 0
+        self.stats = {
+            kind: {"memory_hits": 0, "disk_hits": 0, "misses": 0} for kind in self.KINDS
+        }
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, model TEXT, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_name: str, dimensions: int, text: str, kind: str = "document") -> str:
+        """
+        Build cache key from the embedding model and the text
+
+        Args:
+            model_name: Embedding model name (including the backend)
+            dimensions: Output dimensionality (0 for the model default)
+            text: Embedded text
+            kind: "document" or "query" (the model embeds them with different task types)
+
+        Returns:
+            Cache key
+        """
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{kind}:{model_name}:{dimensions}:{text_hash}"
+
+    def _remember(self, key: str, vector: array) -> None:
+        if self.memory_entries <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[str], kind: str = "document") -> Dict[str, List[float]]:
+        """
+        Load cached vectors
+
+        Args:
+            keys: Cache keys
+            kind: "document" or "query" (for hit statistics)
+
+        Returns:
+            Vectors of the keys that were found
+        """
+        found = {}
+        stats = self.stats[kind]
+
+        with self._lock:
+            missing = []
+            for key in dict.fromkeys(keys):
+                vector = self._memory.get(key)
+                if vector is None:
+                    missing.append(key)
+                    continue
+                self._memory.move_to_end(key)
+                found[key] = vector.tolist()
+            stats["memory_hits"] += sum(1 for key in keys if key in found)
+
+            if missing:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", missing
+                ).fetchall()
+
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    self._remember(key, vector)
+                    found[key] = vector.tolist()
+
+                if rows:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(now, key) for key, _ in rows]
+                    )
+                    self._conn.commit()
+
+                disk_found = {key for key, _ in rows}
+                stats["disk_hits"] += sum(1 for key in keys if key in disk_found)
+
+            stats["misses"] += sum(1 for key in keys if key not in found)
+
+        return found
+
+    def put_many(self, vectors: Dict[str, List[float]], model_name: str = "") -> None:
+        """Store vectors and evict old entries if over the limit"""
+        if not vectors:
+            return
+
+        now = time.time()
+        rows = []
+        with self._lock:
+            for key, values in vectors.items():
+                vector = array("f", values)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes(), model_name, now, now))
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, model, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries beyond max_entries"""
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if entries <= self.max_entries:
+                return
+
+            deleted = self._conn.execute(
+                "DELETE FROM embeddings WHERE key NOT IN "
+                "(SELECT key FROM embeddings ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,)
+            ).rowcount
+            self._conn.commit()
+            self.evictions += deleted
+            print(f"Embedding cache evicted {deleted} entries")
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            memory_entries = len(self._memory)
+
+        result = {}
+        for kind, stats in self.stats.items():
+            hits = stats["memory_hits"] + stats["disk_hits"]
+            lookups = hits + stats["misses"]
+            result[kind] = {
+                **stats,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0
+            }
+
+        return {
+            **result,
+            "evictions": self.evictions,
+            "entries": entries,
+            "memory_entries": memory_entries,
+            "max_entries": self.max_entries,
+            "max_memory_entries": self.memory_entries
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that only sends texts missing from the cache to the model.
+
+    Used for both document batches and search queries, so re-ingesting a
+    document or repeating a question costs no embedding calls.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str, dimensions: int = 0):
+        """
+        Args:
+            embeddings: Underlying embedding client
+            cache: Shared embedding cache
+            model_name: Embedding model name (including the backend)
+            dimensions: Output dimensionality (0 for the model default)
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+        self.dimensions = dimensions
+
+    def _keys(self, texts: List[str], kind: str = "document") -> List[str]:
+        return [EmbeddingCache.make_key(self.model_name, self.dimensions, text, kind) for text in texts]
+
+    def _missing(self, texts: List[str], keys: List[str], found: Dict[str, List[float]]) -> Dict[str, str]:
+        """Map each missing key to its text (duplicates embedded once)"""
+        return {key: text for key, text in zip(keys, texts) if key not in found}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = self._keys(texts)
+        found = self.cache.get_many(keys, "document")
+        missing = self._missing(texts, keys, found)
+
+        if missing:
+            vectors = dict(zip(missing, self.embeddings.embed_documents(list(missing.values()))))
+            self.cache.put_many(vectors, self.model_name)
+            found.update(vectors)
+
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = self._keys(texts)
+        found = self.cache.get_many(keys, "document")
+        missing = self._missing(texts, keys, found)
+
+        if missing:
+            vectors = dict(zip(missing, await self.embeddings.aembed_documents(list(missing.values()))))
+            self.cache.put_many(vectors, self.model_name)
+            found.update(vectors)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._keys([text], "query")[0]
+        vector: Optional[List[float]] = self.cache.get_many([key], "query").get(key)
+
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many({key: vector}, self.model_name)
+
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._keys([text], "query")[0]
+        vector: Optional[List[float]] = self.cache.get_many([key], "query").get(key)
+
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            self.cache.put_many({key: vector}, self.model_name)
+
+        return vector
@@ -0,0 +1,161 @@
+"""Batched, concurrent embedding across API keys with per-batch upserts"""
+import asyncio
+import time
+from typing import Callable, List, Optional
+from langchain_core.documents import Document
+from core.key_scheduler import KeyScheduler
+from core.retry_policy import RetryPolicy
+from core.vector_store import VectorStoreManager
+
+
+# Rough characters per token, for the scheduler's token quota
+CHARS_PER_TOKEN = 4
+
+# Most texts the Gemini embedding API accepts in one batch request
+MAX_BATCH_SIZE = 100
+
+
+class EmbeddingIngestor:
+    """
+    Embeds documents in batches and upserts each batch as soon as it is embedded.
+
+    Batches run concurrently (up to max_concurrency) and each one takes the
+    API key with the most free quota from the key scheduler, so throughput
+    grows with the number of keys. Quota and rate-limit errors cool the key
+    down and the batch is retried on another key with backoff; other
+    retryable errors are retried the same way. Upserts are serialised, and
+    a batch that exhausts its attempts fails the whole ingestion.
+    """
+
+    def __init__(
+        self,
+        vector_manager: VectorStoreManager,
+        api_keys: List[str],
+        key_scheduler: KeyScheduler,
+        retry_policy: Optional[RetryPolicy] = None,
+        batch_size: int = 32,
+        max_concurrency: int = 4
+    ):
+        """
+        Args:
+            vector_manager: Vector store manager (creates per-key embedding clients)
+            api_keys: API keys to spread batches over
+            key_scheduler: Per-key embedding quotas (shared across documents)
+            retry_policy: Error classification and backoff
+            batch_size: Maximum documents per embedding request (capped at MAX_BATCH_SIZE)
+            max_concurrency: Maximum batches embedded at the same time
+        """
+        self.vector_manager = vector_manager
+        self.key_scheduler = key_scheduler
+        self.key_scheduler.register_keys(api_keys)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.batch_size = min(max(1, batch_size), MAX_BATCH_SIZE)
+        if batch_size > MAX_BATCH_SIZE:
+            print(f"Embedding batch size {batch_size} exceeds the API limit, using {MAX_BATCH_SIZE}")
+        self.max_concurrency = max(1, max_concurrency)
+
+        self._clients = {}
+        self._semaphore = None
+        self._upsert_lock = None
+
+        self.stats = {
+            "batches": 0,
+            "documents": 0,
+            "retries": 0,
+            "failovers": 0,
+            "embed_seconds": 0.0,
+            "upsert_seconds": 0.0
+        }
+
+    def _client(self, api_key: str):
+        client = self._clients.get(api_key)
+        if client is None:
+            client = self._clients[api_key] = self.vector_manager.embeddings_for_key(api_key)
+        return client
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch, retrying on other keys after failures"""
+        estimated_tokens = sum(len(text) for text in texts) // CHARS_PER_TOKEN
+        attempt = 0
+
+        while True:
+            attempt += 1
+            async with self.key_scheduler.acquire(estimated_tokens) as api_key:
+                try:
+                    start = time.time()
+                    vectors = await self._client(api_key).aembed_documents(texts)
+                    self.stats["embed_seconds"] += time.time() - start
+                    return vectors
+                except Exception as e:
+                    error = e
+                    category = self.retry_policy.classify(e)
+                    cooldown = self.retry_policy.key_cooldown(e, category)
+                    if cooldown:
+                        self.key_scheduler.cooldown(api_key, cooldown)
+                        self.stats["failovers"] += 1
+
+            retryable = RetryPolicy.is_retryable(category, self.key_scheduler.available_keys())
+            if not retryable or attempt >= self.retry_policy.max_attempts:
+                raise error
+
+            print(f"Embedding batch failed ({category}), retry {attempt}: {error}")
+            self.stats["retries"] += 1
+            await self.retry_policy.sleep(attempt)
+
+    async def _ingest_batch(
+        self,
+        vectorstore,
+        batch: List[Document],
+        on_batch: Optional[Callable[[List[Document]], None]]
+    ) -> None:
+        async with self._semaphore:
+            vectors = await self._embed_batch([doc.page_content for doc in batch])
+
+        async with self._upsert_lock:
+            start = time.time()
+            await asyncio.to_thread(self.vector_manager.upsert_embedded, vectorstore, batch, vectors)
+            self.stats["upsert_seconds"] += time.time() - start
+
+        self.stats["batches"] += 1
+        self.stats["documents"] += len(batch)
+        if on_batch:
+            await asyncio.to_thread(on_batch, batch)
+
+    async def add_documents(
+        self,
+        vectorstore,
+        documents: List[Document],
+        on_batch: Optional[Callable[[List[Document]], None]] = None
+    ) -> None:
+        """
+        Embed and upsert documents
+
+        Args:
+            vectorstore: ChromaDB instance
+            documents: LangChain documents (left unmodified)
+            on_batch: Called (in a worker thread) with each batch once it is upserted
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._upsert_lock = asyncio.Lock()
+
+        batches = [
+            documents[i:i + self.batch_size] for i in range(0, len(documents), self.batch_size)
+        ]
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                for batch in batches:
+                    group.create_task(self._ingest_batch(vectorstore, batch, on_batch))
+        except ExceptionGroup as group_error:
+            raise group_error.exceptions[0]
+
+    def get_stats(self) -> dict:
+        """Get embedding statistics"""
+        return {
+            **self.stats,
+            "embed_seconds": round(self.stats["embed_seconds"], 2),
+            "upsert_seconds": round(self.stats["upsert_seconds"], 2),
+            "batch_size": self.batch_size,
+            "max_concurrency": self.max_concurrency
+        }
@@ -0,0 +1,119 @@
+"""Local extractive summaries for chunks not worth an LLM call"""
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9\-']+")
+_NUMBER_PATTERN = re.compile(r"\d[\d,.%]*")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how i if in into is it its itself just may me might more most must
+my myself no nor not now of off on once only or other our ours ourselves out over own same shall she should
+so some such than that the their theirs them themselves then there these they this those through to too
+under until up upon us very was we were what when where which while who whom why will with within without
+would you your yours yourself yourselves
+""".split())
+
+
+class ExtractiveSummarizer:
+    """
+    CPU-only summary, keywords and questions for small text-only chunks.
+
+    Sentences are ranked by the mean TF-IDF weight of their terms, with the
+    chunk's sentences as the document set; the top sentences are kept in
+    their original order. Keywords are the highest weighted terms and
+    questions are built from them (plus any questions already in the text).
+
+    A chunk qualifies when it has no tables or images, is at most max_chars
+    long and numbers make up at most max_number_ratio of its tokens (number
+    dense text such as figures and specifications still goes to the LLM).
+    """
+
+    def __init__(
+        self,
+        max_chars: int = 400,
+        max_number_ratio: float = 0.2,
+        max_sentences: int = 3,
+        max_keywords: int = 8
+    ):
+        """
+        Args:
+            max_chars: Maximum chunk text length handled locally
+            max_number_ratio: Maximum share of numeric tokens handled locally
+            max_sentences: Sentences kept in the summary
+            max_keywords: Keywords extracted per chunk
+        """
+        self.max_chars = max_chars
+        self.max_number_ratio = max_number_ratio
+        self.max_sentences = max_sentences
+        self.max_keywords = max_keywords
+
+    def accepts(self, content_data: Dict) -> bool:
+        """Return True if the chunk should be summarised locally"""
+        text = content_data['text'].strip()
+        if content_data['tables'] or content_data['images_dirpath'] or not text:
+            return False
+        if len(text) > self.max_chars:
+            return False
+
+        numbers = len(_NUMBER_PATTERN.findall(text))
+        words = len(_WORD_PATTERN.findall(text))
+        return numbers <= self.max_number_ratio * max(numbers + words, 1)
+
+    @staticmethod
+    def _terms(sentence: str) -> List[str]:
+        return [
+            word for word in (w.lower() for w in _WORD_PATTERN.findall(sentence))
+            if word not in STOPWORDS and len(word) > 2
+        ]
+
+    def summarise(self, text: str) -> Dict:
+        """
+        Build summary fields for a chunk
+
+        Args:
+            text: Chunk text
+
+        Returns:
+            Dict with "question" and "summary" (matching the AIParser fields)
+            and "keywords"
+        """
+        sentences = [s.strip() for s in _SENTENCE_PATTERN.split(text) if s.strip()]
+        sentence_terms = [self._terms(sentence) for sentence in sentences]
+
+        # Inverse document frequency over the chunk's sentences
+        document_frequency = Counter(term for terms in sentence_terms for term in set(terms))
+        idf = {
+            term: math.log((1 + len(sentences)) / (1 + count)) + 1
+            for term, count in document_frequency.items()
+        }
+
+        term_weights = Counter()
+        for terms in sentence_terms:
+            for term, count in Counter(terms).items():
+                term_weights[term] += count * idf[term]
+
+        scores = [
+            sum(term_weights[term] for term in terms) / len(terms) if terms else 0.0
+            for terms in sentence_terms
+        ]
+        top = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)[:self.max_sentences]
+        summary = " ".join(sentences[i] for i in sorted(top))
+
+        keywords = [term for term, _ in term_weights.most_common(self.max_keywords)]
+
+        questions = [sentence for sentence in sentences if sentence.endswith("?")]
+        questions += [f"What does the document say about {keyword}?" for keyword in keywords[:3]]
+        if keywords:
+            questions.append(f"Where is {', '.join(keywords[:3])} mentioned?")
+
+        return {
+            "question": " ".join(questions),
+            "summary": f"{summary} Keywords: {', '.join(keywords)}" if keywords else summary,
+            "keywords": keywords
+        }
@@ -0,0 +1,214 @@
+"""Offline deterministic LLM and embedding backends for benchmarking"""
+import asyncio
+import hashlib
+import math
+import re
+import threading
+import time
+import typing
+from collections import Counter
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage
+
+
+_WORD_PATTERN = re.compile(r"\w+")
+_CHUNK_PATTERN = re.compile(r"=== CHUNK (\d+) ===\n(.*?)(?=\n=== CHUNK \d+ ===|\Z)", re.S)
+_TABLE_PATTERN = re.compile(r"^Table \d+:", re.M)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _excerpt(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + "..."
+
+
+class FakeLLMError(Exception):
+    """Simulated API error (classified by RetryPolicy through its HTTP code)"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeChatModel:
+    """
+    Stand-in for a (structured output) Gemini chat model that makes no network calls.
+
+    Responses depend only on the request: the same messages always give the
+    same output. Structured output is built from the schema's fields
+    (summaries with one interpretation per input image and table, one batch
+    result per CHUNK header, chat answers without image references); without
+    a schema an AIMessage is returned.
+
+    Each call sleeps latency_seconds. A call fails with a FakeLLMError of
+    error_code when a hash of the request and its attempt number falls under
+    error_rate, so failures are reproducible and retries can succeed.
+    """
+
+    def __init__(
+        self,
+        schema: Optional[type] = None,
+        latency_seconds: float = 0.0,
+        error_rate: float = 0.0,
+        error_code: int = 503
+    ):
+        """
+        Args:
+            schema: Pydantic model for structured output (None for plain messages)
+            latency_seconds: Simulated response time of each call
+            error_rate: Share of calls that fail (0-1)
+            error_code: HTTP status code of simulated failures (e.g. 503, 429)
+        """
+        self.schema = schema
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self._attempts = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read_messages(messages) -> tuple:
+        """Return (text of all messages, text of the last message, number of images)"""
+        if not isinstance(messages, list):
+            messages = [messages]
+
+        texts = []
+        image_count = 0
+        for message in messages:
+            content = getattr(message, "content", message)
+            if isinstance(content, str):
+                texts.append(content)
+                continue
+            parts = []
+            for item in content:
+                if isinstance(item, str):
+                    parts.append(item)
+                elif item.get("type") == "text":
+                    parts.append(item["text"])
+                elif item.get("type") == "image_url":
+                    image_count += 1
+            texts.append("\n".join(parts))
+
+        return "\n".join(texts), texts[-1] if texts else "", image_count
+
+    def _maybe_fail(self, digest: str) -> None:
+        if not self.error_rate:
+            return
+
+        with self._lock:
+            self._attempts[digest] += 1
+            attempt = self._attempts[digest]
+
+        draw = int(_digest(f"{digest}:{attempt}")[:8], 16) / 0xFFFFFFFF
+        if draw < self.error_rate:
+            raise FakeLLMError(self.error_code, f"{self.error_code} simulated failure (attempt {attempt})")
+
+    def _build(self, schema: type, text: str, image_count: int, chunk_id: Optional[int] = None):
+        """Fill a schema's fields from the request text"""
+        digest = _digest(text)[:12]
+        tables_text = text.rsplit("\nTABLES:\n", 1)[1] if "\nTABLES:\n" in text else ""
+        values = {}
+
+        for name, field in schema.model_fields.items():
+            if name == "results":
+                item_schema = typing.get_args(field.annotation)[0]
+                values[name] = [
+                    self._build(item_schema, chunk_text, 0, int(chunk_index))
+                    for chunk_index, chunk_text in _CHUNK_PATTERN.findall(text)
+                ]
+            elif name == "chunk_id":
+                values[name] = chunk_id
+            elif name == "image_interpretation":
+                values[name] = [f"Offline description of image {i + 1} ({digest})" for i in range(image_count)]
+            elif name == "table_interpretation":
+                values[name] = [
+                    f"Offline description of table {i + 1} ({digest})"
+                    for i in range(len(_TABLE_PATTERN.findall(tables_text)))
+                ]
+            elif name == "image_references":
+                values[name] = []
+            elif name == "question":
+                values[name] = f"What does this content say about {_excerpt(text, 60)}?"
+            elif field.annotation is str:
+                values[name] = f"[offline {digest}] {_excerpt(text, 300)}"
+
+        return schema(**values)
+
+    def _respond(self, messages):
+        text, last_text, image_count = self._read_messages(messages)
+        if self.schema is not None and "CONTENT TO ANALYZE:" in text:
+            # Summary prompts: describe the content, not the instructions
+            content = text.split("CONTENT TO ANALYZE:", 1)[1]
+        elif self.schema is not None and "CHUNKS TO ANALYZE:" in text:
+            content = text.split("CHUNKS TO ANALYZE:", 1)[1]
+        else:
+            # Chat: answer the last (user) message
+            content = last_text
+
+        self._maybe_fail(_digest(f"{text}:{image_count}"))
+
+        if self.schema is None:
+            return AIMessage(content=f"[offline {_digest(text)[:12]}] {_excerpt(content, 300)}")
+        return self._build(self.schema, content, image_count)
+
+    def invoke(self, messages, config=None, **kwargs):
+        time.sleep(self.latency_seconds)
+        return self._respond(messages)
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        await asyncio.sleep(self.latency_seconds)
+        return self._respond(messages)
+
+    def with_structured_output(self, schema: type) -> "FakeChatModel":
+        return FakeChatModel(schema, self.latency_seconds, self.error_rate, self.error_code)
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic hash-based embeddings (no network calls).
+
+    Words are hashed into `dimensions` buckets with a random sign (feature
+    hashing) and the vector is L2-normalised, so texts sharing words get
+    similar vectors and similarity search still returns sensible results.
+    """
+
+    def __init__(self, dimensions: int = 768, latency_seconds: float = 0.0):
+        """
+        Args:
+            dimensions: Vector size
+            latency_seconds: Simulated response time of each embedding request
+        """
+        self.dimensions = dimensions
+        self.latency_seconds = latency_seconds
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for word in _WORD_PATTERN.findall(text.lower()):
+            value = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+
+        norm = math.sqrt(sum(x * x for x in vector))
+        if not norm:
+            vector[0] = 1.0
+            return vector
+        return [x / norm for x in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency_seconds)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency_seconds)
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency_seconds)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency_seconds)
+        return self._embed(text)
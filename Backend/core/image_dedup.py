@@ -0,0 +1,206 @@
+"""Perceptual-hash deduplication of extracted images"""
+import io
+import json
+import os
+import threading
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import List, Optional, Tuple
+from PIL import Image
+from utils.blob_store import BlobStore
+
+
+# Near-identical images must also have about the same aspect ratio
+MAX_ASPECT_RATIO_DIFF = 0.1
+
+# Second check: the 256-bit dHash may differ in this many bits per bit of
+# allowed 64-bit distance (same relative tolerance, four times the detail)
+FINE_HASH_DISTANCE_FACTOR = 4
+
+
+class ImageDeduplicator:
+    """
+    Collapses near-identical images (logos, headers, watermarks) to one stored asset.
+
+    Images are compared by 64-bit dHash; an image within max_distance bits of
+    a known asset, with the same aspect ratio and a close 256-bit dHash, is
+    mapped to that asset instead of being stored again. Near-duplicates are
+    only matched within a scope (the document), so across documents only
+    byte-identical images (same content-addressed reference) share an asset.
+    Each asset's AI interpretation is kept in the index so duplicates in later
+    chunks reuse it instead of asking the LLM again.
+
+    Candidates are found with multi-index hashing: the 64-bit hash is split
+    into max_distance + 1 bit ranges, and any hash within max_distance of
+    another equals it on at least one range, so only assets sharing a range
+    value are compared.
+    """
+
+    def __init__(self, index_path: str, image_store: BlobStore, max_distance: int = 4):
+        """
+        Args:
+            index_path: JSON file persisting hashes and interpretations
+            image_store: Content-addressed store holding the image files
+            max_distance: Maximum Hamming distance between dHashes of duplicates
+        """
+        self.index_path = Path(index_path)
+        self.image_store = image_store
+        self.max_distance = max_distance
+        self.duplicates = 0
+        self.reused_interpretations = 0
+        self._lock = threading.Lock()
+        self._ranges = self._bit_ranges(min(max_distance + 1, 64))
+        self._buckets = defaultdict(set)
+        self._entries = self._load()
+        for ref, entry in self._entries.items():
+            self._index(ref, entry)
+
+    def _load(self) -> dict:
+        """Load the index, dropping entries whose image file no longer exists"""
+        if not self.index_path.exists():
+            return {}
+
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not load image index: {e}")
+            return {}
+
+        return {ref: entry for ref, entry in entries.items() if self.image_store.exists(ref)}
+
+    def save(self) -> None:
+        """Persist the index"""
+        with self._lock:
+            data = json.dumps(self._entries)
+
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique name: jobs finishing together save from different threads
+        tmp_path = self.index_path.with_name(f"{self.index_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def dhash(image: Image.Image, hash_size: int = 8) -> int:
+        """Compute difference hash of hash_size^2 bits (brightness gradient of a (hash_size+1) x hash_size thumbnail)"""
+        width = hash_size + 1
+        pixels = image.convert("L").resize((width, hash_size), Image.Resampling.LANCZOS).tobytes()
+
+        value = 0
+        for row in range(hash_size):
+            for col in range(hash_size):
+                value = (value << 1) | (pixels[row * width + col] > pixels[row * width + col + 1])
+        return value
+
+    @staticmethod
+    def _bit_ranges(count: int) -> List[Tuple[int, int]]:
+        """Split 64 bits into count (shift, mask) ranges of near-equal width"""
+        ranges, shift = [], 0
+        for i in range(count):
+            width = 64 // count + (1 if i < 64 % count else 0)
+            ranges.append((shift, (1 << width) - 1))
+            shift += width
+        return ranges
+
+    def _bucket_keys(self, image_hash: int, scope: Optional[str]) -> List[tuple]:
+        return [(scope, i, (image_hash >> shift) & mask) for i, (shift, mask) in enumerate(self._ranges)]
+
+    def _index(self, ref: str, entry: dict) -> None:
+        """Add an asset to the candidate buckets (entries without a fine hash are only reused exactly)"""
+        if entry.get('dhash256') is None:
+            return
+        for key in self._bucket_keys(int(entry['dhash'], 16), entry.get('scope')):
+            self._buckets[key].add(ref)
+
+    def _match(self, image_hash: int, fine_hash: int, size: Tuple[int, int], scope: Optional[str]) -> Optional[str]:
+        """Find the closest known asset of the scope within max_distance that passes the second checks"""
+        candidates = set()
+        for key in self._bucket_keys(image_hash, scope):
+            candidates.update(self._buckets.get(key, ()))
+
+        aspect = size[0] / max(size[1], 1)
+        best_ref, best_distance = None, self.max_distance + 1
+
+        for ref in candidates:
+            entry = self._entries[ref]
+            entry_aspect = entry['size'][0] / max(entry['size'][1], 1)
+            if abs(aspect - entry_aspect) > MAX_ASPECT_RATIO_DIFF * max(aspect, entry_aspect):
+                continue
+
+            distance = (image_hash ^ int(entry['dhash'], 16)).bit_count()
+            if distance >= best_distance:
+                continue
+
+            fine_distance = (fine_hash ^ int(entry['dhash256'], 16)).bit_count()
+            if fine_distance > self.max_distance * FINE_HASH_DISTANCE_FACTOR:
+                continue
+
+            best_ref, best_distance = ref, distance
+
+        return best_ref
+
+    def store(self, image_bytes: bytes, extension: str, scope: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Store an image unless an identical or (within the scope) near-identical one is already stored
+
+        Args:
+            image_bytes: Encoded image
+            extension: File extension for a newly stored image
+            scope: Namespace for near-duplicate matching (e.g. the document ID)
+
+        Returns:
+            (reference of the stored asset, whether it was a duplicate)
+        """
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image_hash = self.dhash(image)
+            fine_hash = self.dhash(image, 16)
+            size = image.size
+
+        with self._lock:
+            # Byte-identical to a stored asset (possibly from another scope)
+            ref = f"{BlobStore.hash_bytes(image_bytes)}.{extension}"
+            if ref not in self._entries or not self.image_store.exists(ref):
+                ref = self._match(image_hash, fine_hash, size, scope)
+            if ref is not None and self.image_store.exists(ref):
+                self.duplicates += 1
+                return ref, True
+
+            ref = self.image_store.put(image_bytes, extension)
+            entry = self._entries[ref] = {
+                'dhash': f"{image_hash:016x}",
+                'dhash256': f"{fine_hash:064x}",
+                'size': list(size),
+                'scope': scope,
+                'interpretation': None
+            }
+            self._index(ref, entry)
+            return ref, False
+
+    def get_interpretation(self, ref: str) -> Optional[str]:
+        """Return the stored AI interpretation of an asset, if any"""
+        with self._lock:
+            entry = self._entries.get(ref)
+            return entry['interpretation'] if entry else None
+
+    def set_interpretation(self, ref: str, interpretation: str) -> None:
+        """Remember the AI interpretation of an asset"""
+        with self._lock:
+            if ref in self._entries:
+                self._entries[ref]['interpretation'] = interpretation
+
+    def record_reuse(self) -> None:
+        with self._lock:
+            self.reused_interpretations += 1
+
+    def get_stats(self) -> dict:
+        """Get deduplication statistics"""
+        with self._lock:
+            return {
+                "assets": len(self._entries),
+                "interpreted_assets": sum(1 for entry in self._entries.values() if entry['interpretation']),
+                "duplicates_collapsed": self.duplicates,
+                "interpretations_reused": self.reused_interpretations,
+                "max_distance": self.max_distance
+            }
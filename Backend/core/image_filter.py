@@ -0,0 +1,93 @@
+"""Heuristic filter for decorative, blank and tiny images"""
+import io
+import math
+from typing import Optional
+from PIL import Image
+
+
+# Images are measured on a thumbnail of this size
+SAMPLE_SIZE = 64
+
+
+class ImageFilter:
+    """
+    Rejects images not worth storing or interpreting.
+
+    Checks, in order:
+        small: shorter edge under min_edge or fewer than min_area pixels (icons, bullets)
+        thin: aspect ratio above max_aspect_ratio (rules, separator lines)
+        blank: grayscale entropy under min_entropy bits (empty or near-empty crops)
+        flat: one colour covers more than max_dominant_ratio of the image (fills, backgrounds)
+
+    A threshold of 0 disables its check.
+    """
+
+    def __init__(
+        self,
+        min_edge: int = 32,
+        min_area: int = 4096,
+        max_aspect_ratio: float = 12.0,
+        min_entropy: float = 0.3,
+        max_dominant_ratio: float = 0.99
+    ):
+        """
+        Args:
+            min_edge: Minimum width and height in pixels
+            min_area: Minimum width * height in pixels
+            max_aspect_ratio: Maximum ratio of the longer to the shorter edge
+            min_entropy: Minimum grayscale histogram entropy in bits (0-8)
+            max_dominant_ratio: Maximum share of pixels with the most common colour
+        """
+        self.min_edge = min_edge
+        self.min_area = min_area
+        self.max_aspect_ratio = max_aspect_ratio
+        self.min_entropy = min_entropy
+        self.max_dominant_ratio = max_dominant_ratio
+
+    @staticmethod
+    def entropy(image: Image.Image) -> float:
+        """Shannon entropy of the grayscale histogram in bits"""
+        histogram = image.convert("L").histogram()
+        total = sum(histogram)
+        return -sum(count / total * math.log2(count / total) for count in histogram if count)
+
+    @staticmethod
+    def dominant_ratio(image: Image.Image) -> float:
+        """Share of pixels with the most common colour (32 levels per channel)"""
+        pixels = image.convert("RGB").point(lambda value: value & 0xF8).getcolors(SAMPLE_SIZE * SAMPLE_SIZE)
+        return max(count for count, _ in pixels) / sum(count for count, _ in pixels)
+
+    def check(self, image_bytes: bytes) -> Optional[str]:
+        """
+        Check an image
+
+        Args:
+            image_bytes: Encoded image
+
+        Returns:
+            Rejection reason ("small", "thin", "blank" or "flat"), or None to keep it
+        """
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            width, height = image.size
+            if width < self.min_edge or height < self.min_edge or width * height < self.min_area:
+                return "small"
+
+            if self.max_aspect_ratio and max(width, height) / min(width, height) > self.max_aspect_ratio:
+                return "thin"
+
+            if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+                # Transparent areas count as white, as they appear on the page
+                rgba = image.convert("RGBA")
+                sample = Image.new("RGB", rgba.size, (255, 255, 255))
+                sample.paste(rgba, mask=rgba.getchannel("A"))
+            else:
+                sample = image.convert("RGB")
+            sample.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+
+        if self.min_entropy and self.entropy(sample) < self.min_entropy:
+            return "blank"
+
+        if self.max_dominant_ratio and self.dominant_ratio(sample) > self.max_dominant_ratio:
+            return "flat"
+
+        return None
@@ -0,0 +1,265 @@
+"""Durable per-document journal of ingestion progress"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from langchain_core.documents import Document
+
+
+class JobJournal:
+    """
+    SQLite journal of one document's ingestion job.
+
+    Records the job parameters and status, completed stages, the final AI
+    summary of every chunk and which documents are embedded, each as soon
+    as it finishes. A restarted or re-submitted job reads it back to skip
+    parsing (from the checkpoint), LLM calls and embeddings already done.
+
+    Chunks are matched by index and a hash of their content, and embeddings
+    by a hash of the built document, so anything that changed is redone.
+    Fallback summaries are never recorded, so failed chunks are retried.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.summaries_reused = 0
+        self.embeddings_reused = 0
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS job (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS stages (name TEXT PRIMARY KEY, completed REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "chunk_index INTEGER PRIMARY KEY, content_hash TEXT NOT NULL, summary TEXT, "
+            "document_hash TEXT, updated REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def content_hash(content_data: Dict) -> str:
+        """Hash of the chunk content a summary was made from"""
+        payload = json.dumps({
+            "text": content_data['text'],
+            "tables": content_data['tables'],
+            "images": [Path(image_path).name for image_path in content_data['images_dirpath']]
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def document_hash(document: Document) -> str:
+        """Hash of a document as it is embedded and stored"""
+        payload = json.dumps({
+            "page_content": document.page_content,
+            "metadata": document.metadata
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _set(self, key: str, value) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job (key, value) VALUES (?, ?)", (key, json.dumps(value))
+            )
+            self._conn.commit()
+
+    def _get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM job WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_params(self, params: Dict) -> None:
+        """Record the arguments needed to run the job again"""
+        self._set("params", params)
+
+    def get_params(self) -> Optional[Dict]:
+        return self._get("params")
+
+    def set_status(self, status: str) -> None:
+        """Record the job status ("running", "completed" or "failed")"""
+        self._set("status", status)
+
+    def get_status(self) -> Optional[str]:
+        return self._get("status")
+
+    def complete_stage(self, name: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stages (name, completed) VALUES (?, ?)", (name, time.time())
+            )
+            self._conn.commit()
+
+    def is_stage_complete(self, name: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM stages WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+    def get_summary(self, chunk_index: int, content_hash: str) -> Optional[dict]:
+        """
+        Load the recorded summary of a chunk
+
+        Returns:
+            Summary fields as a dict, or None if not recorded for this content
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM chunks WHERE chunk_index = ? AND content_hash = ?",
+                (chunk_index, content_hash)
+            ).fetchone()
+
+        if row is None or row[0] is None:
+            return None
+
+        self.summaries_reused += 1
+        return json.loads(row[0])
+
+    def record_summary(self, chunk_index: int, content_hash: str, summary: dict) -> None:
+        """Record a chunk's final summary (clears its embedding record)"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunks (chunk_index, content_hash, summary, document_hash, updated) "
+                "VALUES (?, ?, ?, NULL, ?)",
+                (chunk_index, content_hash, json.dumps(summary, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+
+    def is_embedded(self, document: Document) -> bool:
+        """Return True if this exact document is already in the vector store"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT document_hash FROM chunks WHERE chunk_index = ?",
+                (document.metadata["chunk_index"],)
+            ).fetchone()
+
+        if row is None or row[0] != self.document_hash(document):
+            return False
+
+        self.embeddings_reused += 1
+        return True
+
+    def record_embedded(self, documents: List[Document]) -> None:
+        """Record documents upserted into the vector store"""
+        now = time.time()
+        with self._lock:
+            for document in documents:
+                chunk_index = document.metadata["chunk_index"]
+                document_hash = self.document_hash(document)
+                updated = self._conn.execute(
+                    "UPDATE chunks SET document_hash = ?, updated = ? WHERE chunk_index = ?",
+                    (document_hash, now, chunk_index)
+                ).rowcount
+                if not updated:
+                    # Chunks with unrecorded (fallback) summaries
+                    self._conn.execute(
+                        "INSERT INTO chunks (chunk_index, content_hash, summary, document_hash, updated) "
+                        "VALUES (?, '', NULL, ?, ?)",
+                        (chunk_index, document_hash, now)
+                    )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> dict:
+        """Get journal statistics"""
+        with self._lock:
+            stages = [row[0] for row in self._conn.execute("SELECT name FROM stages ORDER BY completed")]
+            summaries, embedded = self._conn.execute(
+                "SELECT COUNT(summary), COUNT(document_hash) FROM chunks"
+            ).fetchone()
+
+        return {
+            "status": self.get_status(),
+            "completed_stages": stages,
+            "chunk_summaries": summaries,
+            "chunks_embedded": embedded,
+            "summaries_reused": self.summaries_reused,
+            "embeddings_reused": self.embeddings_reused
+        }
+
+
+class JobIndex:
+    """
+    Lookup table of ingestion jobs by PDF content and processing arguments.
+
+    One small SQLite table shared by all documents, so a re-submitted PDF
+    finds its job without opening every document's journal. Each job's
+    status is mirrored here whenever its journal records one.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "document_id TEXT PRIMARY KEY, job_key TEXT NOT NULL, status TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_job_key ON jobs (job_key)")
+        self._conn.commit()
+
+    @staticmethod
+    def job_key(job_args: Dict) -> str:
+        """Hash of a job's PDF content hash and processing arguments"""
+        payload = json.dumps(job_args, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def register(self, document_id: str, job_args: Dict, status: str = "running") -> None:
+        """Add (or re-key) a document's job"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (document_id, job_key, status, updated) VALUES (?, ?, ?, ?)",
+                (document_id, self.job_key(job_args), status, time.time())
+            )
+            self._conn.commit()
+
+    def set_status(self, document_id: str, status: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated = ? WHERE document_id = ?",
+                (status, time.time(), document_id)
+            )
+            self._conn.commit()
+
+    def find(self, job_args: Dict, statuses: tuple = ("running",)) -> Optional[str]:
+        """
+        Find the latest job for the same PDF and arguments
+
+        Args:
+            job_args: PDF content hash and processing arguments
+            statuses: Job statuses to match (failed jobs are only resumed on request)
+
+        Returns:
+            Document ID, or None if there is no such job
+        """
+        placeholders = ",".join("?" * len(statuses))
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT document_id FROM jobs WHERE job_key = ? AND status IN ({placeholders}) "
+                "ORDER BY updated DESC LIMIT 1",
+                (self.job_key(job_args), *statuses)
+            ).fetchone()
+        return row[0] if row else None
+
+    def remove(self, document_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE document_id = ?", (document_id,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,196 @@
+"""Rate-limit-aware scheduling of LLM calls across API keys"""
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+
+
+# Poll interval bounds while waiting for a free key
+MIN_WAIT_SECONDS = 0.05
+MAX_WAIT_SECONDS = 1.0
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at capacity per minute"""
+
+    def __init__(self, capacity_per_minute: float):
+        self.capacity = float(capacity_per_minute)
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until amount tokens are available (after refill)"""
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class _KeyState:
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.in_flight = 0
+        self.calls = 0
+        self.cooldown_until = 0.0
+
+
+class KeyScheduler:
+    """
+    Chooses the API key for each LLM call from per-key quotas.
+
+    Every key has a requests-per-minute and a tokens-per-minute token bucket
+    and a cap on concurrent calls. A call waits until some key can take it,
+    then goes to the key with the most remaining headroom, so load spreads
+    across keys in proportion to their free quota instead of round-robin.
+
+    State is guarded by a thread lock and waiting is done by short sleeps,
+    so one scheduler can be shared by callers on different event loops.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_concurrency: int):
+        """
+        Args:
+            requests_per_minute: Request quota of each key
+            tokens_per_minute: Input token quota of each key
+            max_concurrency: Maximum in-flight calls per key
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+
+        self._keys = {}
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def register_keys(self, api_keys: List[str]) -> None:
+        """Add API keys not yet known to the scheduler"""
+        with self._lock:
+            for api_key in api_keys:
+                if api_key not in self._keys:
+                    self._keys[api_key] = _KeyState(self.requests_per_minute, self.tokens_per_minute)
+
+    def _try_acquire(self, estimated_tokens: int) -> Tuple[Optional[str], float]:
+        """
+        Reserve quota on the key with the most headroom
+
+        Returns:
+            (api_key, 0) on success, or (None, seconds until a key may be free)
+        """
+        now = time.monotonic()
+        best_key, best_headroom = None, -1.0
+        wait = MAX_WAIT_SECONDS
+
+        for api_key, state in self._keys.items():
+            state.requests.refill(now)
+            state.tokens.refill(now)
+
+            if state.cooldown_until > now:
+                wait = min(wait, state.cooldown_until - now)
+                continue
+
+            if state.in_flight >= self.max_concurrency:
+                # A slot frees up when any call finishes
+                wait = min(wait, MIN_WAIT_SECONDS)
+                continue
+
+            key_wait = max(state.requests.time_until(1), state.tokens.time_until(estimated_tokens))
+            if key_wait > 0:
+                wait = min(wait, key_wait)
+                continue
+
+            headroom = min(
+                state.requests.tokens / state.requests.capacity,
+                state.tokens.tokens / state.tokens.capacity
+            ) * (1 - state.in_flight / self.max_concurrency)
+            if headroom > best_headroom:
+                best_key, best_headroom = api_key, headroom
+
+        if best_key is None:
+            return None, wait
+
+        state = self._keys[best_key]
+        state.requests.consume(1)
+        state.tokens.consume(estimated_tokens)
+        state.in_flight += 1
+        state.calls += 1
+        return best_key, 0.0
+
+    def cooldown(self, api_key: str, seconds: float) -> None:
+        """Stop scheduling calls on a key for the given time (e.g. after a quota error)"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            state = self._keys.get(api_key)
+            if state is not None:
+                state.cooldown_until = max(state.cooldown_until, time.monotonic() + seconds)
+
+    def available_keys(self) -> int:
+        """Number of keys not in a cooldown"""
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for state in self._keys.values() if state.cooldown_until <= now)
+
+    @asynccontextmanager
+    async def acquire(self, estimated_tokens: int = 0):
+        """
+        Wait for quota and yield the API key to use for one call
+
+        Args:
+            estimated_tokens: Estimated input tokens of the call
+        """
+        if not self._keys:
+            raise RuntimeError("No API keys registered with the scheduler")
+
+        start = time.monotonic()
+        waited = False
+
+        while True:
+            with self._lock:
+                api_key, wait = self._try_acquire(estimated_tokens)
+            if api_key is not None:
+                break
+            waited = True
+            await asyncio.sleep(min(max(wait, MIN_WAIT_SECONDS), MAX_WAIT_SECONDS))
+
+        if waited:
+            with self._lock:
+                self.waits += 1
+                self.wait_seconds += time.monotonic() - start
+
+        try:
+            yield api_key
+        finally:
+            with self._lock:
+                self._keys[api_key].in_flight -= 1
+
+    def get_stats(self) -> dict:
+        """Get scheduler statistics (keys are reported by position, never by value)"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "max_concurrency": self.max_concurrency,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 2),
+                "keys": [
+                    {
+                        "key": position,
+                        "in_flight": state.in_flight,
+                        "calls": state.calls,
+                        "requests_available": round(state.requests.tokens, 1),
+                        "tokens_available": round(state.tokens.tokens),
+                        "cooldown_seconds": round(max(0.0, state.cooldown_until - now), 1)
+                    }
+                    for position, state in enumerate(self._keys.values(), 1)
+                ]
+            }
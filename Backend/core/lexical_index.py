@@ -0,0 +1,180 @@
+"""In-memory BM25 index of a document's chunks"""
+import json
+import math
+import os
+import re
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+
+
+# Words, numbers and identifiers such as "d_model", "3.14" or "gpt-4"
+_TOKEN_PATTERN = re.compile(r"\w+(?:[.\-]\w+)*")
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "were", "with"
+}
+
+_QUESTION_WORDS = {
+    "what", "why", "how", "when", "where", "who", "whom", "which", "whose", "does", "do",
+    "did", "can", "could", "should", "would", "is", "are", "explain", "describe", "compare",
+    "summarize", "summarise", "tell", "list"
+}
+
+INDEX_VERSION = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase terms
+
+    Compound tokens ("multi-head", "3.14") are kept whole and also split
+    into their parts, so both the exact identifier and its words match.
+    """
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        if "." in token or "-" in token:
+            terms.extend(part for part in re.split(r"[.\-]", token) if part)
+    return terms
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over chunk text, AI questions and table text.
+
+    Built once per document at ingestion and saved next to its vector store.
+    Chunks are identified by chunk_index (the vector store IDs), so lexical
+    hits can be fetched from Chroma without embedding anything.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            k1: BM25 term frequency saturation
+            b: BM25 length normalisation
+        """
+        self.k1 = k1
+        self.b = b
+        self.doc_terms: Dict[int, Dict[str, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.avg_length = 0.0
+
+    @staticmethod
+    def document_text(doc: Document) -> str:
+        """Text indexed for a document: original text, AI questions and tables"""
+        metadata = doc.metadata
+        tables = metadata.get("tables", [])
+        if isinstance(tables, str):
+            tables = json.loads(tables)
+
+        return "\n".join([metadata.get("original_text", ""), metadata.get("ai_questions", ""), *tables])
+
+    @classmethod
+    def from_documents(cls, documents: List[Document], k1: float = 1.5, b: float = 0.75) -> "LexicalIndex":
+        """Build an index from LangChain documents (before their metadata is prepared for Chroma)"""
+        index = cls(k1=k1, b=b)
+        for doc in documents:
+            index._add(doc.metadata["chunk_index"], Counter(tokenize(cls.document_text(doc))))
+        index._update_stats()
+        return index
+
+    def _add(self, chunk_index: int, terms: Dict[str, int]) -> None:
+        self.doc_terms[chunk_index] = dict(terms)
+        self.doc_lengths[chunk_index] = sum(terms.values())
+        for term, count in terms.items():
+            self.postings[term][chunk_index] = count
+
+    def _update_stats(self) -> None:
+        self.avg_length = sum(self.doc_lengths.values()) / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def covers(self, query: str) -> bool:
+        """Return True if every query term (besides stopwords) occurs in the index"""
+        terms = [term for term in tokenize(query) if term not in _STOPWORDS]
+        return bool(terms) and all(term in self.postings for term in terms)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Rank chunks by BM25 score
+
+        Args:
+            query: Search query
+            k: Number of results to return
+
+        Returns:
+            (chunk_index, score) pairs, best first
+        """
+        n_docs = len(self.doc_terms)
+        if not n_docs:
+            return []
+
+        scores = Counter()
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_index, count in postings.items():
+                length_norm = 1 - self.b + self.b * self.doc_lengths[chunk_index] / (self.avg_length or 1)
+                scores[chunk_index] += idf * count * (self.k1 + 1) / (count + self.k1 * length_norm)
+
+        return scores.most_common(k)
+
+    @staticmethod
+    def is_keyword_query(query: str, max_terms: int = 4) -> bool:
+        """
+        Return True for short keyword lookups (identifiers, values, names)
+        rather than natural-language questions
+        """
+        words = query.split()
+        if not words or len(words) > max_terms or "?" in query:
+            return False
+        return words[0].lower().strip("\"'") not in _QUESTION_WORDS
+
+    def save(self, path: str) -> None:
+        """Write the index as JSON (atomically)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": INDEX_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "documents": {str(chunk_index): terms for chunk_index, terms in self.doc_terms.items()}
+        }
+
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        print(f"Saved lexical index ({len(self)} chunks): {path}")
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LexicalIndex"]:
+        """
+        Load a saved index (VectorStoreRegistry keeps loaded ones in memory)
+
+        Returns:
+            The index, or None if there is none (or it has an old format)
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        if data.get("version") != INDEX_VERSION:
+            return None
+
+        index = cls(k1=data["k1"], b=data["b"])
+        for chunk_index, terms in data["documents"].items():
+            index._add(int(chunk_index), terms)
+        index._update_stats()
+        return index
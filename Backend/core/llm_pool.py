@@ -0,0 +1,202 @@
+"""Process-wide pool of Gemini chat clients sharing HTTP connections"""
+import asyncio
+import threading
+import weakref
+from typing import Optional
+import httpx
+from langchain_google_genai import ChatGoogleGenerativeAI
+from core.fake_backends import FakeChatModel
+
+
+class _SharedTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    HTTP transport shared by every pooled client.
+
+    Async connections belong to the event loop that opened them, so one
+    connection pool is kept per running loop (dropped when the loop closes).
+    Clients built by the SDK never close it; the pool owns its lifetime.
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self.limits = limits
+        self._sync = httpx.HTTPTransport(limits=limits)
+        self._async = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _async_transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for closed_loop in [old for old in self._async if old.is_closed()]:
+                del self._async[closed_loop]
+
+            transport = self._async.get(loop)
+            if transport is None:
+                transport = self._async[loop] = httpx.AsyncHTTPTransport(limits=self.limits)
+            return transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._sync.handle_request(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._async_transport().handle_async_request(request)
+
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+    def connection_counts(self) -> dict:
+        """Count open and idle connections across all pools"""
+        with self._lock:
+            pools = [self._sync] + list(self._async.values())
+
+        connections = [c for transport in pools for c in transport._pool.connections]
+        return {
+            "open": sum(1 for c in connections if not c.is_closed()),
+            "idle": sum(1 for c in connections if c.is_idle()),
+            "event_loops": len(pools) - 1
+        }
+
+    def shutdown(self) -> None:
+        """Close the sync pool and drop the async pools"""
+        self._sync.close()
+        with self._lock:
+            self._async.clear()
+
+
+class LLMClientPool:
+    """
+    Reuses ChatGoogleGenerativeAI instances across chunks and chat sessions.
+
+    Instances are keyed by (api_key, model, temperature, other model
+    arguments); structured-output wrappers are cached per schema on top of
+    them. All instances send requests through one shared transport with
+    keep-alive and connection limits, so calls on every key reuse the same
+    open connections to the Gemini endpoint.
+
+    With backend="fake" the pool hands out offline FakeChatModel instances
+    instead (no keys or network needed), for benchmarks and load tests.
+    """
+
+    BACKENDS = ("google", "fake")
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        backend: str = "google",
+        fake_latency_seconds: float = 0.0,
+        fake_error_rate: float = 0.0,
+        fake_error_code: int = 503,
+        fake_keys: int = 4
+    ):
+        """
+        Args:
+            max_connections: Maximum open connections per event loop
+            max_keepalive_connections: Maximum idle connections kept open
+            keepalive_expiry: Seconds an idle connection is kept open
+            backend: "google" (Gemini API) or "fake" (offline, deterministic)
+            fake_latency_seconds: Simulated response time of fake calls
+            fake_error_rate: Share of fake calls that fail (0-1)
+            fake_error_code: HTTP status code of simulated failures
+            fake_keys: Placeholder API keys used by ingestion with the fake backend
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unsupported LLM backend: {backend}")
+
+        self.backend = backend
+        self.fake_latency_seconds = fake_latency_seconds
+        self.fake_error_rate = fake_error_rate
+        self.fake_error_code = fake_error_code
+        self.fake_keys = fake_keys
+        self.transport = _SharedTransport(httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        ))
+        self._llms = {}
+        self._structured = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _create(self, api_key: Optional[str], model_name: str, temperature: float, llm_kwargs: dict):
+        if self.backend == "fake":
+            return FakeChatModel(
+                latency_seconds=self.fake_latency_seconds,
+                error_rate=self.fake_error_rate,
+                error_code=self.fake_error_code
+            )
+
+        return ChatGoogleGenerativeAI(
+            model=model_name,
+            temperature=temperature,
+            google_api_key=api_key,
+            client_args={"transport": self.transport},
+            **llm_kwargs
+        )
+
+    def get(
+        self,
+        api_key: Optional[str],
+        model_name: str,
+        temperature: float,
+        schema: Optional[type] = None,
+        **llm_kwargs
+    ):
+        """
+        Get a pooled LLM
+
+        Args:
+            api_key: Google API key
+            model_name: Gemini model name
+            temperature: Sampling temperature
+            schema: Pydantic model for structured output (None for the plain chat model)
+            **llm_kwargs: Other ChatGoogleGenerativeAI arguments (e.g. timeout, max_retries)
+
+        Returns:
+            LLM instance, wrapped for structured output if a schema is given
+        """
+        key = (api_key, model_name, temperature, tuple(sorted(llm_kwargs.items())))
+
+        with self._lock:
+            llm = self._llms.get(key)
+            if llm is None:
+                self.misses += 1
+                llm = self._llms[key] = self._create(api_key, model_name, temperature, llm_kwargs)
+            else:
+                self.hits += 1
+
+            if schema is None:
+                return llm
+
+            structured = self._structured.get((key, schema))
+            if structured is None:
+                structured = self._structured[(key, schema)] = llm.with_structured_output(schema)
+            return structured
+
+    def close(self) -> None:
+        """Drop all pooled clients and close their connections"""
+        with self._lock:
+            self._llms.clear()
+            self._structured.clear()
+        self.transport.shutdown()
+
+    def get_stats(self) -> dict:
+        """Get pool statistics (keys are never reported)"""
+        with self._lock:
+            clients = len(self._llms)
+            structured = len(self._structured)
+
+        return {
+            "backend": self.backend,
+            "clients": clients,
+            "structured_clients": structured,
+            "hits": self.hits,
+            "misses": self.misses,
+            "connections": self.transport.connection_counts(),
+            "max_connections": self.transport.limits.max_connections,
+            "max_keepalive_connections": self.transport.limits.max_keepalive_connections
+        }
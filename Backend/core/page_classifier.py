@@ -0,0 +1,161 @@
+"""Per-page PDF classification used to route pages to a partition strategy"""
+from typing import List, Dict, Tuple
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LTChar, LTContainer, LTCurve, LTImage
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+
+# Images smaller than this (in PDF points, width * height) are bullets, icons or rules
+MIN_IMAGE_AREA = 48 * 48
+
+# Images of the same size repeated on at least this share of pages are
+# backgrounds, watermarks or logos rather than figures
+REPEATED_IMAGE_RATIO = 0.5
+
+# Horizontal lines/thin rects at least this share of the page wide and at most
+# this thick (in points) are table rules (booktabs tables have only a few)
+TABLE_RULE_MIN_WIDTH_RATIO = 0.25
+TABLE_RULE_MAX_THICKNESS = 2.0
+
+
+class PageClassifier:
+    """Classifies PDF pages by text layer and visual content without running layout models"""
+
+    def __init__(self, min_text_chars: int = 50, min_graphics_objects: int = 20, min_table_rules: int = 2):
+        """
+        Args:
+            min_text_chars: Minimum extractable characters for a page to count as having a text layer
+            min_graphics_objects: Minimum vector lines/rects/curves for a page to count as having figures or tables
+            min_table_rules: Minimum wide horizontal rules for a page to count as having a table
+        """
+        self.min_text_chars = min_text_chars
+        self.min_graphics_objects = min_graphics_objects
+        self.min_table_rules = min_table_rules
+
+    @staticmethod
+    def _count_objects(container, counts: dict, page_width: float) -> None:
+        """Recursively count characters, images, vector graphics and table rules in a layout container"""
+        for obj in container:
+            if isinstance(obj, LTChar):
+                if not obj.get_text().isspace():
+                    counts['text_chars'] += 1
+            elif isinstance(obj, LTImage):
+                if obj.width * obj.height >= MIN_IMAGE_AREA:
+                    counts['image_sizes'].append((round(obj.width), round(obj.height)))
+            elif isinstance(obj, LTCurve):
+                # LTLine and LTRect are subclasses of LTCurve
+                counts['graphics'] += 1
+                if obj.height <= TABLE_RULE_MAX_THICKNESS and obj.width >= page_width * TABLE_RULE_MIN_WIDTH_RATIO:
+                    counts['rules'].append((round(obj.y0), round(obj.width)))
+            elif isinstance(obj, LTContainer):
+                PageClassifier._count_objects(obj, counts, page_width)
+
+    def classify(
+        self,
+        file_path: str,
+        extract_images: bool = True,
+        extract_tables: bool = True
+    ) -> List[Dict]:
+        """
+        Classify every page of a PDF.
+
+        Layout analysis is disabled (laparams=None), so this only walks the
+        raw page objects and is cheap compared to any partition strategy.
+
+        Args:
+            file_path: Path to the PDF file
+            extract_images: Whether images will be extracted (pages with images need hi_res)
+            extract_tables: Whether tables will be inferred (pages with table rules or ruled graphics need hi_res)
+
+        Returns:
+            List of dicts with page_number, text_chars, images, graphics, table_rules and strategy
+        """
+        page_counts = []
+
+        with open(file_path, "rb") as f:
+            document = PDFDocument(PDFParser(f))
+            resource_manager = PDFResourceManager()
+            device = PDFPageAggregator(resource_manager, laparams=None)
+            interpreter = PDFPageInterpreter(resource_manager, device)
+
+            for page in PDFPage.create_pages(document):
+                interpreter.process_page(page)
+                counts = {'text_chars': 0, 'image_sizes': [], 'graphics': 0, 'rules': []}
+                self._count_objects(device.get_result(), counts, page.mediabox[2] - page.mediabox[0])
+                page_counts.append(counts)
+
+        # Find image sizes and rules that repeat across most pages (page decoration, header/footer rules)
+        repeated_sizes = self._repeated(page_counts, 'image_sizes')
+        repeated_rules = self._repeated(page_counts, 'rules')
+
+        pages = []
+        for page_number, counts in enumerate(page_counts, 1):
+            images = len([size for size in counts['image_sizes'] if size not in repeated_sizes])
+            table_rules = len([rule for rule in counts['rules'] if rule not in repeated_rules])
+
+            has_text_layer = counts['text_chars'] >= self.min_text_chars
+            has_images = images > 0
+            has_graphics = counts['graphics'] >= self.min_graphics_objects
+            has_table_rules = table_rules >= self.min_table_rules
+
+            # Scanned pages need OCR; figures and tables need layout detection
+            needs_hi_res = (
+                not has_text_layer
+                or (extract_images and (has_images or has_graphics))
+                or (extract_tables and (has_graphics or has_table_rules))
+            )
+
+            pages.append({
+                'page_number': page_number,
+                'text_chars': counts['text_chars'],
+                'images': images,
+                'graphics': counts['graphics'],
+                'table_rules': table_rules,
+                'strategy': "hi_res" if needs_hi_res else "fast"
+            })
+
+        return pages
+
+    @staticmethod
+    def _repeated(page_counts: List[Dict], field: str) -> set:
+        """Values of a per-page list field that occur on at least REPEATED_IMAGE_RATIO of the pages"""
+        if len(page_counts) < 3:
+            return set()
+
+        value_pages = {}
+        for counts in page_counts:
+            for value in set(counts[field]):
+                value_pages[value] = value_pages.get(value, 0) + 1
+        return {
+            value for value, count in value_pages.items()
+            if count >= len(page_counts) * REPEATED_IMAGE_RATIO
+        }
+
+    @staticmethod
+    def group_pages(pages: List[Dict], max_pages: int = 0) -> List[Tuple[int, int, str]]:
+        """
+        Group consecutive pages with the same strategy into page ranges
+
+        Args:
+            pages: Output of classify()
+            max_pages: Maximum pages per range (0 for no limit)
+
+        Returns:
+            List of (first_page, last_page, strategy) tuples, 1-based and inclusive
+        """
+        ranges = []
+
+        for page in pages:
+            page_number = page['page_number']
+            if ranges:
+                first, last, strategy = ranges[-1]
+                same_run = strategy == page['strategy'] and last == page_number - 1
+                if same_run and (max_pages <= 0 or page_number - first < max_pages):
+                    ranges[-1] = (first, page_number, strategy)
+                    continue
+            ranges.append((page_number, page_number, page['strategy']))
+
+        return ranges
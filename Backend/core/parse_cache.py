@@ -0,0 +1,125 @@
+"""Content-addressed cache of partitioned PDF elements"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional
+from utils.file_helpers import FileHandler
+
+
+class ParseCache:
+    """
+    Disk cache of partition results keyed by PDF SHA-256 and partition parameters.
+
+    Entries are the same pickled element lists saved as _checkpoint1.pkl.
+    The least recently used entries (by file mtime, refreshed on every hit)
+    are evicted once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """Return SHA-256 hex digest of a file"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(file_hash: str, params: dict) -> str:
+        """
+        Build cache key from file hash and partition parameters
+
+        Args:
+            file_hash: SHA-256 of the PDF file
+            params: Parameters that affect the partition output (JSON serialisable)
+
+        Returns:
+            Cache key
+        """
+        params_json = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(f"{file_hash}:{params_json}".encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pkl"
+
+    def get(self, key: str) -> Optional[list]:
+        """
+        Load cached elements
+
+        Returns:
+            List of elements, or None on a miss
+        """
+        entry_path = self._entry_path(key)
+
+        # Open under the lock so evict() can't unlink the entry between the
+        # check and the read (an open file stays readable after unlink)
+        with self._lock:
+            try:
+                f = open(entry_path, "rb")
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            # Refresh mtime so eviction treats this entry as recently used
+            os.utime(entry_path)
+            self.hits += 1
+
+        print(f"Parse cache hit: {key[:12]}")
+        with f:
+            return pickle.load(f)
+
+    def put(self, key: str, elements: list) -> None:
+        """Store elements and evict old entries if over the size limit"""
+        entry_path = self._entry_path(key)
+        tmp_path = entry_path.with_name(f"{key}.{uuid.uuid4().hex[:8]}.tmp")
+
+        FileHandler.save_pickle(elements, str(tmp_path))
+        os.replace(tmp_path, entry_path)
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            entries = sorted(self.cache_dir.glob("*.pkl"), key=lambda p: p.stat().st_mtime)
+            total_bytes = sum(entry.stat().st_size for entry in entries)
+
+            for entry in entries:
+                if total_bytes <= self.max_bytes:
+                    break
+                size = entry.stat().st_size
+                try:
+                    entry.unlink()
+                except OSError as e:
+                    # e.g. on Windows while a reader still has the file open
+                    print(f"Parse cache could not evict {entry.stem[:12]}: {e}")
+                    continue
+                total_bytes -= size
+                self.evictions += 1
+                print(f"Parse cache evicted: {entry.stem[:12]}")
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        entries = list(self.cache_dir.glob("*.pkl"))
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "size_bytes": sum(entry.stat().st_size for entry in entries),
+            "max_bytes": self.max_bytes
+        }
@@ -0,0 +1,240 @@
+"""Persistent pool of warm parser worker processes"""
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+
+def warm_worker(hi_res_model_name: str, languages: List[str], tesseract_cmd: str) -> None:
+    """
+    Worker process initializer: load the layout model and Tesseract data once.
+
+    unstructured_inference keeps loaded models in a module-level cache, so
+    every later hi_res partition in this process reuses the warm model.
+    Tesseract runs as a subprocess per call; warming it validates the
+    language data and primes the OS file cache for the traineddata files.
+    """
+    import pytesseract
+    from PIL import Image
+    from unstructured_inference.models.base import get_model
+
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    try:
+        get_model(hi_res_model_name)
+        print(f"Parser worker: loaded layout model '{hi_res_model_name}'")
+    except Exception as e:
+        print(f"Parser worker: could not preload layout model: {e}")
+
+    try:
+        pytesseract.image_to_string(Image.new("L", (64, 32), 255), lang="+".join(languages))
+        print(f"Parser worker: warmed Tesseract for {languages}")
+    except Exception as e:
+        print(f"Parser worker: could not warm Tesseract: {e}")
+
+
+def _noop() -> None:
+    """Warm-up job used to start worker processes eagerly"""
+    return None
+
+
+class _WorkerSlot:
+    """One worker process (a single-process executor) and its job count"""
+
+    def __init__(self, executor: ProcessPoolExecutor):
+        self.executor = executor
+        self.jobs = 0
+        self.busy = False
+        self.broken = False
+
+
+class ParserWorkerPool:
+    """
+    Long-lived pool of parser processes with preloaded models.
+
+    Each worker is a single-process executor. Jobs wait in one shared queue
+    and are handed to whichever worker is idle, so a long document doesn't
+    hold up jobs queued behind it while another worker is free.
+
+    To cap memory growth, a worker is recycled on its own once it has run
+    max_jobs_per_worker jobs: it is stopped while idle and a fresh warm
+    worker takes its place, so only that worker's models are reloaded
+    rather than the whole pool's at once. (ProcessPoolExecutor's max_tasks_per_child is not used because
+    it deadlocks on 3.13.0, even with spawn.) A worker that crashed is
+    replaced the same way.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_jobs_per_worker: int = 0,
+        hi_res_model_name: str = "yolox",
+        languages: Optional[List[str]] = None,
+        tesseract_cmd: str = "tesseract"
+    ):
+        """
+        Args:
+            workers: Number of worker processes
+            max_jobs_per_worker: Jobs before a worker is recycled (0 for never)
+            hi_res_model_name: Layout model to preload
+            languages: Tesseract language codes to warm
+            tesseract_cmd: Path of the tesseract binary
+        """
+        self.workers = workers
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.hi_res_model_name = hi_res_model_name
+        self.languages = languages or ["eng"]
+        self.tesseract_cmd = tesseract_cmd
+
+        self._slots: List[_WorkerSlot] = []
+        self._queue: deque = deque()
+        # Re-entrant: a job's done callback may run inside _dispatch()
+        self._lock = threading.RLock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.recycles = 0
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._slots)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        """Create a single-worker executor and start its process eagerly"""
+        executor = ProcessPoolExecutor(
+            max_workers=1,
+            # Don't fork the server process (it runs threads and an event loop)
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_worker,
+            initargs=(self.hi_res_model_name, self.languages, self.tesseract_cmd)
+        )
+
+        # The worker is spawned on demand; submit a job so it starts
+        # (and warms up) now instead of on the first upload
+        executor.submit(_noop)
+
+        return executor
+
+    def start(self) -> None:
+        """Start worker processes and load models in each of them"""
+        with self._lock:
+            if self._slots:
+                return
+            self._slots = [_WorkerSlot(self._new_executor()) for _ in range(self.workers)]
+        print(f"Parser pool started with {self.workers} worker(s)")
+
+    def _recycle(self, slot: _WorkerSlot) -> None:
+        """Replace an idle worker with a fresh one"""
+        # Shut the old executor down from another thread: this may run in its
+        # own management thread (a job's done callback), which can't join itself
+        threading.Thread(target=slot.executor.shutdown, kwargs={"wait": False}, daemon=True).start()
+        slot.executor = self._new_executor()
+        slot.jobs = 0
+        slot.broken = False
+        self.recycles += 1
+        print(f"Parser pool recycled a worker (recycle #{self.recycles})")
+
+    def shutdown(self) -> None:
+        """Stop worker processes and cancel queued jobs"""
+        with self._lock:
+            if not self._slots:
+                return
+            slots, self._slots = self._slots, []
+            queued, self._queue = self._queue, deque()
+
+        for future, _, _ in queued:
+            future.cancel()
+        for slot in slots:
+            slot.executor.shutdown(wait=False, cancel_futures=True)
+        print("Parser pool stopped")
+
+    def _dispatch(self) -> None:
+        """Hand queued jobs to idle workers (called with the lock held)"""
+        for slot in self._slots:
+            while not slot.busy and self._queue:
+                future, fn, args = self._queue.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                if slot.broken or (self.max_jobs_per_worker and slot.jobs >= self.max_jobs_per_worker):
+                    self._recycle(slot)
+
+                slot.busy = True
+                try:
+                    job = slot.executor.submit(fn, *args)
+                except Exception as e:
+                    slot.busy = False
+                    slot.broken = True
+                    self.failed += 1
+                    future.set_exception(e)
+                    continue
+                job.add_done_callback(
+                    lambda job, slot=slot, future=future: self._on_done(slot, future, job)
+                )
+
+    def _on_done(self, slot: _WorkerSlot, future: Future, job: Future) -> None:
+        """Pass a worker's result on and give the worker its next job"""
+        error = None if job.cancelled() else job.exception()
+
+        with self._lock:
+            slot.busy = False
+            slot.jobs += 1
+            if job.cancelled() or error is not None:
+                self.failed += 1
+                slot.broken = isinstance(error, BrokenProcessPool)
+            else:
+                self.completed += 1
+            self._dispatch()
+
+        if job.cancelled():
+            future.set_exception(CancelledError("Parser worker was stopped"))
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(job.result())
+
+    def submit(self, fn, *args) -> Future:
+        """
+        Queue a parse job
+
+        Args:
+            fn: Picklable module-level function to run in a worker
+            *args: Picklable arguments
+
+        Returns:
+            Future with the job result
+        """
+        future = Future()
+        with self._lock:
+            if not self._slots:
+                raise RuntimeError("Parser pool is not running")
+
+            self._queue.append((future, fn, args))
+            self.submitted += 1
+            self._dispatch()
+        return future
+
+    def get_queue_depth(self) -> int:
+        """Number of jobs waiting for a free worker"""
+        with self._lock:
+            return len(self._queue)
+
+    def get_stats(self) -> dict:
+        """Get pool statistics"""
+        with self._lock:
+            running = sum(1 for slot in self._slots if slot.busy)
+            queued = len(self._queue)
+
+        return {
+            "running": self.is_running,
+            "workers": self.workers,
+            "max_jobs_per_worker": self.max_jobs_per_worker,
+            "queue_depth": queued,
+            "active_jobs": running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "recycles": self.recycles
+        }
@@ -0,0 +1,334 @@
+"""Streaming ingestion pipeline connecting parse, summary and embedding stages with bounded queues"""
+import asyncio
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from langchain_core.documents import Document
+from core.document_parser import DocumentParser
+from core.content_processor import ContentProcessor
+from core.vector_store import VectorStoreManager
+from core.job_journal import JobJournal
+from core.embedding_ingestor import EmbeddingIngestor
+from utils.file_helpers import FileHandler
+
+
+# End-of-stream marker passed between stages
+_END = object()
+
+
+class IngestionPipeline:
+    """
+    Streams chunks through parsing, content separation, AI summary,
+    embedding and Chroma upsert as soon as each one is ready.
+
+    Stages are connected by bounded asyncio queues, so a slow stage applies
+    backpressure upstream and at most queue_size items wait between any two
+    stages. The first chunk becomes searchable while later pages are still
+    being parsed.
+
+    With a job journal, parsed chunks are checkpointed once parsing ends and
+    every upserted document is recorded, so a resumed run reads chunks from
+    the checkpoint and skips documents that are already embedded.
+
+    With an embedding ingestor, ready batches are embedded concurrently on
+    all API keys instead of one at a time.
+    """
+
+    def __init__(
+        self,
+        parser: DocumentParser,
+        processor: ContentProcessor,
+        vector_manager: VectorStoreManager,
+        queue_size: int = 8,
+        summary_workers: int = 4,
+        embed_batch_size: int = 16,
+        on_progress: Optional[Callable[[Dict], None]] = None,
+        journal: Optional[JobJournal] = None,
+        embedder: Optional[EmbeddingIngestor] = None
+    ):
+        """
+        Args:
+            parser: Document parser (its iter_chunks() feeds the pipeline)
+            processor: Content processor for separation and AI summaries
+            vector_manager: Vector store manager for embedding and upsert
+            queue_size: Capacity of each inter-stage queue
+            summary_workers: Concurrent AI summary calls
+            embed_batch_size: Maximum documents per embedding/upsert call
+            on_progress: Called with pipeline stats whenever chunks are indexed
+            journal: Job journal of the document (enables checkpoints and resume)
+            embedder: Concurrent multi-key embedding (single-client upserts if None)
+        """
+        self.parser = parser
+        self.processor = processor
+        self.vector_manager = vector_manager
+        self.queue_size = queue_size
+        self.summary_workers = summary_workers
+        self.embed_batch_size = embed_batch_size
+        self.on_progress = on_progress
+        self.journal = journal
+        self.embedder = embedder
+
+        self.chunks: List = []
+        self.documents: List[Document] = []
+        self.stats: Dict = {}
+
+    @staticmethod
+    def _put_threadsafe(loop, queue: asyncio.Queue, item, stop_event: threading.Event) -> bool:
+        """Put an item on an asyncio queue from a worker thread, blocking while it is full"""
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=0.5)
+                return True
+            except TimeoutError:
+                if stop_event.is_set():
+                    future.cancel()
+                    return False
+
+    def _parse_stage(
+        self,
+        loop,
+        chunk_queue: asyncio.Queue,
+        stop_event: threading.Event,
+        parse_args: tuple,
+        checkpoint_chunks: Optional[List]
+    ) -> None:
+        """Run the parser in a worker thread (or replay the checkpoint) and feed chunks into the pipeline"""
+        chunks = checkpoint_chunks if checkpoint_chunks is not None else self.parser.iter_chunks(*parse_args)
+        for chunk in chunks:
+            if not self._put_threadsafe(loop, chunk_queue, chunk, stop_event):
+                return
+        self._put_threadsafe(loop, chunk_queue, _END, stop_event)
+
+    async def _separate_stage(
+        self,
+        chunk_queue: asyncio.Queue,
+        content_queue: asyncio.Queue,
+        checkpoint_path: Optional[str]
+    ) -> None:
+        """Extract text, tables and images from each chunk"""
+        image_counter = {'count': 1}
+
+        while True:
+            chunk = await chunk_queue.get()
+            if chunk is _END:
+                break
+
+            self.chunks.append(chunk)
+            chunk_index = len(self.chunks)
+            self.stats["chunks_parsed"] = chunk_index
+
+            content_data = await asyncio.to_thread(
+                self.processor.separate_content_types, chunk, image_counter
+            )
+            await content_queue.put((chunk_index, content_data))
+
+        if checkpoint_path and self.journal is not None and not self.journal.is_stage_complete("parsed"):
+            await asyncio.to_thread(FileHandler.save_pickle, self.chunks, checkpoint_path)
+            await asyncio.to_thread(self.journal.complete_stage, "parsed")
+
+        for _ in range(self.summary_workers):
+            await content_queue.put(_END)
+
+    async def _summary_worker(self, content_queue: asyncio.Queue, document_queue: asyncio.Queue) -> None:
+        """Create AI summaries and LangChain documents"""
+        # Batches don't wait for other workers once all of them are in one
+        with self.processor.batch_producer():
+            while True:
+                item = await content_queue.get()
+                if item is _END:
+                    break
+
+                chunk_index, content_data = item
+                ai_response = await self.processor.summarise_chunk_async(chunk_index, content_data)
+                self.stats["chunks_summarised"] += 1
+
+                # The fallback document is indexed now and replaced if the re-queue pass recovers it
+                if self.processor.is_fallback(ai_response):
+                    self._failed_chunks[chunk_index] = content_data
+
+                await document_queue.put(
+                    self.processor.build_document(chunk_index, content_data, ai_response)
+                )
+
+        await document_queue.put(_END)
+
+    def _not_embedded(self, documents: List[Document]) -> List[Document]:
+        return [doc for doc in documents if not self.journal.is_embedded(doc)]
+
+    def _record_embedded(self, documents: List[Document]) -> None:
+        if self.journal is not None:
+            self.journal.record_embedded(documents)
+
+    async def _upsert(self, vectorstore, documents: List[Document]) -> None:
+        """Embed and upsert documents, recording them in the journal"""
+        if self.embedder is not None:
+            await self.embedder.add_documents(vectorstore, documents, on_batch=self._record_embedded)
+        else:
+            await asyncio.to_thread(self.vector_manager.add_documents, vectorstore, documents)
+            await asyncio.to_thread(self._record_embedded, documents)
+
+    async def _index_batch(self, vectorstore, batch: List[Document], slots: asyncio.Semaphore) -> None:
+        """Upsert a batch (skipping already embedded documents) and report progress"""
+        try:
+            pending = batch
+            if self.journal is not None:
+                pending = await asyncio.to_thread(self._not_embedded, batch)
+
+            if pending:
+                await self._upsert(vectorstore, pending)
+            self.documents.extend(batch)
+
+            self.stats["chunks_indexed"] = len(self.documents)
+            if self.stats["time_to_first_indexed"] is None:
+                self.stats["time_to_first_indexed"] = round(time.time() - self._start_time, 2)
+            if self.on_progress:
+                self.on_progress(dict(self.stats))
+        finally:
+            slots.release()
+
+    async def _embed_stage(self, document_queue: asyncio.Queue, vectorstore) -> None:
+        """Embed and upsert documents in batches of whatever is ready"""
+        finished_workers = 0
+
+        # Batches in flight (the queue still applies backpressure once all are busy)
+        slots = asyncio.Semaphore(self.embedder.max_concurrency if self.embedder is not None else 1)
+
+        async with asyncio.TaskGroup() as uploads:
+            while finished_workers < self.summary_workers:
+                batch = []
+
+                # Wait for one document, then take what else is already queued
+                item = await document_queue.get()
+                while True:
+                    if item is _END:
+                        finished_workers += 1
+                    else:
+                        batch.append(item)
+                    if len(batch) >= self.embed_batch_size or document_queue.empty():
+                        break
+                    item = document_queue.get_nowait()
+
+                if not batch:
+                    continue
+
+                await slots.acquire()
+                uploads.create_task(self._index_batch(vectorstore, batch, slots))
+
+    async def _requeue_failed(self, vectorstore) -> None:
+        """Retry chunks that got fallback summaries and upsert the recovered documents"""
+        recovered = await self.processor.requeue_failed_async(self._failed_chunks)
+        if not recovered:
+            return
+
+        documents = [
+            self.processor.build_document(chunk_index, self._failed_chunks[chunk_index], ai_response)
+            for chunk_index, ai_response in recovered.items()
+        ]
+        await self._upsert(vectorstore, documents)
+
+        self.documents = [
+            doc for doc in self.documents if doc.metadata["chunk_index"] not in recovered
+        ] + documents
+
+    async def run(
+        self,
+        file_path: str,
+        max_characters: int,
+        new_after_n_chars: int,
+        combine_text_under_n_chars: int,
+        extract_images: bool,
+        extract_tables: bool,
+        languages: List[str],
+        persist_directory: str,
+        collection_name: str,
+        checkpoint_path: Optional[str] = None
+    ) -> List[Document]:
+        """
+        Ingest a PDF end to end
+
+        Args:
+            file_path: Path to the PDF file
+            max_characters: Maximum characters per chunk
+            new_after_n_chars: Start new chunk after this many characters
+            combine_text_under_n_chars: Combine small text blocks
+            extract_images: Whether to extract images
+            extract_tables: Whether to infer table structure
+            languages: List of language names or codes
+            persist_directory: Directory to persist the vector store
+            collection_name: Name of the collection
+            checkpoint_path: Pickle file for parsed chunks (used with the journal)
+
+        Returns:
+            List of LangChain documents ordered by chunk index
+            (parsed chunks are kept in self.chunks, timings in self.stats)
+        """
+        self._start_time = time.time()
+        self.chunks = []
+        self.documents = []
+        self._failed_chunks = {}
+        self.stats = {
+            "chunks_parsed": 0,
+            "chunks_summarised": 0,
+            "chunks_indexed": 0,
+            "time_to_first_indexed": None,
+            "total_time": None
+        }
+
+        loop = asyncio.get_running_loop()
+        stop_event = threading.Event()
+        parse_args = (
+            file_path, max_characters, new_after_n_chars, combine_text_under_n_chars,
+            extract_images, extract_tables, languages
+        )
+
+        # Resume: replay parsed chunks instead of parsing again
+        checkpoint_chunks = None
+        if (
+            checkpoint_path and self.journal is not None
+            and self.journal.is_stage_complete("parsed") and os.path.exists(checkpoint_path)
+        ):
+            checkpoint_chunks = await asyncio.to_thread(FileHandler.load_pickle, checkpoint_path)
+            print(f"Resuming from checkpoint with {len(checkpoint_chunks)} parsed chunks")
+
+        chunk_queue = asyncio.Queue(maxsize=self.queue_size)
+        content_queue = asyncio.Queue(maxsize=self.queue_size)
+        document_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        vectorstore = await asyncio.to_thread(
+            self.vector_manager.create_empty_store, persist_directory, collection_name
+        )
+
+        print(f"Streaming pipeline: queue size {self.queue_size}, "
+              f"{self.summary_workers} summary workers, embed batch {self.embed_batch_size}")
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(asyncio.to_thread(
+                    self._parse_stage, loop, chunk_queue, stop_event, parse_args, checkpoint_chunks
+                ))
+                group.create_task(self._separate_stage(chunk_queue, content_queue, checkpoint_path))
+                for _ in range(self.summary_workers):
+                    group.create_task(self._summary_worker(content_queue, document_queue))
+                group.create_task(self._embed_stage(document_queue, vectorstore))
+        except ExceptionGroup as group_error:
+            # Surface the original stage error to the caller
+            raise group_error.exceptions[0]
+        finally:
+            # Unblock the parser thread if another stage failed
+            stop_event.set()
+
+        if self._failed_chunks and self.processor.requeue_failed:
+            await self._requeue_failed(vectorstore)
+
+        if self.processor.image_dedup is not None:
+            await asyncio.to_thread(self.processor.image_dedup.save)
+
+        if self.journal is not None:
+            await asyncio.to_thread(self.journal.complete_stage, "indexed")
+
+        self.stats["total_time"] = round(time.time() - self._start_time, 2)
+        print(f"Streaming pipeline finished: {self.stats}")
+
+        return sorted(self.documents, key=lambda doc: doc.metadata["chunk_index"])
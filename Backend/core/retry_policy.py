@@ -0,0 +1,121 @@
+"""Error classification and backoff for LLM calls"""
+import asyncio
+import random
+import re
+from typing import Optional
+
+
+# Cooldown applied to a key whose daily quota or credentials failed
+LONG_COOLDOWN_SECONDS = 3600.0
+
+_RETRY_DELAY_PATTERN = re.compile(r"retrydelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+class RetryPolicy:
+    """
+    Decides how a failed LLM call is retried.
+
+    Errors are classified as:
+    - rate_limit / quota: 429 / RESOURCE_EXHAUSTED; the key cools down and
+      the call fails over to another key
+    - auth: 401 / 403; the key is taken out of rotation for a long cooldown
+      and the call fails over to another key (or fails at once if every
+      key is cooling down, instead of waiting out the chunk deadline)
+    - server: 5xx, timeouts and connection errors; retried with backoff
+    - invalid: 400 / 404; not retried (the same request fails again)
+    - unknown: anything else (e.g. unparseable structured output); retried
+    """
+
+    RETRYABLE = {"rate_limit", "quota", "server", "unknown"}
+    # Retried only on another key
+    FAILOVER_ONLY = {"auth"}
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 2.0,
+        max_delay: float = 60.0,
+        chunk_deadline: float = 300.0,
+        request_timeout: float = 120.0
+    ):
+        """
+        Args:
+            max_attempts: Maximum LLM calls per chunk (including the first)
+            base_delay: Backoff delay before the first retry in seconds
+            max_delay: Maximum backoff delay in seconds
+            chunk_deadline: Time budget per chunk in seconds, from its first request
+            request_timeout: Timeout of a single LLM request in seconds
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.chunk_deadline = chunk_deadline
+        self.request_timeout = request_timeout
+
+    @staticmethod
+    def _status_code(error: BaseException) -> Optional[int]:
+        """Find an HTTP status code on the error or the error it was raised from"""
+        while error is not None:
+            code = getattr(error, "code", None)
+            if isinstance(code, int):
+                return code
+            error = error.__cause__
+        return None
+
+    @staticmethod
+    def classify(error: BaseException) -> str:
+        """Classify an LLM error (see class docstring)"""
+        code = RetryPolicy._status_code(error)
+        message = str(error).lower()
+
+        if code == 429 or "resource_exhausted" in message:
+            return "quota" if "quota" in message else "rate_limit"
+        if code in (401, 403) or "api key not valid" in message or "permission_denied" in message:
+            return "auth"
+        if code in (400, 404):
+            return "invalid"
+        if (code is not None and code >= 500) or isinstance(error, (TimeoutError, ConnectionError)):
+            return "server"
+        if "unavailable" in message or "deadline" in message or "timed out" in message:
+            return "server"
+        return "unknown"
+
+    @classmethod
+    def is_retryable(cls, category: str, keys_available: int) -> bool:
+        """
+        Return True if a failed call should be retried
+
+        Args:
+            category: Error category from classify()
+            keys_available: Keys not in a cooldown (after the failing key's cooldown was applied)
+        """
+        if category in cls.FAILOVER_ONLY:
+            return keys_available > 0
+        return category in cls.RETRYABLE
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for the given retry number (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def key_cooldown(error: BaseException, category: str) -> float:
+        """
+        Seconds the failing key should not be used
+
+        Per-minute quota errors use the retry delay suggested by the API;
+        daily quota and credential errors take the key out for a long time.
+        """
+        message = str(error).lower()
+
+        if category == "auth" or (category == "quota" and "perday" in message):
+            return LONG_COOLDOWN_SECONDS
+        if category in ("quota", "rate_limit"):
+            match = _RETRY_DELAY_PATTERN.search(message)
+            return float(match.group(1)) if match else 60.0
+        return 0.0
+
+    async def sleep(self, attempt: int) -> float:
+        """Sleep for the backoff delay and return it"""
+        delay = self.backoff(attempt)
+        await asyncio.sleep(delay)
+        return delay
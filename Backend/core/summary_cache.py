@@ -0,0 +1,152 @@
+"""Persistent cache of AI chunk summaries"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+
+class SummaryCache:
+    """
+    SQLite cache of structured AI summaries keyed by chunk content hash.
+
+    The key covers everything that determines the LLM output: chunk text,
+    table HTML, hashes of the images sent, model, temperature and prompt
+    version. Entries beyond max_entries (least recently used first) and
+    entries older than max_age_days are evicted.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 0, max_age_days: float = 0):
+        """
+        Args:
+            db_path: SQLite database file
+            max_entries: Maximum cached summaries (0 for no limit)
+            max_age_days: Maximum age of a cached summary in days (0 for no limit)
+        """
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, model TEXT, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_last_used ON summaries (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(
+        text: str,
+        tables: List[str],
+        image_hashes: List[str],
+        model_name: str,
+        temperature: float,
+        prompt_version: str
+    ) -> str:
+        """
+        Build cache key from chunk content and LLM settings
+
+        Args:
+            text: Chunk text
+            tables: Table HTML sent with the chunk
+            image_hashes: Content hashes of the images sent with the chunk (in order)
+            model_name: LLM model name
+            temperature: LLM temperature
+            prompt_version: Version of the summary prompt and output schema
+
+        Returns:
+            Cache key
+        """
+        payload = json.dumps({
+            "text": text,
+            "tables": tables,
+            "images": image_hashes,
+            "model": model_name,
+            "temperature": temperature,
+            "prompt_version": prompt_version
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Load a cached summary
+
+        Returns:
+            Summary fields as a dict, or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def put(self, key: str, response: dict, model_name: str = "") -> None:
+        """Store a summary and evict old entries if over the limits"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, response, model, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(response, ensure_ascii=False), model_name, now, now)
+            )
+            self._conn.commit()
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete expired entries and least recently used entries beyond max_entries"""
+        with self._lock:
+            deleted = 0
+
+            if self.max_age_days > 0:
+                cutoff = time.time() - self.max_age_days * 86400
+                deleted += self._conn.execute(
+                    "DELETE FROM summaries WHERE created < ?", (cutoff,)
+                ).rowcount
+
+            entries = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            if self.max_entries > 0 and entries > self.max_entries:
+                deleted += self._conn.execute(
+                    "DELETE FROM summaries WHERE key NOT IN "
+                    "(SELECT key FROM summaries ORDER BY last_used DESC LIMIT ?)",
+                    (self.max_entries,)
+                ).rowcount
+
+            if deleted:
+                self._conn.commit()
+                self.evictions += deleted
+                print(f"Summary cache evicted {deleted} entries")
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "max_age_days": self.max_age_days
+        }
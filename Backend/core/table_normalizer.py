@@ -0,0 +1,175 @@
+"""Compact text form of HTML tables for prompts and embeddings"""
+import csv
+import io
+import re
+from html.parser import HTMLParser
+from typing import List, Optional
+
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class _TableParser(HTMLParser):
+    """Collects the cells of an HTML table (nested tables are flattened into their cell)"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._row = None
+        self._cell = None
+        self._depth = 0
+
+    @staticmethod
+    def _span(attrs, name: str) -> int:
+        value = dict(attrs).get(name) or "1"
+        return max(1, min(int(value), 100)) if value.isdigit() else 1
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._depth += 1
+        if self._depth > 1:
+            return
+
+        if tag == "tr":
+            self._row = []
+            self.rows.append(self._row)
+        elif tag in ("td", "th"):
+            if self._row is None:
+                self._row = []
+                self.rows.append(self._row)
+            self._cell = {
+                "text": [],
+                "header": tag == "th",
+                "colspan": self._span(attrs, "colspan"),
+                "rowspan": self._span(attrs, "rowspan")
+            }
+            self._row.append(self._cell)
+        elif tag == "br" and self._cell is not None:
+            self._cell["text"].append(" ")
+
+    def handle_endtag(self, tag):
+        if tag == "table":
+            self._depth -= 1
+        if self._depth > 1:
+            return
+
+        if tag in ("td", "th"):
+            self._cell = None
+        elif tag == "tr":
+            self._row = None
+            self._cell = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell["text"].append(data)
+
+
+class TableNormalizer:
+    """
+    Turns Table elements into markdown (or CSV) with a header row.
+
+    Cells spanning several columns or rows are repeated in each position,
+    so every row has the same columns. Whitespace is collapsed and empty
+    rows and columns are dropped. Tables that can't be parsed fall back to
+    the element's plain text.
+    """
+
+    STYLES = ("markdown", "csv")
+
+    def __init__(self, style: str = "markdown", max_cell_chars: int = 200):
+        """
+        Args:
+            style: "markdown" or "csv"
+            max_cell_chars: Longer cells are truncated (0 = no limit)
+        """
+        style = style.lower()
+        if style not in self.STYLES:
+            raise ValueError(f"Unsupported table style: {style}")
+
+        self.style = style
+        self.max_cell_chars = max_cell_chars
+
+    def _clean(self, text: str) -> str:
+        text = _WHITESPACE_PATTERN.sub(" ", text).strip()
+        if self.max_cell_chars and len(text) > self.max_cell_chars:
+            text = text[:self.max_cell_chars - 3].rstrip() + "..."
+        return text
+
+    def parse(self, html: str) -> List[List[str]]:
+        """
+        Parse an HTML table into a grid of cell texts
+
+        Returns:
+            Rows of equal length (the first row is the header), empty if no cells were found
+        """
+        parser = _TableParser()
+        parser.feed(html)
+        parser.close()
+
+        grid = []
+        pending = {}  # column -> [text, rows left] of cells spanning down
+        for row in parser.rows:
+            cells = []
+            column = 0
+            queue = list(row)
+            while queue or column in pending:
+                if column in pending:
+                    text, rows_left = pending[column]
+                    cells.append(text)
+                    if rows_left > 1:
+                        pending[column] = [text, rows_left - 1]
+                    else:
+                        del pending[column]
+                    column += 1
+                    continue
+
+                cell = queue.pop(0)
+                text = self._clean("".join(cell["text"]))
+                for _ in range(cell["colspan"]):
+                    cells.append(text)
+                    if cell["rowspan"] > 1:
+                        pending[column] = [text, cell["rowspan"] - 1]
+                    column += 1
+
+            if any(cells):
+                grid.append(cells)
+
+        if not grid:
+            return []
+
+        width = max(len(cells) for cells in grid)
+        grid = [cells + [""] * (width - len(cells)) for cells in grid]
+        keep = [i for i in range(width) if any(cells[i] for cells in grid)]
+        return [[cells[i] for i in keep] for cells in grid]
+
+    def normalize(self, html: Optional[str], fallback_text: str = "") -> str:
+        """
+        Convert a table to its compact form
+
+        Args:
+            html: Table HTML (text_as_html), None if the parser gave none
+            fallback_text: Plain text of the table element
+
+        Returns:
+            Markdown or CSV table, or the cleaned fallback text
+        """
+        try:
+            grid = self.parse(html) if html else []
+        except Exception as e:
+            print(f"Could not parse table HTML, using plain text: {e}")
+            grid = []
+
+        if not grid:
+            return _WHITESPACE_PATTERN.sub(" ", fallback_text or "").strip()
+
+        if self.style == "csv":
+            output = io.StringIO()
+            csv.writer(output, lineterminator="\n").writerows(grid)
+            return output.getvalue().rstrip("\n")
+
+        lines = []
+        for i, cells in enumerate(grid):
+            lines.append("| " + " | ".join(cell.replace("|", "\\|") for cell in cells) + " |")
+            if i == 0:
+                lines.append("|" + "---|" * len(cells))
+        return "\n".join(lines)
@@ -1,17 +1,80 @@
 """Vector store operations using ChromaDB"""
 import json
 import re
-from typing import List
+from typing import List, Optional
 from langchain_core.documents import Document
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_chroma import Chroma
+from config.settings import settings
+from core.fake_backends import FakeEmbeddings
+from core.embedding_cache import CachedEmbeddings, EmbeddingCache
+from core.vector_store_registry import VectorStoreRegistry
+from core.lexical_index import LexicalIndex
 
 
 class VectorStoreManager:
     """Manages ChromaDB vector store operations"""
     
-    def __init__(self, embedding_model: str ):
-        self.embedding_model = GoogleGenerativeAIEmbeddings(model=embedding_model)
+    # "vector" (cosine only), "hybrid" (BM25 and vector fused by reciprocal rank),
+    # "lexical" (BM25 only, no embedding call) or "auto" (lexical for keyword queries the index covers)
+    SEARCH_MODES = ("vector", "hybrid", "lexical", "auto")
+    
+    # Kept out of Chroma metadata: original text and compact tables are already in
+    # page_content, raw table HTML and images live in the blob stores (by reference)
+    EXCLUDED_METADATA = ("original_text", "tables", "raw_tables_html", "image_base64")
+    # List metadata stored as JSON strings
+    JSON_METADATA = (
+        "table_html_refs", "image_interpretation", "table_interpretation", "image_paths",
+        "page_numbers", "content_types"
+    )
+    
+    def __init__(
+        self,
+        embedding_model: str,
+        backend: Optional[str] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        registry: Optional[VectorStoreRegistry] = None
+    ):
+        """
+        Args:
+            embedding_model: Gemini embedding model name
+            backend: "google" or "fake" (offline hash embeddings); defaults to settings.EMBEDDING_BACKEND
+            embedding_cache: Shared cache of document and query vectors (None disables caching)
+            registry: Shared cache of open collections (None opens them on every call)
+        """
+        backend = backend or settings.EMBEDDING_BACKEND
+        self.model_name = embedding_model
+        self.backend = backend
+        self.embedding_cache = embedding_cache
+        self.registry = registry
+        if backend == "fake":
+            self.dimensions = settings.FAKE_EMBEDDING_DIMENSIONS
+            self.embedding_model = self._cached(FakeEmbeddings(
+                dimensions=self.dimensions,
+                latency_seconds=settings.FAKE_EMBEDDING_LATENCY_SECONDS
+            ))
+        elif backend == "google":
+            self.dimensions = 0  # Model default
+            self.embedding_model = self._cached(GoogleGenerativeAIEmbeddings(model=embedding_model))
+        else:
+            raise ValueError(f"Unsupported embedding backend: {backend}")
+    
+    def _cached(self, embeddings):
+        """Put the embedding cache in front of a client (backend is part of the key)"""
+        if self.embedding_cache is None:
+            return embeddings
+        return CachedEmbeddings(
+            embeddings,
+            self.embedding_cache,
+            f"{self.backend}/{self.model_name}",
+            self.dimensions
+        )
+    
+    def embeddings_for_key(self, api_key: str):
+        """Create an embedding client for a specific API key (the fake backend is shared)"""
+        if self.backend == "fake":
+            return self.embedding_model
+        return self._cached(GoogleGenerativeAIEmbeddings(model=self.model_name, google_api_key=api_key))
     
     @staticmethod
     def sanitize_collection_name(name: str) -> str:
@@ -51,6 +114,104 @@ class VectorStoreManager:
         
         return sanitized
     
+    @classmethod
+    def prepare_metadata(cls, documents: List[Document]) -> List[Document]:
+        """
+        Copy documents for ChromaDB: bulky fields dropped, list metadata as JSON strings
+        
+        The given documents are left unmodified.
+        """
+        prepared = []
+        for doc in documents:
+            metadata = {key: value for key, value in doc.metadata.items() if key not in cls.EXCLUDED_METADATA}
+            for key in cls.JSON_METADATA:
+                if key in metadata:
+                    metadata[key] = json.dumps(metadata[key])
+            prepared.append(Document(page_content=doc.page_content, metadata=metadata))
+        return prepared
+    
+    def create_empty_store(
+        self,
+        persist_directory: str,
+        collection_name: str = "multimodal_rag"
+    ):
+        """
+        Create (or open) a persistent collection to fill incrementally
+        
+        Args:
+            persist_directory: Directory to persist the database
+            collection_name: Name of the collection (will be sanitized)
+            
+        Returns:
+            ChromaDB vector store instance
+        """
+        collection_name = self.sanitize_collection_name(collection_name)
+        
+        return self._open(persist_directory, collection_name, {"hnsw:space": "cosine"})
+    
+    def _open(self, persist_directory: str, collection_name: str, collection_metadata: Optional[dict] = None):
+        """Open a collection, through the registry if there is one"""
+        if self.registry is None:
+            return Chroma(
+                persist_directory=persist_directory,
+                embedding_function=self.embedding_model,
+                collection_name=collection_name,
+                collection_metadata=collection_metadata
+            )
+        
+        return self.registry.get(
+            persist_directory,
+            collection_name,
+            f"{self.backend}/{self.model_name}",
+            lambda client: Chroma(
+                client=client,
+                embedding_function=self.embedding_model,
+                collection_name=collection_name,
+                collection_metadata=collection_metadata
+            )
+        )
+    
+    def load_lexical_index(self, path: str) -> Optional[LexicalIndex]:
+        """Load a document's BM25 index, kept in memory by the registry if there is one"""
+        if self.registry is None:
+            return LexicalIndex.load(path)
+        return self.registry.get_lexical_index(path)
+    
+    def add_documents(self, vectorstore, documents: List[Document]) -> None:
+        """
+        Embed and upsert a batch of documents into an existing vector store
+        
+        Args:
+            vectorstore: ChromaDB instance
+            documents: Batch of LangChain documents (left unmodified)
+        """
+        documents = self.prepare_metadata(documents)
+        
+        # Stable IDs make re-adding a chunk an overwrite, not a duplicate
+        ids = [str(doc.metadata["chunk_index"]) for doc in documents]
+        vectorstore.add_documents(documents=documents, ids=ids)
+        print(f"Upserted {len(documents)} documents")
+    
+    def upsert_embedded(self, vectorstore, documents: List[Document], embeddings: List[List[float]]) -> None:
+        """
+        Upsert documents with precomputed embeddings into an existing vector store
+        
+        Args:
+            vectorstore: ChromaDB instance
+            documents: Batch of LangChain documents (left unmodified)
+            embeddings: One vector per document
+        """
+        documents = self.prepare_metadata(documents)
+        
+        # Stable IDs make re-adding a chunk an overwrite, not a duplicate
+        vectorstore._collection.upsert(
+            ids=[str(doc.metadata["chunk_index"]) for doc in documents],
+            embeddings=embeddings,
+            metadatas=[doc.metadata for doc in documents],
+            documents=[doc.page_content for doc in documents]
+        )
+        print(f"Upserted {len(documents)} documents")
+    
     def create_vector_store(
         self, 
         documents: List[Document], 
@@ -61,7 +222,7 @@ class VectorStoreManager:
         Create and persist ChromaDB vector store
         
         Args:
-            documents: List of LangChain documents
+            documents: List of LangChain documents (left unmodified)
             persist_directory: Directory to persist the database
             collection_name: Name of the collection (will be sanitized)
             
@@ -77,58 +238,7 @@ class VectorStoreManager:
         if original_name != collection_name:
             print(f"Collection name sanitized: '{original_name}' -> '{collection_name}'")
         
-        
-        # clean_json = [
-        #     {
-        #         "chunk_index": doc.metadata.get("chunk_index"),
-        #         "enhanced_content": doc.page_content,
-        #         "original_text": doc.metadata.get("original_text", ""),
-        #         "raw_tables_html": doc.metadata.get("raw_tables_html", []),
-        #         "ai_questions": doc.metadata.get("ai_questions", ""),
-        #         "ai_summary": doc.metadata.get("ai_summary", ""),
-        #         "image_interpretation": doc.metadata.get("image_interpretation", ""),
-        #         "table_interpretation": doc.metadata.get("table_interpretation", ""),
-        #         "image_paths": doc.metadata.get("image_paths", []),
-        #         "image_base64": doc.metadata.get("image_base64", []),
-        #         "page_numbers": doc.metadata.get("page_numbers", []),
-        #         "content_types": doc.metadata.get("content_types", []),
-        #     }
-        #     for doc in data
-        # ]
-
-        # doc = Document(
-        #         page_content=combined_content,
-        #         metadata={
-        #             "chunk_index": i,
-        #             "original_text": content_data['text'],
-        #             "raw_tables_html": content_data['tables'], ---------- #List[str]
-        #             "ai_questions": ai_response.question,
-        #             "ai_summary": ai_response.summary,
-        #             "image_interpretation": ai_response.image_interpretation, ---------- #List[str]
-        #             "table_interpretation": ai_response.table_interpretation, ---------- #List[str]
-        #             "image_paths": content_data['images_dirpath'], ---------- #List[str]
-        #             "image_base64": content_data['image_base64'], ---------- #List[str]
-        #             "page_numbers": content_data['page_no'], ---------- #List[str]
-        #             "content_types": content_data['types'], ---------- #List[str]
-        #         }
-        #     )
-        
-        # Convert list metadata to JSON strings (ChromaDB requirement)
-        for doc in documents:
-            if "raw_tables_html" in doc.metadata:
-                doc.metadata["raw_tables_html"] = json.dumps(doc.metadata["raw_tables_html"])
-            if "image_interpretation" in doc.metadata:
-                doc.metadata["image_interpretation"] = json.dumps(doc.metadata["image_interpretation"])
-            if "table_interpretation" in doc.metadata:
-                doc.metadata["table_interpretation"] = json.dumps(doc.metadata["table_interpretation"])
-            if "image_paths" in doc.metadata:
-                doc.metadata["image_paths"] = json.dumps(doc.metadata["image_paths"])
-            if "image_base64" in doc.metadata:
-                doc.metadata["image_base64"] = json.dumps(doc.metadata["image_base64"])
-            if "page_numbers" in doc.metadata:
-                doc.metadata["page_numbers"] = json.dumps(doc.metadata["page_numbers"])
-            if "content_types" in doc.metadata:
-                doc.metadata["content_types"] = json.dumps(doc.metadata["content_types"])
+        documents = self.prepare_metadata(documents)
         
         print("--- Creating vector store ---")
         vectorstore = Chroma.from_documents(
@@ -161,26 +271,41 @@ class VectorStoreManager:
         Returns:
             ChromaDB vector store instance
         """
-        print(f"Loading vector store from {persist_directory}")
-        
         # Sanitize collection name
         collection_name = self.sanitize_collection_name(collection_name)
         
-        vectorstore = Chroma(
-            persist_directory=persist_directory,
-            embedding_function=self.embedding_model,
-            collection_name=collection_name
-        )
+        return self._open(persist_directory, collection_name)
+    
+    @staticmethod
+    def get_by_chunk_indices(vectorstore, chunk_indices: List[int]) -> List[Document]:
+        """Fetch stored documents by chunk index, in the given order (no embedding call)"""
+        if not chunk_indices:
+            return []
         
-        print(f"Vector store loaded successfully")
-        return vectorstore
+        stored = vectorstore.get(ids=[str(chunk_index) for chunk_index in chunk_indices])
+        by_id = {
+            doc_id: Document(page_content=content, metadata=metadata or {})
+            for doc_id, content, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        }
+        return [by_id[str(chunk_index)] for chunk_index in chunk_indices if str(chunk_index) in by_id]
+    
+    @staticmethod
+    def reciprocal_rank_fusion(rankings: List[List[str]], k: int, rrf_k: int = 60) -> List[str]:
+        """Fuse ranked ID lists: each ID scores the sum of 1 / (rrf_k + rank) over the lists"""
+        scores = {}
+        for ranking in rankings:
+            for rank, doc_id in enumerate(ranking, 1):
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+        return sorted(scores, key=scores.get, reverse=True)[:k]
     
     def search(
         self, 
         vectorstore, 
         query: str, 
         k: int = 2,
-        filter_dict: dict = None
+        filter_dict: dict = None,
+        lexical_index: Optional[LexicalIndex] = None,
+        mode: Optional[str] = None
     ):
         """
         Search the vector store
@@ -189,14 +314,45 @@ class VectorStoreManager:
             vectorstore: ChromaDB instance
             query: Search query
             k: Number of results to return
-            filter_dict: Optional metadata filter
+            filter_dict: Optional metadata filter (vector search only)
+            lexical_index: BM25 index of the document (vector search only if None)
+            mode: One of SEARCH_MODES; defaults to settings.SEARCH_MODE
             
         Returns:
             List of relevant documents
         """
-        print(f"Searching for: {query}")
+        mode = mode or settings.SEARCH_MODE
+        if mode not in self.SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode: {mode}")
+        if lexical_index is None or not len(lexical_index) or filter_dict:
+            mode = "vector"
+        if mode == "auto":
+            keyword_query = LexicalIndex.is_keyword_query(query, settings.SEARCH_KEYWORD_MAX_TERMS)
+            mode = "lexical" if keyword_query and lexical_index.covers(query) else "hybrid"
         
-        if filter_dict:
+        print(f"Searching for: {query} ({mode})")
+        
+        if mode == "lexical":
+            hits = lexical_index.search(query, k=k)
+            results = self.get_by_chunk_indices(vectorstore, [chunk_index for chunk_index, _ in hits])
+        elif mode == "hybrid":
+            candidates = max(k, settings.SEARCH_HYBRID_CANDIDATES)
+            vector_results = vectorstore.similarity_search(query, k=candidates)
+            lexical_hits = lexical_index.search(query, k=candidates)
+            
+            by_id = {str(doc.metadata["chunk_index"]): doc for doc in vector_results}
+            fused = self.reciprocal_rank_fusion(
+                [list(by_id), [str(chunk_index) for chunk_index, _ in lexical_hits]],
+                k,
+                settings.SEARCH_RRF_K
+            )
+            
+            # Lexical-only hits are fetched by ID
+            missing = [int(doc_id) for doc_id in fused if doc_id not in by_id]
+            for doc in self.get_by_chunk_indices(vectorstore, missing):
+                by_id[str(doc.metadata["chunk_index"])] = doc
+            results = [by_id[doc_id] for doc_id in fused if doc_id in by_id]
+        elif filter_dict:
             results = vectorstore.similarity_search(query, k=k, filter=filter_dict)
         else:
             results = vectorstore.similarity_search(query, k=k)
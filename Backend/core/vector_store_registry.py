@@ -0,0 +1,225 @@
+"""Process-wide cache of persistent Chroma clients and collection handles"""
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+import chromadb
+from langchain_chroma import Chroma
+from core.lexical_index import LexicalIndex
+
+
+# Rough in-memory cost of one indexed vector besides its float32 values (HNSW links, ids)
+VECTOR_OVERHEAD_BYTES = 256
+
+
+class VectorStoreRegistry:
+    """
+    Keeps opened Chroma collections so requests don't reload them from disk.
+
+    One persistent client is kept per directory and one LangChain handle per
+    (directory, collection, embedding model). Handles are evicted least
+    recently used first once their estimated index memory exceeds max_bytes
+    or there are more than max_entries. When a directory's last handle goes,
+    its client is dropped from chromadb's shared system cache, so the SQLite
+    file and HNSW index are freed once in-flight queries release them.
+
+    Directories being ingested are pinned: their handles are never evicted,
+    so writers and readers keep sharing one up-to-date index. Callers should
+    look handles up per request rather than holding on to them.
+
+    Documents' BM25 indexes are kept next to the handles (the most recently
+    used max_lexical_indexes), loaded from disk once and dropped when they
+    are saved again or their document is deleted.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024, max_entries: int = 0, max_lexical_indexes: int = 32):
+        """
+        Args:
+            max_bytes: Memory budget of the open indexes (estimated from vector counts)
+            max_entries: Maximum open collections (0 for no limit)
+            max_lexical_indexes: Maximum loaded BM25 indexes
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_lexical_indexes = max_lexical_indexes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clients = {}
+        self._handles: OrderedDict = OrderedDict()
+        self._lexical_indexes: OrderedDict = OrderedDict()
+        self._pins = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _directory_key(persist_directory: str) -> str:
+        return str(Path(persist_directory).resolve())
+
+    @staticmethod
+    def _estimate_bytes(vectorstore: Chroma) -> int:
+        """Estimate index memory from the vector count and dimensionality"""
+        collection = vectorstore._collection
+        count = collection.count()
+        if not count:
+            return 0
+
+        sample = collection.get(limit=1, include=["embeddings"])["embeddings"]
+        dimensions = len(sample[0]) if sample is not None and len(sample) else 0
+        return count * (dimensions * 4 + VECTOR_OVERHEAD_BYTES)
+
+    def _client(self, directory: str):
+        client = self._clients.get(directory)
+        if client is None:
+            client = self._clients[directory] = chromadb.PersistentClient(path=directory)
+        return client
+
+    def _release_client(self, directory: str, stop: bool = False) -> None:
+        """Drop a directory's client once no handle uses it (stop closes its files now)"""
+        if any(key[0] == directory for key in self._handles):
+            return
+
+        if self._clients.pop(directory, None) is None:
+            return
+
+        # chromadb shares one system per path; without this it would stay cached forever
+        try:
+            from chromadb.api.shared_system_client import SharedSystemClient
+            system = SharedSystemClient._identifier_to_system.pop(directory, None)
+            if system is not None and stop:
+                system.stop()
+        except Exception as e:
+            print(f"Failed to release Chroma client for {directory}: {e}")
+
+    def _evict(self, keep: Optional[tuple]) -> None:
+        """Evict least recently used unpinned handles (except keep) beyond the limits"""
+        while True:
+            total_bytes = sum(entry["bytes"] for entry in self._handles.values())
+            over_bytes = self.max_bytes > 0 and total_bytes > self.max_bytes
+            over_entries = self.max_entries > 0 and len(self._handles) > self.max_entries
+            if not (over_bytes or over_entries):
+                break
+
+            key = next((key for key in self._handles if key != keep and not self._pins[key[0]]), None)
+            if key is None:
+                break
+            del self._handles[key]
+            self.evictions += 1
+            self._release_client(key[0])
+            print(f"Vector store registry evicted {key[1]} ({key[0]})")
+
+    def get(
+        self,
+        persist_directory: str,
+        collection_name: str,
+        embedding_model: str,
+        create: Callable[[object], Chroma]
+    ) -> Chroma:
+        """
+        Get an open collection handle
+
+        Args:
+            persist_directory: Directory of the persistent database
+            collection_name: Sanitized collection name
+            embedding_model: Embedding model (and backend) the handle embeds queries with
+            create: Builds the handle from the directory's shared client on a miss
+
+        Returns:
+            ChromaDB vector store instance
+        """
+        directory = self._directory_key(persist_directory)
+        key = (directory, collection_name, embedding_model)
+
+        with self._lock:
+            entry = self._handles.get(key)
+            if entry is not None:
+                self._handles.move_to_end(key)
+                self.hits += 1
+                return entry["vectorstore"]
+
+            self.misses += 1
+            vectorstore = create(self._client(directory))
+            self._handles[key] = {"vectorstore": vectorstore, "bytes": self._estimate_bytes(vectorstore)}
+            self._evict(keep=key)
+            return vectorstore
+
+    def pin(self, persist_directory: str) -> None:
+        """Keep a directory's handles open while it is being written"""
+        directory = self._directory_key(persist_directory)
+        with self._lock:
+            self._pins[directory] += 1
+
+    def unpin(self, persist_directory: str) -> None:
+        """Release a pin and re-estimate the directory's memory (ingestion grew it)"""
+        directory = self._directory_key(persist_directory)
+        with self._lock:
+            self._pins[directory] -= 1
+            if self._pins[directory] <= 0:
+                del self._pins[directory]
+
+            for key, entry in self._handles.items():
+                if key[0] == directory:
+                    try:
+                        entry["bytes"] = self._estimate_bytes(entry["vectorstore"])
+                    except Exception as e:
+                        print(f"Failed to estimate vector store size for {directory}: {e}")
+            self._evict(keep=None)
+
+    def evict(self, persist_directory: str) -> None:
+        """Close all handles of a directory (before its files are deleted)"""
+        directory = self._directory_key(persist_directory)
+        with self._lock:
+            for key in [key for key in self._handles if key[0] == directory]:
+                del self._handles[key]
+            self._release_client(directory, stop=True)
+
+    def get_lexical_index(self, path: str) -> Optional[LexicalIndex]:
+        """
+        Get a document's BM25 index, loading it on first use
+
+        Args:
+            path: Saved index file
+
+        Returns:
+            The index, or None if the document has none
+        """
+        key = str(Path(path).resolve())
+        with self._lock:
+            if key in self._lexical_indexes:
+                self._lexical_indexes.move_to_end(key)
+                return self._lexical_indexes[key]
+
+        index = LexicalIndex.load(key)
+        with self._lock:
+            self._lexical_indexes[key] = index
+            while len(self._lexical_indexes) > self.max_lexical_indexes:
+                self._lexical_indexes.popitem(last=False)
+        return index
+
+    def evict_lexical_index(self, path: str) -> None:
+        """Drop a loaded BM25 index (after it was saved again or deleted)"""
+        with self._lock:
+            self._lexical_indexes.pop(str(Path(path).resolve()), None)
+
+    def get_stats(self) -> dict:
+        """Get registry statistics"""
+        with self._lock:
+            handles = len(self._handles)
+            lexical_indexes = len(self._lexical_indexes)
+            clients = len(self._clients)
+            pinned = len(self._pins)
+            total_bytes = sum(entry["bytes"] for entry in self._handles.values())
+
+        lookups = self.hits + self.misses
+        return {
+            "collections": handles,
+            "clients": clients,
+            "pinned_directories": pinned,
+            "estimated_bytes": total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "lexical_indexes": lexical_indexes,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries
+        }
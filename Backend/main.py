@@ -3,9 +3,10 @@ FastAPI Main Application
 Run with: uvicorn main:app --reload --host 0.0.0.0 --port 8000
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import router
+from api.routes import router, parser_pool, llm_pool, resume_interrupted_jobs
 from config.settings import settings
 from dotenv import load_dotenv
 import pytesseract
@@ -27,13 +28,28 @@ else:
 # -------------------------------
 load_dotenv()
 
+# -------------------------------
+# App Lifespan (warm parser pool, pooled LLM clients, interrupted jobs)
+# -------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.PARSER_POOL_ENABLED:
+        parser_pool.tesseract_cmd = pytesseract.pytesseract.tesseract_cmd
+        parser_pool.start()
+    if settings.RESUME_JOBS_ON_STARTUP:
+        resume_interrupted_jobs()
+    yield
+    parser_pool.shutdown()
+    llm_pool.close()
+
 # -------------------------------
 # Initialize FastAPI App
 # -------------------------------
 app = FastAPI(
     title=settings.API_TITLE,
     version=settings.API_VERSION,
-    description="Multimodal RAG API for PDF processing with AI-enhanced summaries and vector search"
+    description="Multimodal RAG API for PDF processing with AI-enhanced summaries and vector search",
+    lifespan=lifespan
 )
 
 # -------------------------------
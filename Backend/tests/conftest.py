@@ -0,0 +1,59 @@
+"""Shared fixtures for the backend tests"""
+import importlib.util
+from pathlib import Path
+import pytest
+from core.content_processor import ContentProcessor
+from core.key_scheduler import KeyScheduler
+from core.llm_pool import LLMClientPool
+from core.retry_policy import RetryPolicy
+
+
+SAMPLE_PDF_DIR = Path(__file__).resolve().parents[2] / "docs" / "pdf"
+
+
+@pytest.fixture
+def table_pdf() -> str:
+    """Paper with booktabs-style tables (Attention Is All You Need)"""
+    path = SAMPLE_PDF_DIR / "NIPS-2017-attention-is-all-you-need-Paper.pdf"
+    if not path.exists():
+        pytest.skip(f"Sample PDF not found: {path}")
+    return str(path)
+
+
+@pytest.fixture
+def requires_partition():
+    """Skip unless unstructured can partition PDFs (it needs spaCy's English model for text)"""
+    pytest.importorskip("unstructured.partition.pdf")
+    if importlib.util.find_spec("en_core_web_sm") is None:
+        pytest.skip("spaCy model en_core_web_sm is not installed")
+
+
+@pytest.fixture
+def requires_hi_res(requires_partition):
+    """Skip unless the layout (yolox) and table structure models are in the Hugging Face cache"""
+    from huggingface_hub import try_to_load_from_cache
+
+    for repo_id, filename in [
+        ("unstructuredio/yolo_x_layout", "yolox_l0.05.onnx"),
+        ("microsoft/table-transformer-structure-recognition", "config.json")
+    ]:
+        if not isinstance(try_to_load_from_cache(repo_id, filename), str):
+            pytest.skip(f"Model {repo_id} is not downloaded")
+
+
+@pytest.fixture
+def make_processor(tmp_path, monkeypatch):
+    """Build a processor on the offline backend (placeholder keys, fast backoff)"""
+    for name in ["GOOGLE_API_KEY", *(f"GOOGLE_API_KEY_{i}" for i in range(1, 8))]:
+        monkeypatch.delenv(name, raising=False)
+
+    def make(keys: int = 2, max_concurrency: int = 2, chunk_deadline: float = 5.0, **kwargs) -> ContentProcessor:
+        return ContentProcessor(
+            image_dir=str(tmp_path / "images"),
+            llm_pool=LLMClientPool(backend="fake", fake_keys=keys),
+            key_scheduler=KeyScheduler(1000, 10_000_000, max_concurrency),
+            retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.01, chunk_deadline=chunk_deadline),
+            **kwargs
+        )
+
+    return make
@@ -0,0 +1,228 @@
+"""LLM call retries, failover and deadlines of the content processor"""
+import asyncio
+import gc
+import pytest
+from core.fake_backends import FakeLLMError
+
+
+def text_content(text: str) -> dict:
+    """Output of separate_content_types() for a text-only chunk"""
+    return {
+        'text': text, 'tables': [], 'table_html_refs': [], 'image_base64': [], 'image_mime_types': [],
+        'image_refs_sent': [], 'images_dirpath': [], 'page_no': [1], 'types': ['text']
+    }
+
+
+def test_quota_error_fails_over_to_another_key(make_processor):
+    processor = make_processor()
+    used_keys = []
+
+    async def request(api_key):
+        used_keys.append(api_key)
+        if len(used_keys) == 1:
+            raise FakeLLMError(429, "RESOURCE_EXHAUSTED: Quota exceeded, retryDelay: '30s'")
+        return "ok"
+
+    assert asyncio.run(processor._call_with_retries_async("Chunk 1", 100, request)) == "ok"
+    assert used_keys[0] != used_keys[1]
+    assert processor.stats["failovers"] == 1
+    assert processor.stats["retries"] == 1
+
+
+def test_auth_error_fails_over_to_another_key(make_processor):
+    processor = make_processor(keys=2)
+    used_keys = []
+
+    async def request(api_key):
+        used_keys.append(api_key)
+        if len(used_keys) == 1:
+            raise FakeLLMError(403, "PERMISSION_DENIED")
+        return "ok"
+
+    assert asyncio.run(processor._call_with_retries_async("Chunk 1", 100, request)) == "ok"
+    assert used_keys[0] != used_keys[1]
+    assert processor.stats["failovers"] == 1
+
+
+def test_auth_error_with_a_single_key_fails_fast(make_processor):
+    # Retrying would wait for the key's long cooldown until the deadline
+    processor = make_processor(keys=1, chunk_deadline=30.0)
+    calls = []
+
+    async def request(api_key):
+        calls.append(api_key)
+        raise FakeLLMError(401, "API key not valid")
+
+    async def run():
+        return await asyncio.wait_for(processor._call_with_retries_async("Chunk 1", 100, request), timeout=5)
+
+    assert asyncio.run(run()) is None
+    assert len(calls) == 1
+    assert processor.stats["retries"] == 0
+    assert processor.stats["deadline_exceeded"] == 0
+
+
+def test_invalid_request_is_not_retried(make_processor):
+    processor = make_processor()
+    calls = []
+
+    async def request(api_key):
+        calls.append(api_key)
+        raise FakeLLMError(400, "Invalid argument")
+
+    assert asyncio.run(processor._call_with_retries_async("Chunk 1", 100, request)) is None
+    assert len(calls) == 1
+    assert processor.stats["retries"] == 0
+
+
+def test_server_errors_are_retried_up_to_max_attempts(make_processor):
+    processor = make_processor()
+    calls = []
+
+    async def request(api_key):
+        calls.append(api_key)
+        raise FakeLLMError(503, "Service unavailable")
+
+    assert asyncio.run(processor._call_with_retries_async("Chunk 1", 100, request)) is None
+    assert len(calls) == 3
+    assert processor.stats["failovers"] == 0
+
+
+def test_deadline_excludes_time_queued_for_a_key(make_processor):
+    # One key, one call at a time: the last chunk waits ~0.6s for the key,
+    # longer than the 0.5s deadline, but each request only takes 0.2s
+    processor = make_processor(keys=1, max_concurrency=1, chunk_deadline=0.5)
+
+    async def request(api_key):
+        await asyncio.sleep(0.2)
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*[
+            processor._call_with_retries_async(f"Chunk {i}", 100, request) for i in range(4)
+        ])
+
+    assert asyncio.run(run()) == ["ok"] * 4
+    assert processor.stats["deadline_exceeded"] == 0
+
+
+def test_deadline_stops_slow_requests(make_processor):
+    processor = make_processor(chunk_deadline=0.1)
+
+    async def request(api_key):
+        await asyncio.sleep(1)
+
+    assert asyncio.run(processor._call_with_retries_async("Chunk 1", 100, request)) is None
+    assert processor.stats["deadline_exceeded"] == 1
+
+
+class _ChunkParser:
+    """Parser stand-in feeding prepared chunks to the streaming pipeline"""
+
+    def __init__(self, chunks: list):
+        self.chunks = chunks
+
+    def iter_chunks(self, *args):
+        yield from self.chunks
+
+
+def _text_chunks(count: int) -> list:
+    from unstructured.documents.elements import CompositeElement, ElementMetadata, NarrativeText
+
+    chunks = []
+    for i in range(count):
+        text = f"Paragraph {i} about topic {i} with a few words of content."
+        element = NarrativeText(text=text, metadata=ElementMetadata(page_number=1))
+        chunks.append(CompositeElement(text=text, metadata=ElementMetadata(page_number=1, orig_elements=[element])))
+    return chunks
+
+
+def test_streaming_batches_flush_when_all_workers_joined(make_processor, tmp_path):
+    pytest.importorskip("unstructured.documents.elements")
+    pytest.importorskip("langchain_chroma")
+    from core.pipeline import IngestionPipeline
+    from core.vector_store import VectorStoreManager
+
+    # A linger far longer than the test: batches must go out because all 4 workers joined
+    processor = make_processor(batch_max_chunks=8, batch_linger_seconds=30.0)
+    pipeline = IngestionPipeline(
+        _ChunkParser(_text_chunks(8)),
+        processor,
+        VectorStoreManager("fake-embedding", backend="fake"),
+        summary_workers=4
+    )
+
+    async def run():
+        return await asyncio.wait_for(
+            pipeline.run("doc.pdf", 3000, 3800, 200, False, False, ["eng"], str(tmp_path / "chroma"), "doc"),
+            timeout=20
+        )
+
+    documents = asyncio.run(run())
+
+    assert len(documents) == 8
+    assert processor.stats["tier_batched"] == 8
+    assert processor.stats["batch_calls"] == 2
+    assert processor.stats["fallbacks"] == 0
+
+
+def test_gathered_chunks_fill_one_batch(make_processor):
+    processor = make_processor(batch_max_chunks=8, batch_linger_seconds=0.2)
+    contents = [text_content(f"Short paragraph {i}.") for i in range(5)]
+
+    responses = asyncio.run(processor.process_chunks_async(contents))
+
+    assert len(responses) == 5
+    assert processor.stats["batch_calls"] == 1
+    assert processor.stats["batched_chunks"] == 5
+
+
+def test_failed_batch_fails_its_chunks_only(make_processor, monkeypatch):
+    processor = make_processor(batch_max_chunks=2)
+    loop_errors = []
+
+    async def fail(items):
+        raise RuntimeError("batch request failed")
+
+    monkeypatch.setattr(processor, "_summarise_batch_items", fail)
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: loop_errors.append(context))
+        results = await asyncio.gather(
+            processor._summarise_batched_async(1, text_content("First paragraph.")),
+            processor._summarise_batched_async(2, text_content("Second paragraph.")),
+            return_exceptions=True
+        )
+        # The finished batch task must not report an exception nobody retrieved
+        await asyncio.sleep(0)
+        gc.collect()
+        return results
+
+    results = asyncio.run(run())
+
+    assert [str(result) for result in results] == ["batch request failed"] * 2
+    assert not processor._batch_tasks
+    assert loop_errors == []
+
+
+def test_cancelled_batch_cancels_its_chunks(make_processor, monkeypatch):
+    processor = make_processor(batch_max_chunks=2)
+
+    async def hang(items):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(processor, "_summarise_batch_items", hang)
+
+    async def run():
+        waiters = [
+            asyncio.create_task(processor._summarise_batched_async(i, text_content(f"Paragraph {i}.")))
+            for i in (1, 2)
+        ]
+        await asyncio.sleep(0.01)
+        for task in list(processor._batch_tasks):
+            task.cancel()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
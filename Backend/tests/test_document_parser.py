@@ -0,0 +1,153 @@
+"""Sharded partitioning must match a single-process parse"""
+import pytest
+
+pytest.importorskip("unstructured.partition.pdf")
+
+from unstructured.chunking.title import chunk_by_title
+from unstructured.documents.elements import ElementMetadata, NarrativeText, Table, Title
+from unstructured.partition.pdf import partition_pdf
+from core.document_parser import DocumentParser
+
+
+PARTITION_KWARGS = {"strategy": "fast", "languages": ["eng"]}
+
+
+def _summary(elements: list) -> list:
+    return [
+        (element.id, element.category, element.text, element.metadata.page_number)
+        for element in elements
+    ]
+
+
+CHUNK_KWARGS = {
+    "include_orig_elements": True,
+    "max_characters": 400,
+    "new_after_n_chars": 600,
+    "combine_text_under_n_chars": 100
+}
+
+
+def _chunk_summary(chunks: list) -> list:
+    """
+    Chunk text and pages, and the text and parent link of the elements in each chunk
+
+    Element IDs are left out: chunk_by_title gives the elements of a split
+    table fresh random IDs on every call.
+    """
+    return [
+        (
+            chunk.text,
+            chunk.metadata.page_number,
+            [(element.text, element.metadata.parent_id) for element in chunk.metadata.orig_elements]
+        )
+        for chunk in chunks
+    ]
+
+
+def _iter_chunks(parser: DocumentParser, file_path: str) -> list:
+    return list(parser.iter_chunks(
+        file_path, CHUNK_KWARGS["max_characters"], CHUNK_KWARGS["new_after_n_chars"],
+        CHUNK_KWARGS["combine_text_under_n_chars"], extract_images=False, extract_tables=True, languages=["eng"]
+    ))
+
+
+def _page_elements(page: int) -> list:
+    """A section title and paragraphs; every third page ends with a table longer than max_characters"""
+    title = Title(text=f"Section {page}", metadata=ElementMetadata(page_number=page))
+    elements = [title]
+    for i in range(3):
+        elements.append(NarrativeText(
+            text=f"Paragraph {i} of page {page}. " + "Attention weights are computed per head. " * (i + 1),
+            metadata=ElementMetadata(page_number=page, parent_id=title.id)
+        ))
+    # A short paragraph that by_title combines with the next page's section
+    elements.append(NarrativeText(text=f"End of page {page}.", metadata=ElementMetadata(page_number=page)))
+    if page % 3 == 0:
+        # Split into several chunks at the end of a shard, which must be held back together
+        rows = "".join(f"<tr><td>layer {row}</td><td>{row * 0.1:.1f}</td></tr>" for row in range(40))
+        elements.append(Table(
+            text=" ".join(f"layer {row} {row * 0.1:.1f}" for row in range(40)),
+            metadata=ElementMetadata(page_number=page, text_as_html=f"<table>{rows}</table>", parent_id=title.id)
+        ))
+    return elements
+
+
+def test_streamed_chunks_match_chunking_the_whole_document(tmp_path, monkeypatch, table_pdf):
+    """Chunks held back at shard boundaries end up exactly as chunk_by_title over all elements"""
+    pages = {page: _page_elements(page) for page in range(1, 9)}
+    range_jobs = [(first, last, {}) for first, last in DocumentParser.get_page_ranges(len(pages), 3)]
+    parser = DocumentParser(str(tmp_path / "images"), shard_pages=3)
+    monkeypatch.setattr(parser, "_get_range_jobs", lambda *args: range_jobs)
+    monkeypatch.setattr(parser, "iter_partition_ranges", lambda file_path, jobs: (
+        [element for page in range(first, last + 1) for element in pages[page]] for first, last, _ in jobs
+    ))
+
+    streamed = _iter_chunks(parser, table_pdf)
+    whole = chunk_by_title([element for page in pages for element in pages[page]], **CHUNK_KWARGS)
+
+    assert any(chunk.category == "TableChunk" for chunk in whole)
+    assert _chunk_summary(streamed) == _chunk_summary(whole)
+
+
+@pytest.fixture
+def fast_parser(tmp_path, monkeypatch):
+    """Sharded parser that partitions every page with the fast strategy"""
+    parser = DocumentParser(str(tmp_path / "images"), shard_pages=3, max_workers=2)
+    prepare = parser._prepare_partition
+
+    def prepare_fast(*args):
+        plan = prepare(*args)
+        plan["partition_kwargs"] = plan["fast_kwargs"]
+        return plan
+
+    monkeypatch.setattr(parser, "_prepare_partition", prepare_fast)
+    return parser
+
+
+def test_streamed_shards_match_single_process_chunking(requires_partition, fast_parser, table_pdf):
+    """
+    Chunks streamed from 3-page shards match chunk_by_title over a whole-file parse
+
+    parent_id links are compared too: unstructured builds the element
+    hierarchy page by page, so shards split at page boundaries keep them.
+    """
+    streamed = _iter_chunks(fast_parser, table_pdf)
+    whole = chunk_by_title(partition_pdf(filename=table_pdf, **PARTITION_KWARGS), **CHUNK_KWARGS)
+
+    assert _chunk_summary(streamed) == _chunk_summary(whole)
+    assert any(element.metadata.parent_id for chunk in whole for element in chunk.metadata.orig_elements)
+
+
+def test_streamed_hi_res_shards_match_single_process_chunking(requires_hi_res, tmp_path, table_pdf):
+    parser = DocumentParser(str(tmp_path / "images"), shard_pages=3, max_workers=2)
+    plan = parser._prepare_partition(
+        table_pdf, CHUNK_KWARGS["max_characters"], CHUNK_KWARGS["new_after_n_chars"],
+        CHUNK_KWARGS["combine_text_under_n_chars"], False, True, ["eng"]
+    )
+
+    streamed = _iter_chunks(parser, table_pdf)
+    whole = chunk_by_title(partition_pdf(filename=table_pdf, **plan["partition_kwargs"]), **CHUNK_KWARGS)
+
+    assert _chunk_summary(streamed) == _chunk_summary(whole)
+
+
+def test_page_ranges_cover_every_page_once():
+    assert DocumentParser.get_page_ranges(12, 5) == [(1, 5), (6, 10), (11, 12)]
+    assert DocumentParser.get_page_ranges(4, 20) == [(1, 4)]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_sharded_partition_matches_single_process(requires_partition, tmp_path, table_pdf, max_workers):
+    parser = DocumentParser(str(tmp_path / "images"), shard_pages=3, max_workers=max_workers)
+    page_count = DocumentParser.get_page_count(table_pdf)
+    range_jobs = [
+        (first, last, PARTITION_KWARGS)
+        for first, last in DocumentParser.get_page_ranges(page_count, parser.shard_pages)
+    ]
+
+    sharded = parser.partition_ranges(table_pdf, range_jobs)
+    whole = partition_pdf(filename=table_pdf, **PARTITION_KWARGS)
+
+    assert len(range_jobs) > 1
+    assert _summary(sharded) == _summary(whole)
+    assert {element.metadata.page_number for element in sharded} == set(range(1, page_count + 1))
@@ -0,0 +1,80 @@
+"""Embedding cache hits and misses of document and query embeddings"""
+import asyncio
+import pytest
+from core.embedding_cache import CachedEmbeddings, EmbeddingCache
+from core.fake_backends import FakeEmbeddings
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    """Fake embeddings that record the texts sent to the model"""
+
+    def __init__(self):
+        super().__init__(dimensions=16)
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "embedding_cache.sqlite3")
+
+
+def test_cached_texts_are_not_embedded_again(cache_path):
+    model = CountingEmbeddings()
+    cache = EmbeddingCache(cache_path)
+    embeddings = CachedEmbeddings(model, cache, "fake:test")
+
+    first = embeddings.embed_documents(["alpha", "beta", "alpha"])
+    second = embeddings.embed_documents(["beta", "gamma"])
+
+    # Duplicates in a batch are embedded once
+    assert model.embedded == ["alpha", "beta", "gamma"]
+    assert first[0] == first[2]
+    assert second[0] == pytest.approx(first[1])
+    assert cache.stats["document"] == {"memory_hits": 1, "disk_hits": 0, "misses": 4}
+
+
+def test_vectors_persist_across_cache_instances(cache_path):
+    CachedEmbeddings(CountingEmbeddings(), EmbeddingCache(cache_path), "fake:test").embed_documents(["alpha"])
+
+    model = CountingEmbeddings()
+    cache = EmbeddingCache(cache_path)
+    vector = CachedEmbeddings(model, cache, "fake:test").embed_documents(["alpha"])[0]
+
+    assert model.embedded == []
+    assert vector == pytest.approx(FakeEmbeddings(dimensions=16).embed_query("alpha"))
+    assert cache.stats["document"]["disk_hits"] == 1
+
+
+def test_queries_documents_and_models_are_cached_separately(cache_path):
+    model = CountingEmbeddings()
+    cache = EmbeddingCache(cache_path)
+
+    CachedEmbeddings(model, cache, "fake:test").embed_documents(["alpha"])
+    CachedEmbeddings(model, cache, "fake:test").embed_query("alpha")
+    CachedEmbeddings(model, cache, "fake:other").embed_query("alpha")
+    asyncio.run(CachedEmbeddings(model, cache, "fake:other").aembed_query("alpha"))
+
+    assert model.embedded == ["alpha", "alpha", "alpha"]
+    assert cache.stats["query"] == {"memory_hits": 1, "disk_hits": 0, "misses": 2}
+    assert cache.get_stats()["query"]["hit_rate"] == pytest.approx(0.333)
+
+
+def test_least_recently_used_entries_are_evicted(cache_path):
+    cache = EmbeddingCache(cache_path, memory_entries=0, max_entries=2)
+    keys = [EmbeddingCache.make_key("fake:test", 0, text) for text in ["a", "b", "c"]]
+
+    cache.put_many({keys[0]: [1.0]})
+    cache.put_many({keys[1]: [2.0]})
+    cache.get_many([keys[0]])
+    cache.put_many({keys[2]: [3.0]})
+
+    assert set(cache.get_many(keys)) == {keys[0], keys[2]}
+    assert cache.evictions == 1
@@ -0,0 +1,19 @@
+"""Batching of the embedding ingestor"""
+import pytest
+
+pytest.importorskip("langchain_chroma")
+
+from core.embedding_ingestor import MAX_BATCH_SIZE, EmbeddingIngestor
+from core.key_scheduler import KeyScheduler
+from core.vector_store import VectorStoreManager
+
+
+@pytest.mark.parametrize("batch_size, expected", [(0, 1), (32, 32), (100, 100), (250, MAX_BATCH_SIZE)])
+def test_batch_size_is_capped_at_the_api_limit(batch_size, expected):
+    ingestor = EmbeddingIngestor(
+        VectorStoreManager("fake-embedding", backend="fake"),
+        ["key-1"],
+        KeyScheduler(100, 1_000_000, 4),
+        batch_size=batch_size
+    )
+    assert ingestor.batch_size == expected
@@ -0,0 +1,76 @@
+"""Image dedup matches near-duplicates only with a second check and within a scope"""
+import io
+import pytest
+from PIL import Image
+from core.image_dedup import ImageDeduplicator
+from utils.blob_store import BlobStore
+
+
+def _gradient() -> Image.Image:
+    """Horizontal gradient with brighter 64px bands"""
+    image = Image.new("L", (288, 256))
+    image.putdata([(x * 255 // 288 + (40 if (y // 64) % 2 else 0)) % 256 for y in range(256) for x in range(288)])
+    return image
+
+
+def _encode(image: Image.Image, image_format: str = "PNG", **kwargs) -> bytes:
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, image_format, **kwargs)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def dedup(tmp_path):
+    return ImageDeduplicator(str(tmp_path / "index.json"), BlobStore(str(tmp_path / "images")))
+
+
+def test_reencoded_image_is_a_duplicate_within_scope(dedup):
+    ref, duplicate = dedup.store(_encode(_gradient()), "png", scope="doc-1")
+    assert not duplicate
+
+    assert dedup.store(_encode(_gradient(), "JPEG", quality=70), "jpg", scope="doc-1") == (ref, True)
+
+
+def test_near_duplicates_are_not_shared_across_scopes(dedup):
+    ref, _ = dedup.store(_encode(_gradient()), "png", scope="doc-1")
+    dedup.set_interpretation(ref, "A gradient")
+
+    other_ref, duplicate = dedup.store(_encode(_gradient(), "JPEG", quality=70), "jpg", scope="doc-2")
+    assert other_ref != ref and not duplicate
+    assert dedup.get_interpretation(other_ref) is None
+
+    # Byte-identical images share the asset (and interpretation) across documents
+    assert dedup.store(_encode(_gradient()), "png", scope="doc-2") == (ref, True)
+
+
+def test_fine_hash_rejects_images_differing_in_detail(dedup):
+    base = _gradient()
+    detailed = base.copy()
+    pixels = detailed.load()
+    for y in range(detailed.height):
+        for x in range(detailed.width):
+            if (x // 16 + y // 16) % 2:
+                pixels[x, y] = max(0, pixels[x, y] - 60)
+
+    # Same 64-bit dHash, so only the second check tells them apart
+    assert ImageDeduplicator.dhash(base) == ImageDeduplicator.dhash(detailed)
+
+    ref, _ = dedup.store(_encode(base), "png", scope="doc-1")
+    other_ref, duplicate = dedup.store(_encode(detailed), "png", scope="doc-1")
+    assert other_ref != ref and not duplicate
+
+
+def test_index_survives_reload(tmp_path, dedup):
+    ref, _ = dedup.store(_encode(_gradient()), "png", scope="doc-1")
+    dedup.set_interpretation(ref, "A gradient")
+    dedup.save()
+
+    reloaded = ImageDeduplicator(str(tmp_path / "index.json"), BlobStore(str(tmp_path / "images")))
+    assert reloaded.get_interpretation(ref) == "A gradient"
+    assert reloaded.store(_encode(_gradient(), "JPEG", quality=70), "jpg", scope="doc-1") == (ref, True)
+
+
+def test_bit_ranges_cover_the_hash():
+    ranges = ImageDeduplicator._bit_ranges(5)
+    assert sum(mask.bit_length() for _, mask in ranges) == 64
+    assert [shift for shift, _ in ranges] == [0, 13, 26, 39, 52]
@@ -0,0 +1,85 @@
+"""Resuming ingestion jobs from the job journal and finding them in the job index"""
+import asyncio
+from langchain_core.documents import Document
+from core.job_journal import JobIndex, JobJournal
+
+
+def text_content(text: str) -> dict:
+    return {
+        'text': text, 'tables': [], 'table_html_refs': [], 'image_base64': [], 'image_mime_types': [],
+        'image_refs_sent': [], 'images_dirpath': [], 'page_no': [1], 'types': ['text']
+    }
+
+
+JOB_ARGS = {
+    "file_hash": "ab" * 32,
+    "max_characters": 3000,
+    "new_after_n_chars": 3800,
+    "combine_text_under_n_chars": 200,
+    "extract_images": True,
+    "extract_tables": True,
+    "languages": "english"
+}
+
+
+def test_resumed_job_reuses_recorded_summaries(make_processor, tmp_path):
+    journal_path = str(tmp_path / "journal.sqlite3")
+    contents = [text_content(f"Paragraph {i} of the interrupted document.") for i in range(3)]
+
+    journal = JobJournal(journal_path)
+    first = make_processor(journal=journal)
+    first_responses = asyncio.run(first.process_chunks_async(contents))
+    journal.close()
+    assert first.stats["tier_journal"] == 0
+    assert first.stats["llm_calls"] > 0
+
+    # The restarted job opens the same journal; only the changed chunk is summarised again
+    contents[2] = text_content("Paragraph 2, edited before the job was resumed.")
+    journal = JobJournal(journal_path)
+    resumed = make_processor(journal=journal)
+    responses = asyncio.run(resumed.process_chunks_async(contents))
+
+    assert resumed.stats["tier_journal"] == 2
+    assert journal.summaries_reused == 2
+    assert [response.summary for response in responses[:2]] == [response.summary for response in first_responses[:2]]
+    assert not resumed.is_fallback(responses[2])
+    journal.close()
+
+
+def test_embedded_documents_are_skipped_until_they_change(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.sqlite3"))
+    journal.record_summary(1, "hash", {"summary": "s"})
+    document = Document(page_content="Summary", metadata={"chunk_index": 1})
+
+    assert not journal.is_embedded(document)
+    journal.record_embedded([document])
+    assert journal.is_embedded(document)
+
+    changed = Document(page_content="New summary", metadata={"chunk_index": 1})
+    assert not journal.is_embedded(changed)
+
+    # A new summary clears the embedding record
+    journal.record_summary(1, "hash", {"summary": "s2"})
+    assert not journal.is_embedded(document)
+    journal.close()
+
+
+def test_job_index_finds_interrupted_jobs_only(tmp_path):
+    index = JobIndex(str(tmp_path / "job_index.sqlite3"))
+    index.register("doc_running", JOB_ARGS)
+    index.register("doc_failed", {**JOB_ARGS, "max_characters": 1000})
+
+    assert index.find(JOB_ARGS) == "doc_running"
+    assert index.find({**JOB_ARGS, "extract_images": False}) is None
+
+    # Failed jobs are only resumed on request
+    index.set_status("doc_failed", "failed")
+    assert index.find({**JOB_ARGS, "max_characters": 1000}) is None
+    assert index.find({**JOB_ARGS, "max_characters": 1000}, statuses=("running", "failed")) == "doc_failed"
+
+    index.set_status("doc_running", "completed")
+    assert index.find(JOB_ARGS) is None
+
+    index.remove("doc_failed")
+    assert index.find({**JOB_ARGS, "max_characters": 1000}, statuses=("running", "failed")) is None
+    index.close()
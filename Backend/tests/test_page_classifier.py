@@ -0,0 +1,53 @@
+"""Page routing keeps ruled (booktabs) tables on the hi_res strategy"""
+from pypdf import PdfReader, PdfWriter
+from core.page_classifier import PageClassifier
+
+
+# Pages of the sample paper with Tables 1-3 (each drawn with 3+ horizontal rules only)
+TABLE_PAGES = [6, 8, 9]
+
+
+def test_booktabs_table_pages_need_hi_res(table_pdf):
+    pages = PageClassifier().classify(table_pdf, extract_images=False, extract_tables=True)
+    by_number = {page['page_number']: page for page in pages}
+
+    for page_number in TABLE_PAGES:
+        assert by_number[page_number]['table_rules'] >= 2
+        assert by_number[page_number]['strategy'] == "hi_res"
+
+    # Page 6 has too few vector objects for the graphics signal alone
+    assert by_number[6]['graphics'] < PageClassifier().min_graphics_objects
+    # A single rule (title or footnote separator) is not a table
+    assert by_number[1]['strategy'] == "fast"
+
+
+def test_table_rules_ignored_without_table_extraction(table_pdf):
+    pages = PageClassifier().classify(table_pdf, extract_images=False, extract_tables=False)
+
+    assert pages[5]['strategy'] == "fast"
+
+
+def test_table_page_produces_table_element(requires_hi_res, tmp_path, table_pdf):
+    from core.document_parser import DocumentParser
+
+    # Pages 5-6: a text page routed to fast and the page with Table 1
+    reader = PdfReader(table_pdf)
+    writer = PdfWriter()
+    for page_index in (4, 5):
+        writer.add_page(reader.pages[page_index])
+    shard_path = tmp_path / "table_page.pdf"
+    with open(shard_path, "wb") as f:
+        writer.write(f)
+
+    parser = DocumentParser(str(tmp_path / "images"), page_classifier=PageClassifier())
+    elements = parser.partition_pdf_document(
+        str(shard_path),
+        max_characters=4000,
+        new_after_n_chars=3800,
+        combine_text_under_n_chars=2000,
+        extract_images=False,
+        extract_tables=True,
+        languages=["eng"]
+    )
+
+    assert any(element.category == "Table" for element in elements)
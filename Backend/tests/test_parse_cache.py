@@ -0,0 +1,55 @@
+"""Parse cache hits, misses and eviction"""
+import os
+import time
+from core.parse_cache import ParseCache
+
+
+def _key(name: str) -> str:
+    return ParseCache.make_key(name, {"strategy": "hi_res"})
+
+
+def test_hit_and_miss(tmp_path):
+    cache = ParseCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+
+    assert cache.get(_key("a")) is None
+    cache.put(_key("a"), ["element 1", "element 2"])
+
+    assert cache.get(_key("a")) == ["element 1", "element 2"]
+    assert cache.get(_key("b")) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_key_depends_on_parameters():
+    assert ParseCache.make_key("a", {"languages": ["eng"]}) != ParseCache.make_key("a", {"languages": ["hin"]})
+    assert ParseCache.make_key("a", {"x": 1, "y": 2}) == ParseCache.make_key("a", {"y": 2, "x": 1})
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ParseCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    for name in ("old", "used", "new"):
+        cache.put(_key(name), [name * 1000])
+
+    # Age all entries, then touch "used" with a hit
+    past = time.time() - 100
+    for index, name in enumerate(("old", "used", "new")):
+        os.utime(cache._entry_path(_key(name)), (past + index, past + index))
+    assert cache.get(_key("used")) is not None
+
+    cache.max_bytes = sum(os.path.getsize(cache._entry_path(_key(name))) for name in ("used", "new"))
+    cache.evict()
+
+    assert cache.get(_key("old")) is None
+    assert cache.get(_key("used")) is not None
+    assert cache.get(_key("new")) is not None
+    assert cache.evictions == 1
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_entry_evicted_during_read_is_a_miss(tmp_path):
+    cache = ParseCache(str(tmp_path), max_bytes=0)
+
+    # max_bytes=0 evicts every entry right after it is written
+    cache.put(_key("a"), ["element"])
+
+    assert cache.get(_key("a")) is None
+    assert cache.get_stats()["entries"] == 0
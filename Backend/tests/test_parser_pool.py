@@ -0,0 +1,52 @@
+"""Parser pool queues jobs across workers and recycles them one at a time"""
+import os
+import pytest
+
+pytest.importorskip("unstructured_inference")
+
+from core.parser_pool import ParserWorkerPool
+
+
+@pytest.fixture
+def pool():
+    # An unknown layout model makes warm_worker skip the model download
+    pool = ParserWorkerPool(workers=2, max_jobs_per_worker=2, hi_res_model_name="missing-model")
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def test_jobs_run_and_workers_recycle(pool):
+    futures = [pool.submit(os.getpid) for _ in range(10)]
+    pids = [future.result(timeout=120) for future in futures]
+
+    stats = pool.get_stats()
+    assert stats["completed"] == 10
+    assert stats["queue_depth"] == 0
+    # 2 workers x 2 jobs each before a recycle: at most 2 jobs per process
+    assert max(pids.count(pid) for pid in set(pids)) <= 2
+    assert stats["recycles"] >= 3
+
+
+def test_job_errors_reach_the_caller(pool):
+    future = pool.submit(os.stat, "/nonexistent/parser-pool-test")
+
+    with pytest.raises(FileNotFoundError):
+        future.result(timeout=120)
+    assert pool.submit(os.getpid).result(timeout=120) > 0
+    assert pool.get_stats()["failed"] == 1
+
+
+def test_crashed_worker_is_replaced(pool):
+    from concurrent.futures.process import BrokenProcessPool
+
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(os._exit, 1).result(timeout=120)
+
+    assert all(future.result(timeout=120) > 0 for future in [pool.submit(os.getpid) for _ in range(4)])
+    assert pool.get_stats()["recycles"] >= 1
+
+
+def test_submit_requires_running_pool():
+    with pytest.raises(RuntimeError):
+        ParserWorkerPool(workers=1).submit(os.getpid)
@@ -0,0 +1,56 @@
+"""Classification of LLM errors and key cooldowns"""
+import pytest
+from core.fake_backends import FakeLLMError
+from core.retry_policy import LONG_COOLDOWN_SECONDS, RetryPolicy
+
+
+@pytest.mark.parametrize("error, category", [
+    (FakeLLMError(429, "429 Too many requests"), "rate_limit"),
+    (FakeLLMError(429, "RESOURCE_EXHAUSTED: Quota exceeded for metric"), "quota"),
+    (FakeLLMError(403, "PERMISSION_DENIED"), "auth"),
+    (ValueError("API key not valid. Please pass a valid API key."), "auth"),
+    (FakeLLMError(400, "Invalid argument"), "invalid"),
+    (FakeLLMError(404, "Model not found"), "invalid"),
+    (FakeLLMError(503, "Service unavailable"), "server"),
+    (TimeoutError(), "server"),
+    (ConnectionError("reset"), "server"),
+    (ValueError("Model returned no structured output"), "unknown"),
+])
+def test_classify(error, category):
+    assert RetryPolicy.classify(error) == category
+
+
+def test_classify_uses_status_code_of_cause():
+    try:
+        try:
+            raise FakeLLMError(503, "backend error")
+        except FakeLLMError as cause:
+            raise RuntimeError("request failed") from cause
+    except RuntimeError as error:
+        assert RetryPolicy.classify(error) == "server"
+
+
+def test_key_cooldown():
+    per_minute = FakeLLMError(429, "Quota exceeded ... 'retryDelay': '17s'")
+    per_day = FakeLLMError(429, "Quota exceeded for GenerateRequestsPerDay")
+
+    assert RetryPolicy.key_cooldown(per_minute, "quota") == 17.0
+    assert RetryPolicy.key_cooldown(per_day, "quota") == LONG_COOLDOWN_SECONDS
+    assert RetryPolicy.key_cooldown(FakeLLMError(403, "denied"), "auth") == LONG_COOLDOWN_SECONDS
+    assert RetryPolicy.key_cooldown(FakeLLMError(503, "unavailable"), "server") == 0.0
+
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    assert all(0 <= policy.backoff(attempt) <= 5.0 for attempt in range(1, 10))
+
+
+@pytest.mark.parametrize("category, keys_available, retryable", [
+    ("auth", 1, True),
+    ("auth", 0, False),
+    ("quota", 0, True),
+    ("server", 0, True),
+    ("invalid", 2, False),
+])
+def test_is_retryable(category, keys_available, retryable):
+    assert RetryPolicy.is_retryable(category, keys_available) is retryable
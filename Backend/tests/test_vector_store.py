@@ -0,0 +1,46 @@
+"""Chroma metadata preparation of the vector store manager"""
+import copy
+import json
+import pytest
+from langchain_core.documents import Document
+
+pytest.importorskip("langchain_chroma")
+
+from core.vector_store import VectorStoreManager
+
+
+def make_document() -> Document:
+    return Document(
+        page_content="Multi-head attention",
+        metadata={
+            "chunk_index": 1,
+            "original_text": "Multi-head attention",
+            "tables": ["| a | b |"],
+            "image_base64": ["aGVsbG8="],
+            "image_paths": ["ab12.png"],
+            "page_numbers": [4],
+            "content_types": ["text", "image"]
+        }
+    )
+
+
+def test_prepare_metadata_copies_documents():
+    document = make_document()
+    original = copy.deepcopy(document.metadata)
+
+    prepared = VectorStoreManager.prepare_metadata([document])[0]
+
+    assert document.metadata == original
+    assert set(prepared.metadata) == {"chunk_index", "image_paths", "page_numbers", "content_types"}
+    assert json.loads(prepared.metadata["page_numbers"]) == [4]
+
+
+def test_create_vector_store_leaves_documents_unmodified(tmp_path):
+    document = make_document()
+    original = copy.deepcopy(document.metadata)
+
+    manager = VectorStoreManager("fake-embedding", backend="fake")
+    vectorstore = manager.create_vector_store([document], str(tmp_path / "chroma"), "doc")
+
+    assert document.metadata == original
+    assert vectorstore._collection.count() == 1
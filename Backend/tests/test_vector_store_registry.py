@@ -0,0 +1,49 @@
+"""BM25 indexes kept in memory by the vector store registry"""
+import pytest
+from langchain_core.documents import Document
+
+pytest.importorskip("chromadb")
+
+from core.lexical_index import LexicalIndex
+from core.vector_store_registry import VectorStoreRegistry
+
+
+def save_index(path, texts):
+    documents = [
+        Document(page_content=text, metadata={"chunk_index": i, "original_text": text})
+        for i, text in enumerate(texts, 1)
+    ]
+    LexicalIndex.from_documents(documents).save(str(path))
+
+
+def test_lexical_index_is_loaded_once_until_evicted(tmp_path):
+    path = tmp_path / "lexical_index.json"
+    save_index(path, ["multi-head attention", "positional encoding"])
+    registry = VectorStoreRegistry()
+
+    index = registry.get_lexical_index(str(path))
+    assert index.search("attention", k=1)[0][0] == 1
+
+    # Not read from disk again while it is in memory
+    path.unlink()
+    assert registry.get_lexical_index(str(path)) is index
+
+    # Re-indexing saves the file again and drops the loaded copy
+    save_index(path, ["label smoothing"])
+    registry.evict_lexical_index(str(path))
+    reloaded = registry.get_lexical_index(str(path))
+    assert reloaded is not index
+    assert len(reloaded) == 1
+    assert registry.get_stats()["lexical_indexes"] == 1
+
+
+def test_missing_lexical_index_and_lru_limit(tmp_path):
+    registry = VectorStoreRegistry(max_lexical_indexes=2)
+    assert registry.get_lexical_index(str(tmp_path / "missing.json")) is None
+
+    paths = [tmp_path / f"index_{i}.json" for i in range(3)]
+    for path in paths:
+        save_index(path, ["attention"])
+        registry.get_lexical_index(str(path))
+
+    assert registry.get_stats()["lexical_indexes"] == 2
@@ -0,0 +1,68 @@
+"""Content-addressed blob storage"""
+import hashlib
+import os
+import uuid
+from pathlib import Path
+
+
+class BlobStore:
+    """
+    Stores each blob exactly once under its SHA-256 digest.
+
+    References are plain file names ("<sha256>.<extension>"), so they can be
+    kept in JSON and Chroma metadata and served directly from the store
+    directory. Writing the same content twice is a no-op.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Return SHA-256 hex digest of data"""
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def ref_hash(ref: str) -> str:
+        """Return the content hash part of a reference"""
+        return Path(ref).stem
+
+    def path(self, ref: str) -> Path:
+        """Return the file path of a reference"""
+        # Only the file name is used, so references can't escape the store
+        return self.root_dir / Path(ref).name
+
+    def exists(self, ref: str) -> bool:
+        return self.path(ref).exists()
+
+    def put(self, data: bytes, extension: str) -> str:
+        """
+        Store data if not already present
+
+        Args:
+            data: Blob content
+            extension: File extension without the dot (e.g. "jpg")
+
+        Returns:
+            Reference of the stored blob
+        """
+        ref = f"{self.hash_bytes(data)}.{extension}"
+        blob_path = self.path(ref)
+
+        if not blob_path.exists():
+            tmp_path = blob_path.with_name(f"{blob_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, blob_path)
+
+        return ref
+
+    def get(self, ref: str) -> bytes:
+        """Load blob content"""
+        blob_path = self.path(ref)
+        if not blob_path.exists():
+            raise FileNotFoundError(f"Blob not found: {ref}")
+
+        with open(blob_path, "rb") as f:
+            return f.read()
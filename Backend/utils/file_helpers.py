@@ -58,13 +58,13 @@ class FileHandler:
                 "chunk_index": doc.metadata.get("chunk_index"),
                 "enhanced_content": doc.page_content,
                 "original_text": doc.metadata.get("original_text", ""),
-                "raw_tables_html": doc.metadata.get("raw_tables_html", []),
+                "tables": doc.metadata.get("tables", []),
+                "table_html_refs": doc.metadata.get("table_html_refs", []),
                 "ai_questions": doc.metadata.get("ai_questions", ""),
                 "ai_summary": doc.metadata.get("ai_summary", ""),
                 "image_interpretation": doc.metadata.get("image_interpretation", []),
                 "table_interpretation": doc.metadata.get("table_interpretation", []),
                 "image_paths": doc.metadata.get("image_paths", []),
-                "image_base64": doc.metadata.get("image_base64", []),
                 "page_numbers": doc.metadata.get("page_numbers", []),
                 "content_types": doc.metadata.get("content_types", []),
             }
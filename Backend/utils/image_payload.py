@@ -0,0 +1,76 @@
+"""Shrinking of image payloads sent to the LLM"""
+import io
+from typing import Tuple
+from PIL import Image
+
+
+class ImagePayloadOptimizer:
+    """
+    Re-encodes images for LLM requests.
+
+    Images are scaled down to max_edge pixels on their longer side and saved
+    as JPEG or WebP without metadata. Images under min_bytes are sent as they
+    are, and so is any image the re-encoding would not make smaller. Stored
+    originals are never changed; only the request payload is.
+    """
+
+    FORMATS = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+    def __init__(
+        self,
+        max_edge: int = 1536,
+        image_format: str = "JPEG",
+        quality: int = 85,
+        min_bytes: int = 50000
+    ):
+        """
+        Args:
+            max_edge: Maximum width and height in pixels
+            image_format: "JPEG" or "WEBP"
+            quality: Encoder quality (1-100)
+            min_bytes: Images smaller than this are not re-encoded
+        """
+        image_format = image_format.upper()
+        if image_format not in self.FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+
+        self.max_edge = max_edge
+        self.image_format = image_format
+        self.quality = quality
+        self.min_bytes = min_bytes
+
+    def optimize(self, image_bytes: bytes, mime_type: str) -> Tuple[bytes, str]:
+        """
+        Shrink an image for sending
+
+        Args:
+            image_bytes: Encoded image
+            mime_type: MIME type of image_bytes
+
+        Returns:
+            (payload bytes, payload MIME type), the input if shrinking doesn't help
+        """
+        if len(image_bytes) < self.min_bytes:
+            return image_bytes, mime_type
+
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image.load()
+            if max(image.size) > self.max_edge:
+                image.thumbnail((self.max_edge, self.max_edge), Image.Resampling.LANCZOS)
+
+            if self.image_format == "JPEG" and image.mode != "RGB":
+                # JPEG has no alpha channel: flatten onto white
+                rgba = image.convert("RGBA")
+                image = Image.new("RGB", rgba.size, (255, 255, 255))
+                image.paste(rgba, mask=rgba.getchannel("A"))
+            elif image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+
+            # Metadata (EXIF, ICC, text chunks) is not passed on, so it is dropped
+            output = io.BytesIO()
+            image.save(output, format=self.image_format, quality=self.quality, optimize=True)
+
+        payload = output.getvalue()
+        if len(payload) >= len(image_bytes):
+            return image_bytes, mime_type
+        return payload, self.FORMATS[self.image_format]
@@ -0,0 +1,138 @@
+"""Per-document storage namespaces"""
+import shutil
+from pathlib import Path
+from typing import List
+from config.settings import settings
+
+
+class DocumentWorkspace:
+    """
+    Storage namespace of one document under DOCUMENTS_DIR.
+
+    Layout:
+        <DOCUMENTS_DIR>/<document_id>/
+            checkpoint1.pkl   parsed chunks
+            processed.pkl     LangChain documents
+            processed.json    LangChain documents as JSON
+            journal.sqlite3   job journal (stages, chunk summaries, embeddings)
+            lexical_index.json  BM25 index of the chunks (hybrid search)
+            chroma/           vector store (collection named after the document)
+
+    Image files and table HTML stay in the shared content-addressed stores
+    (IMAGE_DIR and TABLE_DIR): they are written once per content hash and
+    never modified or deleted, so concurrent documents can't interfere and
+    identical assets are shared.
+
+    Documents processed before namespacing are still found at their old
+    paths (PICKLE_DIR, JSON_DIR and CHROMA_DIR) when reading.
+    """
+
+    def __init__(self, document_id: str):
+        """
+        Args:
+            document_id: Document ID (a plain directory name)
+
+        Raises:
+            ValueError: If the document ID is not a plain name
+        """
+        if not document_id or document_id in (".", "..") or Path(document_id).name != document_id:
+            raise ValueError(f"Invalid document ID: {document_id!r}")
+
+        self.document_id = document_id
+        self.root = settings.DOCUMENTS_DIR / document_id
+
+    @staticmethod
+    def _resolve(path: Path, legacy_path: Path) -> Path:
+        """Prefer the namespaced path unless only the legacy one exists"""
+        if not path.exists() and legacy_path.exists():
+            return legacy_path
+        return path
+
+    @property
+    def checkpoint_path(self) -> Path:
+        return self._resolve(
+            self.root / "checkpoint1.pkl",
+            settings.PICKLE_DIR / f"{self.document_id}_checkpoint1.pkl"
+        )
+
+    @property
+    def pickle_path(self) -> Path:
+        return self._resolve(
+            self.root / "processed.pkl",
+            settings.PICKLE_DIR / f"{self.document_id}_processed.pkl"
+        )
+
+    @property
+    def json_path(self) -> Path:
+        return self._resolve(
+            self.root / "processed.json",
+            settings.JSON_DIR / f"{self.document_id}_processed.json"
+        )
+
+    @property
+    def journal_path(self) -> Path:
+        return self.root / "journal.sqlite3"
+
+    @property
+    def lexical_index_path(self) -> Path:
+        return self.root / "lexical_index.json"
+
+    @property
+    def chroma_dir(self) -> Path:
+        return self._resolve(self.root / "chroma", settings.CHROMA_DIR / self.document_id)
+
+    def create(self) -> "DocumentWorkspace":
+        """Create the namespace directory"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def exists(self) -> bool:
+        """Return True if the document has a vector store"""
+        return self.chroma_dir.exists()
+
+    def delete(self) -> List[str]:
+        """
+        Delete all files of the document (shared images are kept)
+
+        Returns:
+            Names of the deleted items
+        """
+        deleted_items = []
+
+        for path in [self.checkpoint_path, self.pickle_path, self.json_path, self.journal_path, self.lexical_index_path]:
+            if path.exists():
+                path.unlink()
+                deleted_items.append(path.name)
+
+        chroma_dir = self.chroma_dir
+        if chroma_dir.exists():
+            shutil.rmtree(chroma_dir)
+            deleted_items.append("vector_store")
+
+        if self.root.exists():
+            shutil.rmtree(self.root)
+
+        return deleted_items
+
+    @staticmethod
+    def list_ids() -> List[str]:
+        """List IDs of all documents with a vector store"""
+        document_ids = set()
+
+        if settings.DOCUMENTS_DIR.exists():
+            document_ids.update(
+                item.name for item in settings.DOCUMENTS_DIR.iterdir() if (item / "chroma").is_dir()
+            )
+        if settings.CHROMA_DIR.exists():
+            document_ids.update(item.name for item in settings.CHROMA_DIR.iterdir() if item.is_dir())
+
+        return sorted(document_ids)
+
+    @staticmethod
+    def list_job_ids() -> List[str]:
+        """List IDs of all documents with a job journal"""
+        if not settings.DOCUMENTS_DIR.exists():
+            return []
+        return sorted(
+            item.name for item in settings.DOCUMENTS_DIR.iterdir() if (item / "journal.sqlite3").is_file()
+        )
@@ -54,6 +54,8 @@ export const ViewDocumentsModal = ({
     return chunk.content_types || [];
   };
 
+  const selectedImages = selectedChunk?.image_urls || [];
+
   const filteredChunks = chunks.filter(chunk => {
     const types = getChunkTypes(chunk);
     const matchesFilter = activeFilter === 'all' || types.includes(activeFilter);
@@ -343,18 +345,18 @@ export const ViewDocumentsModal = ({
                     )}
 
                     {/* Images */}
-                    {selectedChunk.images_base64 && selectedChunk.images_base64.length > 0 && (
+                    {selectedImages.length > 0 && (
                       <div className="pt-4 border-t border-border">
                         <h4 className="text-sm font-medium mb-2 flex items-center gap-2">
                           <Image className="w-4 h-4 text-blue-500" />
-                          Images ({selectedChunk.images_base64.length})
+                          Images ({selectedImages.length})
                         </h4>
                         <div className="space-y-2">
-                          {selectedChunk.images_base64.map((img, idx) => (
+                          {selectedImages.map((img, idx) => (
                             <div key={idx} className="rounded-lg overflow-hidden border border-border">
-                              {img.data ? (
+                              {img.url ? (
                                 <img 
-                                  src={img.data} 
+                                  src={img.url} 
                                   alt={img.filename}
                                   className="w-full h-auto"
                                 />
@@ -166,7 +166,7 @@ class ApiService {
 
 export interface ChunkImage {
   filename: string;
-  data?: string;
+  url?: string;
   path: string;
   error?: string;
 }
@@ -175,7 +175,8 @@ export interface DocumentChunk {
   chunk_index: number;
   enhanced_content: string;
   original_text: string;
-  raw_tables_html: string[];
+  tables: string[];
+  table_html_refs: string[];
   ai_questions: string;
   ai_summary: string;
   image_interpretation: string;
@@ -183,7 +184,7 @@ export interface DocumentChunk {
   image_paths: string[];
   page_numbers: number[];
   content_types: string[];
-  images_base64?: ChunkImage[];
+  image_urls?: ChunkImage[];
 }
 
 export interface DocumentChunksResponse {